@@ -7,7 +7,12 @@ import {
   qualificationSchema,
   diagnosticSchema,
   sizingSchema,
+  type BusinessCase,
+  type DiagnosticData,
   type GeneratedReport,
+  type QualificationData,
+  type RankedArchetype,
+  type SizingEntry,
 } from '@/lib/planner/types'
 import { scoreArchetypes } from '@/lib/planner/scoring'
 import { calculateBusinessCase } from '@/lib/planner/business-case'
@@ -15,6 +20,15 @@ import { buildSystemPrompt, buildUserPrompt, loadFirmTypeContent } from '@/lib/p
 import { resolveRecoveryRates, loadIndustryRates } from '@/lib/planner/industry-rates'
 import { validateReportSchema, escapeHtml } from '@/lib/planner/sanitise'
 import { scrapeCompanyContext } from '@/lib/planner/scrape-company'
+import { checkRateLimits } from '@/lib/planner/rate-limit'
+import { PhaseTimer } from '@/lib/planner/timing'
+import {
+  STREAM_CONTENT_TYPE,
+  createSectionParser,
+  encodeEvent,
+  type GenerateEvent,
+  type GenerateStage,
+} from '@/lib/planner/report-stream'
 import { upsertAttioPerson } from '@/lib/attio'
 import { updatePlannerLead } from '@/lib/supabase'
 
@@ -34,44 +48,11 @@ function isOriginAllowed(origin: string): boolean {
 }
 
 const KV_REPORT_TTL = 60 * 60 * 24 * 30 // 30 days in seconds
-const KV_DAILY_CAP_KEY = 'planner:daily-cap'
-const DAILY_GENERATION_LIMIT = 50
-const PER_EMAIL_DAILY_LIMIT = 3
 const ANTHROPIC_TIMEOUT = 45_000 // 45 seconds
-
-async function checkRateLimits(email: string): Promise<{ allowed: boolean; reason?: string }> {
-  try {
-    // Global daily cap
-    const today = new Date().toISOString().slice(0, 10)
-    const dailyKey = `${KV_DAILY_CAP_KEY}:${today}`
-    const dailyCount = (await kv.get<number>(dailyKey)) ?? 0
-
-    if (dailyCount >= DAILY_GENERATION_LIMIT) {
-      return { allowed: false, reason: 'Daily generation limit reached. Please try again tomorrow.' }
-    }
-
-    // Per-email limit
-    const emailKey = `planner:email:${email}:${today}`
-    const emailCount = (await kv.get<number>(emailKey)) ?? 0
-
-    if (emailCount >= PER_EMAIL_DAILY_LIMIT) {
-      return { allowed: false, reason: 'You have reached the maximum reports per day. Please try again tomorrow.' }
-    }
-
-    // Increment counters
-    await kv.incr(dailyKey)
-    await kv.expire(dailyKey, 60 * 60 * 24) // 24 hour TTL
-    await kv.incr(emailKey)
-    await kv.expire(emailKey, 60 * 60 * 24)
-
-    return { allowed: true }
-  } catch {
-    // If KV is unavailable, allow the request (fail open for availability)
-    return { allowed: true }
-  }
-}
+const GENERATION_FAILED_MESSAGE = 'Report generation failed. You can retry using the button below.'
 
 export async function POST(request: Request) {
+  const timer = new PhaseTimer()
   try {
     // Internal API key bypass — skip origin validation and rate limiting
     const authHeader = request.headers.get('authorization')
@@ -94,10 +75,13 @@ export async function POST(request: Request) {
       : 'https://leomayn.com'
 
     // Parse and validate all inputs
+    const parseStart = performance.now()
     const body = await request.json()
 
-    // Dev-mode input capture for test replay
-    if (process.env.NODE_ENV === 'development') {
+    // Dev-mode input capture for test replay (internal calls are replays or
+    // other services, so capturing them would only duplicate fixtures).
+    // scripts/fixture_store.py ingests these into the deduplicated store.
+    if (process.env.NODE_ENV === 'development' && !isInternal) {
       try {
         const fs = await import('fs/promises')
         const path = await import('path')
@@ -131,234 +115,380 @@ export async function POST(request: Request) {
     const qualification = qualResult.data
     const diagnostic = diagResult.data
     const sizing = sizingResult.data
+    timer.record('parse', parseStart)
 
     // Rate limiting — skip for internal calls
     if (!isInternal) {
-      const rateLimitCheck = await checkRateLimits(qualification.email)
+      const rateLimitCheck = await timer.time('rate_limit', () => checkRateLimits(qualification.email))
       if (!rateLimitCheck.allowed) {
         return NextResponse.json({ error: rateLimitCheck.reason }, { status: 429 })
       }
     }
 
-    // Company website scrape (non-blocking — undefined on failure)
-    let companyContext: string | undefined
-    if (qualification.companyWebsite) {
-      companyContext = await scrapeCompanyContext(qualification.companyWebsite)
-    }
+    const inputs: GenerateInputs = { qualification, diagnostic, sizing, baseUrl }
+    // Phase breakdown in the body only for replays and local development
+    const debugTiming = Boolean(isInternal) || process.env.NODE_ENV === 'development'
+
+    if (!request.headers.get('accept')?.includes(STREAM_CONTENT_TYPE)) {
+      const result = await generateReport(inputs, { timer })
+      const timing = debugTiming ? { timing: timer.summary() } : {}
+      const headers = { 'Server-Timing': timer.header() }
+      if (result.status === 'failed') {
+        return NextResponse.json(
+          { status: 'failed', retryToken: result.retryToken, error: GENERATION_FAILED_MESSAGE, ...timing },
+          { status: 500, headers }
+        )
+      }
 
-    // Deterministic scoring
-    const scoringResult = scoreArchetypes(diagnostic)
-    const topArchetypes = scoringResult.topArchetypes
+      // Async work via after() — PDF email, Attio enrichment
+      after(() => deliverReport(inputs, result))
 
-    // Load industry-specific recovery rates (single load point — teardown fix S1)
-    const industryRates = await resolveRecoveryRates(diagnostic.firmType)
+      return NextResponse.json({
+        status: 'success',
+        report: result.report,
+        reportId: result.reportId,
+        ...timing,
+      }, { headers })
+    }
 
-    // Observability: warn if YAML not found for a firm type that should have data (teardown fix R1)
-    const firmTypesWithDedicatedYaml = ['accounting', 'agency', 'consulting', 'law', 'technical']
-    if (firmTypesWithDedicatedYaml.includes(diagnostic.firmType)) {
-      const yamlData = await loadIndustryRates(diagnostic.firmType)
-      if (!yamlData) {
-        console.warn(`[planner] Industry YAML not loaded for firmType="${diagnostic.firmType}" — using archetype defaults`)
-      }
+    // Streamed response: progress events, report sections as the model
+    // writes them, then the validated report (see lib/planner/report-stream).
+    // Headers are sent before any phase runs, so timing rides on the final event.
+    const startedAt = Date.now()
+    const elapsedMs = () => Date.now() - startedAt
+    const { readable, writable } = new TransformStream<Uint8Array, Uint8Array>()
+    const writer = writable.getWriter()
+    const emit = (event: GenerateEvent) => {
+      // Writes fail once the client disconnects; generation carries on so
+      // the report is still stored and emailed
+      writer.write(encodeEvent(event)).catch(() => {})
     }
 
-    // Business case calculation (uses industry-specific rates)
-    const businessCase = calculateBusinessCase(sizing, diagnostic, industryRates)
+    emit({ type: 'progress', stage: 'validated', elapsedMs: elapsedMs() })
+    const generation = generateReport(inputs, {
+      timer,
+      onProgress: (stage) => emit({ type: 'progress', stage, elapsedMs: elapsedMs() }),
+      onSection: (key, value, index) => emit({ type: 'section', key, index, value, elapsedMs: elapsedMs() }),
+      onReset: () => emit({ type: 'reset', elapsedMs: elapsedMs() }),
+    })
+      .then((result) => {
+        const timing = debugTiming ? { timing: timer.summary() } : {}
+        if (result.status === 'success') {
+          emit({ type: 'done', status: 'success', report: result.report, reportId: result.reportId, elapsedMs: elapsedMs(), ...timing })
+        } else {
+          emit({ type: 'error', error: GENERATION_FAILED_MESSAGE, retryToken: result.retryToken, elapsedMs: elapsedMs(), ...timing })
+        }
+        return result
+      })
+      .catch((error) => {
+        console.error('Generate route error:', error)
+        emit({ type: 'error', error: 'Internal error', elapsedMs: elapsedMs() })
+        return null
+      })
+      .finally(() => writer.close().catch(() => {}))
+
+    // Async work via after() once the streamed report is complete
+    after(async () => {
+      const result = await generation
+      if (result?.status === 'success') await deliverReport(inputs, result)
+    })
 
-    // Load firm-type RAG content from industry YAML (graceful fallback)
-    const firmTypeContent = await loadFirmTypeContent(diagnostic.firmType)
+    return new Response(readable, {
+      headers: {
+        'Content-Type': STREAM_CONTENT_TYPE,
+        'Cache-Control': 'no-cache, no-transform',
+        'X-Accel-Buffering': 'no',
+      },
+    })
+  } catch (error) {
+    console.error('Generate route error:', error)
+    return NextResponse.json({ error: 'Internal error' }, { status: 500 })
+  }
+}
 
-    // Build AI prompts
-    const systemPrompt = buildSystemPrompt(topArchetypes, firmTypeContent, companyContext)
-    const userPrompt = buildUserPrompt(
-      qualification,
-      diagnostic,
-      sizing,
-      topArchetypes,
-      businessCase,
-      scoringResult.allScores,
-      companyContext,
-      industryRates
-    )
+interface GenerateInputs {
+  qualification: QualificationData
+  diagnostic: DiagnosticData
+  sizing: SizingEntry[]
+  baseUrl: string
+}
 
-    // Call Anthropic
-    const anthropic = new Anthropic()
-    const reportId = uuidv4()
-    let report: GeneratedReport
+interface GenerateHooks {
+  timer?: PhaseTimer
+  onProgress?: (stage: GenerateStage) => void
+  onSection?: (key: string, value: unknown, index?: number) => void
+  onReset?: () => void
+}
 
-    try {
-      report = await callAnthropicWithRetry(
-        anthropic,
-        systemPrompt,
-        userPrompt,
-        reportId,
-        businessCase
-      )
-    } catch (aiError) {
-      console.error('AI generation failed:', aiError)
+type GenerateResult =
+  | {
+      status: 'success'
+      report: GeneratedReport
+      reportId: string
+      topArchetypes: RankedArchetype[]
+      businessCase: BusinessCase
+    }
+  | { status: 'failed'; retryToken: string }
+
+/**
+ * Score, build prompts, call the model and store the report in KV.
+ * Hooks report progress and report sections for streamed responses.
+ */
+async function generateReport(inputs: GenerateInputs, hooks: GenerateHooks = {}): Promise<GenerateResult> {
+  const { qualification, diagnostic, sizing } = inputs
+  const timer = hooks.timer ?? new PhaseTimer()
+
+  // Company website scrape (non-blocking — undefined on failure)
+  let companyContext: string | undefined
+  const { companyWebsite } = qualification
+  if (companyWebsite) {
+    hooks.onProgress?.('scrape')
+    companyContext = await timer.time('scrape', () => scrapeCompanyContext(companyWebsite))
+  }
 
-      // Store inputs in KV for retry
-      const retryToken = uuidv4()
-      try {
-        await kv.set(
-          `planner:retry:${retryToken}`,
-          {
-            qualification,
-            diagnostic,
-            sizing,
-            status: 'pending',
-            createdAt: new Date().toISOString(),
-          },
-          { ex: 60 * 60 * 24 } // 24 hour TTL
-        )
-      } catch {
-        // KV unavailable — can't store for retry
-      }
+  // Deterministic scoring
+  hooks.onProgress?.('scoring')
+  const scoringResult = await timer.time('scoring', () => scoreArchetypes(diagnostic))
+  const topArchetypes = scoringResult.topArchetypes
 
-      return NextResponse.json(
-        { status: 'failed', retryToken, error: 'Report generation failed. You can retry using the button below.' },
-        { status: 500 }
-      )
+  // Load industry-specific recovery rates (single load point — teardown fix S1)
+  const industryRates = await timer.time('recovery_rates', () => resolveRecoveryRates(diagnostic.firmType))
+
+  // Observability: warn if YAML not found for a firm type that should have data (teardown fix R1)
+  const firmTypesWithDedicatedYaml = ['accounting', 'agency', 'consulting', 'law', 'technical']
+  if (firmTypesWithDedicatedYaml.includes(diagnostic.firmType)) {
+    const yamlData = await timer.time('industry_yaml', () => loadIndustryRates(diagnostic.firmType))
+    if (!yamlData) {
+      console.warn(`[planner] Industry YAML not loaded for firmType="${diagnostic.firmType}" — using archetype defaults`)
     }
+  }
+
+  // Business case calculation (uses industry-specific rates)
+  const businessCase = await timer.time('business_case', () => calculateBusinessCase(sizing, diagnostic, industryRates))
+
+  // Load firm-type RAG content from industry YAML (graceful fallback)
+  const firmTypeContent = await timer.time('firm_content', () => loadFirmTypeContent(diagnostic.firmType))
+
+  // Build AI prompts
+  hooks.onProgress?.('prompt')
+  const promptStart = performance.now()
+  const systemPrompt = buildSystemPrompt(topArchetypes, firmTypeContent, companyContext)
+  const userPrompt = buildUserPrompt(
+    qualification,
+    diagnostic,
+    sizing,
+    topArchetypes,
+    businessCase,
+    scoringResult.allScores,
+    companyContext,
+    industryRates
+  )
+  timer.record('prompt', promptStart)
+
+  // Call Anthropic
+  hooks.onProgress?.('generating')
+  const anthropic = new Anthropic()
+  const reportId = uuidv4()
+  let report: GeneratedReport
 
-    // Store report in KV BEFORE returning response (teardown fix)
+  try {
+    report = await callAnthropicWithRetry(
+      anthropic,
+      systemPrompt,
+      userPrompt,
+      reportId,
+      businessCase,
+      hooks
+    )
+  } catch (aiError) {
+    console.error('AI generation failed:', aiError)
+
+    // Store inputs in KV for retry
+    const retryToken = uuidv4()
     try {
       await kv.set(
-        `planner:report:${reportId}`,
+        `planner:retry:${retryToken}`,
         {
-          report,
-          email: qualification.email,
-          company: qualification.company,
-          name: qualification.name,
           qualification,
           diagnostic,
-          topArchetypes,
-          theoreticalMax: scoringResult.theoreticalMax,
-          companyContext,
+          sizing,
+          status: 'pending',
           createdAt: new Date().toISOString(),
         },
-        { ex: KV_REPORT_TTL }
+        { ex: 60 * 60 * 24 } // 24 hour TTL
       )
-    } catch (kvError) {
-      console.error('KV store failed:', kvError)
-      // Continue — the report is still returned to the client
+    } catch {
+      // KV unavailable — can't store for retry
     }
 
-    // Async work via after() — PDF email, Attio enrichment
-    after(async () => {
-      // Priority 1: Email with PDF
-      try {
-        if (process.env.RESEND_API_KEY) {
-          const { Resend } = await import('resend')
-          const resend = new Resend(process.env.RESEND_API_KEY)
-
-          await resend.emails.send({
-            from: 'Leomayn <website@leomayn.com>',
-            to: qualification.email,
-            subject: `Your AI Deployment Planner: ${escapeHtml(qualification.company)}`,
-            html: buildEmailHtml(qualification.name, qualification.company, reportId, baseUrl),
-          })
-        }
-      } catch (emailError) {
-        console.error('Email delivery failed:', emailError)
-      }
+    return { status: 'failed', retryToken }
+  }
 
-      // Priority 1b: Internal notification to Tom
-      try {
-        if (process.env.RESEND_API_KEY) {
-          const { Resend } = await import('resend')
-          const resend = new Resend(process.env.RESEND_API_KEY)
-
-          const fmt = new Intl.NumberFormat('en-GB', { style: 'currency', currency: 'GBP', maximumFractionDigits: 0 })
-          const pdfUrl = `${baseUrl}/api/planner/pdf/${reportId}`
-          const painSummary = diagnostic.painPoints
-            .map((p: { area: string; symptom: string }) => `${p.area} → ${p.symptom}`)
-            .join(', ')
-          const archetypeSummary = topArchetypes
-            .map((a: { name: string; compositeScore: number }, i: number) => `${i + 1}. ${a.name} (${a.compositeScore})`)
-            .join('<br/>')
-
-          await resend.emails.send({
-            from: 'Leomayn <website@leomayn.com>',
-            to: 'tom@leomayn.com',
-            subject: `New planner report: ${qualification.name} @ ${qualification.company}`,
-            html: `
-              <div style="font-family: sans-serif; max-width: 600px; color: #1a3d56;">
-                <p><strong>${escapeHtml(qualification.name)}</strong> (${escapeHtml(qualification.email)})<br/>
-                ${escapeHtml(qualification.company)} · ${diagnostic.firmType} · ${diagnostic.teamSize} staff</p>
-                <p><strong>Focus:</strong> ${diagnostic.strategicFocus.primary} (primary), ${diagnostic.strategicFocus.secondary} (secondary)<br/>
-                <strong>Pain:</strong> ${painSummary}<br/>
-                <strong>AI adoption:</strong> ${diagnostic.aiAdoption} · <strong>Tech:</strong> ${diagnostic.techEnvironment}</p>
-                <p><strong>Top archetypes:</strong><br/>${archetypeSummary}</p>
-                <p><strong>Business case:</strong> ${fmt.format(businessCase.totalAnnualCost)} annual cost · Recovery ${fmt.format(businessCase.conservativeRecovery.low)}–${fmt.format(businessCase.conservativeRecovery.high)}</p>
-                <p><a href="${pdfUrl}">View PDF report</a></p>
-              </div>
-            `,
-          })
-        }
-      } catch (notifyError) {
-        console.error('Internal notification failed:', notifyError)
-      }
+  // Store report in KV BEFORE returning response (teardown fix)
+  const kvStart = performance.now()
+  try {
+    await kv.set(
+      `planner:report:${reportId}`,
+      {
+        report,
+        email: qualification.email,
+        company: qualification.company,
+        name: qualification.name,
+        qualification,
+        diagnostic,
+        topArchetypes,
+        theoreticalMax: scoringResult.theoreticalMax,
+        companyContext,
+        createdAt: new Date().toISOString(),
+      },
+      { ex: KV_REPORT_TTL }
+    )
+  } catch (kvError) {
+    console.error('KV store failed:', kvError)
+    // Continue — the report is still returned to the client
+  }
+  timer.record('kv_write', kvStart)
 
-      // Priority 2: Attio enrichment
-      try {
-        const enrichmentNotes = [
-          `Diagnostic completed: ${new Date().toISOString()}`,
-          `Firm type: ${diagnostic.firmType}`,
-          `Team size: ${diagnostic.teamSize}`,
-          `Strategic focus: ${diagnostic.strategicFocus.primary} (primary), ${diagnostic.strategicFocus.secondary} (secondary)`,
-          `Pain points: ${diagnostic.painPoints.map((p: { area: string; symptom: string }) => `${p.area}:${p.symptom}`).join(', ')}`,
-          `Process knowledge: ${diagnostic.processKnowledge}`,
-          `Data foundations: ${diagnostic.dataFoundations}`,
-          `AI adoption: ${diagnostic.aiAdoption}`,
-          `Top archetypes: ${topArchetypes.map((a: { name: string; compositeScore: number }) => `${a.name} (${a.compositeScore})`).join(', ')}`,
-          `Annual cost: ${new Intl.NumberFormat('en-GB', { style: 'currency', currency: 'GBP', maximumFractionDigits: 0 }).format(businessCase.totalAnnualCost)}`,
-          `Recovery range: ${new Intl.NumberFormat('en-GB', { style: 'currency', currency: 'GBP', maximumFractionDigits: 0 }).format(businessCase.conservativeRecovery.low)} - ${new Intl.NumberFormat('en-GB', { style: 'currency', currency: 'GBP', maximumFractionDigits: 0 }).format(businessCase.conservativeRecovery.high)}`,
-        ].join('\n')
-
-        await upsertAttioPerson({
-          email: qualification.email,
-          name: qualification.name,
-          company: qualification.company,
-          description: enrichmentNotes,
-        })
-      } catch (attioError) {
-        console.error('Attio enrichment failed:', attioError)
-      }
+  return { status: 'success', report, reportId, topArchetypes, businessCase }
+}
 
-      // Priority 3: Supabase lead update with diagnostic data
-      try {
-        await updatePlannerLead(qualification.email, {
-          firm_type: diagnostic.firmType,
-          team_size: diagnostic.teamSize,
-          strategic_focus: diagnostic.strategicFocus,
-          pain_points: diagnostic.painPoints,
-          process_knowledge: diagnostic.processKnowledge,
-          data_foundations: diagnostic.dataFoundations,
-          ai_adoption: diagnostic.aiAdoption,
-          top_archetypes: topArchetypes.map((a) => ({
-            id: a.id,
-            name: a.name,
-            score: a.compositeScore,
-          })),
-          business_case: businessCase,
-          report_id: reportId,
-          report_generated_at: new Date().toISOString(),
-        })
-      } catch (supabaseError) {
-        console.error('Supabase lead update failed:', supabaseError)
-      }
+/**
+ * Post-response work: PDF email, internal notification, Attio enrichment
+ * and the Supabase lead update.
+ */
+async function deliverReport(
+  inputs: GenerateInputs,
+  result: Extract<GenerateResult, { status: 'success' }>
+): Promise<void> {
+  const { qualification, diagnostic, baseUrl } = inputs
+  const { reportId, topArchetypes, businessCase } = result
+  const timer = new PhaseTimer()
+
+  // Priority 1: Email with PDF
+  let phaseStart = performance.now()
+  try {
+    if (process.env.RESEND_API_KEY) {
+      const { Resend } = await import('resend')
+      const resend = new Resend(process.env.RESEND_API_KEY)
+
+      await resend.emails.send({
+        from: 'Leomayn <website@leomayn.com>',
+        to: qualification.email,
+        subject: `Your AI Deployment Planner: ${escapeHtml(qualification.company)}`,
+        html: buildEmailHtml(qualification.name, qualification.company, reportId, baseUrl),
+      })
+    }
+  } catch (emailError) {
+    console.error('Email delivery failed:', emailError)
+  }
+
+  timer.record('email', phaseStart)
+
+  // Priority 1b: Internal notification to Tom
+  phaseStart = performance.now()
+  try {
+    if (process.env.RESEND_API_KEY) {
+      const { Resend } = await import('resend')
+      const resend = new Resend(process.env.RESEND_API_KEY)
+
+      const fmt = new Intl.NumberFormat('en-GB', { style: 'currency', currency: 'GBP', maximumFractionDigits: 0 })
+      const pdfUrl = `${baseUrl}/api/planner/pdf/${reportId}`
+      const painSummary = diagnostic.painPoints
+        .map((p: { area: string; symptom: string }) => `${p.area} → ${p.symptom}`)
+        .join(', ')
+      const archetypeSummary = topArchetypes
+        .map((a: { name: string; compositeScore: number }, i: number) => `${i + 1}. ${a.name} (${a.compositeScore})`)
+        .join('<br/>')
+
+      await resend.emails.send({
+        from: 'Leomayn <website@leomayn.com>',
+        to: 'tom@leomayn.com',
+        subject: `New planner report: ${qualification.name} @ ${qualification.company}`,
+        html: `
+          <div style="font-family: sans-serif; max-width: 600px; color: #1a3d56;">
+            <p><strong>${escapeHtml(qualification.name)}</strong> (${escapeHtml(qualification.email)})<br/>
+            ${escapeHtml(qualification.company)} · ${diagnostic.firmType} · ${diagnostic.teamSize} staff</p>
+            <p><strong>Focus:</strong> ${diagnostic.strategicFocus.primary} (primary), ${diagnostic.strategicFocus.secondary} (secondary)<br/>
+            <strong>Pain:</strong> ${painSummary}<br/>
+            <strong>AI adoption:</strong> ${diagnostic.aiAdoption} · <strong>Tech:</strong> ${diagnostic.techEnvironment}</p>
+            <p><strong>Top archetypes:</strong><br/>${archetypeSummary}</p>
+            <p><strong>Business case:</strong> ${fmt.format(businessCase.totalAnnualCost)} annual cost · Recovery ${fmt.format(businessCase.conservativeRecovery.low)}–${fmt.format(businessCase.conservativeRecovery.high)}</p>
+            <p><a href="${pdfUrl}">View PDF report</a></p>
+          </div>
+        `,
+      })
+    }
+  } catch (notifyError) {
+    console.error('Internal notification failed:', notifyError)
+  }
+
+  timer.record('notify', phaseStart)
+
+  // Priority 2: Attio enrichment
+  phaseStart = performance.now()
+  try {
+    const enrichmentNotes = [
+      `Diagnostic completed: ${new Date().toISOString()}`,
+      `Firm type: ${diagnostic.firmType}`,
+      `Team size: ${diagnostic.teamSize}`,
+      `Strategic focus: ${diagnostic.strategicFocus.primary} (primary), ${diagnostic.strategicFocus.secondary} (secondary)`,
+      `Pain points: ${diagnostic.painPoints.map((p: { area: string; symptom: string }) => `${p.area}:${p.symptom}`).join(', ')}`,
+      `Process knowledge: ${diagnostic.processKnowledge}`,
+      `Data foundations: ${diagnostic.dataFoundations}`,
+      `AI adoption: ${diagnostic.aiAdoption}`,
+      `Top archetypes: ${topArchetypes.map((a: { name: string; compositeScore: number }) => `${a.name} (${a.compositeScore})`).join(', ')}`,
+      `Annual cost: ${new Intl.NumberFormat('en-GB', { style: 'currency', currency: 'GBP', maximumFractionDigits: 0 }).format(businessCase.totalAnnualCost)}`,
+      `Recovery range: ${new Intl.NumberFormat('en-GB', { style: 'currency', currency: 'GBP', maximumFractionDigits: 0 }).format(businessCase.conservativeRecovery.low)} - ${new Intl.NumberFormat('en-GB', { style: 'currency', currency: 'GBP', maximumFractionDigits: 0 }).format(businessCase.conservativeRecovery.high)}`,
+    ].join('\n')
+
+    await upsertAttioPerson({
+      email: qualification.email,
+      name: qualification.name,
+      company: qualification.company,
+      description: enrichmentNotes,
     })
+  } catch (attioError) {
+    console.error('Attio enrichment failed:', attioError)
+  }
 
-    return NextResponse.json({
-      status: 'success',
-      report,
-      reportId,
+  timer.record('attio', phaseStart)
+
+  // Priority 3: Supabase lead update with diagnostic data
+  phaseStart = performance.now()
+  try {
+    await updatePlannerLead(qualification.email, {
+      firm_type: diagnostic.firmType,
+      team_size: diagnostic.teamSize,
+      strategic_focus: diagnostic.strategicFocus,
+      pain_points: diagnostic.painPoints,
+      process_knowledge: diagnostic.processKnowledge,
+      data_foundations: diagnostic.dataFoundations,
+      ai_adoption: diagnostic.aiAdoption,
+      top_archetypes: topArchetypes.map((a) => ({
+        id: a.id,
+        name: a.name,
+        score: a.compositeScore,
+      })),
+      business_case: businessCase,
+      report_id: reportId,
+      report_generated_at: new Date().toISOString(),
     })
-  } catch (error) {
-    console.error('Generate route error:', error)
-    return NextResponse.json({ error: 'Internal error' }, { status: 500 })
+  } catch (supabaseError) {
+    console.error('Supabase lead update failed:', supabaseError)
   }
+  timer.record('supabase', phaseStart)
+
+  // Runs after the response, so it can only be logged
+  console.info(`[planner] after() timing for ${reportId}: ${timer.header()}`)
+}
+
+/**
+ * Announce a retry. Sections already streamed came from the failed
+ * attempt, so clients are told to discard them before the new ones arrive.
+ */
+function startRetry(hooks: GenerateHooks) {
+  hooks.onProgress?.('retrying')
+  hooks.onReset?.()
 }
 
 async function callAnthropicWithRetry(
@@ -366,16 +496,31 @@ async function callAnthropicWithRetry(
   systemPrompt: string,
   userPrompt: string,
   reportId: string,
-  businessCase: import('@/lib/planner/types').BusinessCase,
+  businessCase: BusinessCase,
+  hooks: GenerateHooks = {},
   attempt = 1
 ): Promise<GeneratedReport> {
-  const response = await anthropic.messages.create({
+  const params: Anthropic.MessageCreateParamsNonStreaming = {
     model: 'claude-sonnet-4-5-20250929',
     max_tokens: 4000,
     temperature: 0.3,
     system: systemPrompt,
     messages: [{ role: 'user', content: userPrompt }],
-  })
+  }
+
+  const phase = attempt === 1 ? 'anthropic' : 'anthropic_retry'
+  const callStart = performance.now()
+  let response: Anthropic.Message
+  if (hooks.onSection) {
+    // Stream so completed sections can be forwarded while the rest is written
+    const parser = createSectionParser(hooks.onSection)
+    const stream = anthropic.messages.stream(params)
+    stream.on('text', (delta) => parser.push(delta))
+    response = await stream.finalMessage()
+  } else {
+    response = await anthropic.messages.create(params)
+  }
+  hooks.timer?.record(phase, callStart)
 
   const textBlock = response.content.find(c => c.type === 'text')
   if (!textBlock || textBlock.type !== 'text') {
@@ -395,7 +540,8 @@ async function callAnthropicWithRetry(
     if (attempt < 2) {
       // Retry with error feedback
       const retryPrompt = `${userPrompt}\n\nIMPORTANT: Your previous response was not valid JSON. Return ONLY valid JSON with no markdown formatting, no code fences, no commentary. The response must be parseable by JSON.parse().`
-      return callAnthropicWithRetry(anthropic, systemPrompt, retryPrompt, reportId, businessCase, 2)
+      startRetry(hooks)
+      return callAnthropicWithRetry(anthropic, systemPrompt, retryPrompt, reportId, businessCase, hooks, 2)
     }
     throw new Error('AI output was not valid JSON after retry')
   }
@@ -409,11 +555,15 @@ async function callAnthropicWithRetry(
   }
 
   try {
-    return validateReportSchema(withMeta)
+    const validateStart = performance.now()
+    const report = validateReportSchema(withMeta)
+    hooks.timer?.record('validate', validateStart)
+    return report
   } catch (validationError) {
     if (attempt < 2) {
       const retryPrompt = `${userPrompt}\n\nIMPORTANT: Your previous response had schema validation errors. Ensure: workflows array has exactly 3 items, each with all required fields (archetypeId, name, whyThisMatters, impactPotential, implementationComplexity, threeConditionsCheck, currentState, futureState, considerations, prerequisites, pitfalls). impactPotential and implementationComplexity must be "high", "medium", or "low". threeConditionsCheck values (impact, complexity, learning) must be "green", "amber", or "red" — NOT booleans. Include a priorityMapIntro string (2 sentences).`
-      return callAnthropicWithRetry(anthropic, systemPrompt, retryPrompt, reportId, businessCase, 2)
+      startRetry(hooks)
+      return callAnthropicWithRetry(anthropic, systemPrompt, retryPrompt, reportId, businessCase, hooks, 2)
     }
     throw validationError
   }
@@ -1,6 +1,7 @@
 'use client'
 
 import { useState, useEffect } from 'react'
+import type { GenerateStage } from '@/lib/planner/report-stream'
 
 const INSIGHTS = [
   'We look for seven diagnostic signals across each operational area you identified.',
@@ -17,9 +18,30 @@ const STAGES = [
   'Writing your personalised report',
 ]
 
-export default function GeneratingScreen() {
+// Server progress stage -> index into STAGES
+const STAGE_INDEX: Record<GenerateStage, number> = {
+  validated: 0,
+  scrape: 0,
+  scoring: 1,
+  prompt: 2,
+  generating: 3,
+  retrying: 3,
+}
+
+const WORKFLOW_COUNT = 3
+
+export interface GenerateProgress {
+  stage: GenerateStage | null
+  // Workflows streamed by the current attempt (zeroed by a 'reset' event)
+  workflowsWritten: number
+}
+
+export default function GeneratingScreen({ progress }: { progress?: GenerateProgress }) {
   const [insightIndex, setInsightIndex] = useState(0)
-  const [stageIndex, setStageIndex] = useState(0)
+  const [timedStageIndex, setTimedStageIndex] = useState(0)
+  // Real progress from a streamed response; timed stages otherwise
+  const stageIndex = progress?.stage ? STAGE_INDEX[progress.stage] : timedStageIndex
+  const workflowsWritten = progress?.workflowsWritten ?? 0
 
   useEffect(() => {
     const interval = setInterval(() => {
@@ -29,11 +51,12 @@ export default function GeneratingScreen() {
   }, [])
 
   useEffect(() => {
+    if (progress?.stage) return
     const interval = setInterval(() => {
-      setStageIndex(prev => Math.min(prev + 1, STAGES.length - 1))
+      setTimedStageIndex(prev => Math.min(prev + 1, STAGES.length - 1))
     }, 4000)
     return () => clearInterval(interval)
-  }, [])
+  }, [progress?.stage])
 
   return (
     <div className="text-center py-16 sm:py-24">
@@ -68,6 +91,9 @@ export default function GeneratingScreen() {
             )}
             <span className={`text-sm ${i === stageIndex ? 'text-slate font-medium' : 'text-steel'}`}>
               {stage}
+              {i === STAGES.length - 1 && workflowsWritten > 0 && (
+                <span className="text-steel font-normal"> · {Math.min(workflowsWritten, WORKFLOW_COUNT)} of {WORKFLOW_COUNT} workflows</span>
+              )}
             </span>
           </div>
         ))}
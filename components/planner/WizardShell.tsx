@@ -6,14 +6,19 @@ import ProgressBar from './ProgressBar'
 import QualificationStep from './steps/QualificationStep'
 import DiagnosticStep from './steps/DiagnosticStep'
 import SizingStep from './steps/SizingStep'
-import GeneratingScreen from './GeneratingScreen'
+import GeneratingScreen, { type GenerateProgress } from './GeneratingScreen'
+import { STREAM_CONTENT_TYPE, readEvents } from '@/lib/planner/report-stream'
+import type { GeneratedReport } from '@/lib/planner/types'
 import ReportView from './ReportView'
 
+const NO_PROGRESS: GenerateProgress = { stage: null, workflowsWritten: 0 }
+
 export default function WizardShell() {
   const { state, setReport, setStep } = usePlanner()
   const [generating, setGenerating] = useState(false)
   const [generateError, setGenerateError] = useState('')
   const [retryToken, setRetryToken] = useState<string | null>(null)
+  const [progress, setProgress] = useState<GenerateProgress>(NO_PROGRESS)
   const generationStarted = useRef(false)
 
   // Scroll to top on step transitions
@@ -41,11 +46,12 @@ export default function WizardShell() {
     setGenerating(true)
     setGenerateError('')
     setRetryToken(null)
+    setProgress(NO_PROGRESS)
 
     try {
       const response = await fetch('/api/planner/generate', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', Accept: STREAM_CONTENT_TYPE },
         body: JSON.stringify({
           qualification: state.qualification,
           diagnostic: state.diagnostic,
@@ -53,9 +59,30 @@ export default function WizardShell() {
         }),
       })
 
-      const data = await response.json()
+      let data: { status?: string; report?: GeneratedReport; error?: string; retryToken?: string }
+      const contentType = response.headers.get('content-type') ?? ''
+      if (response.ok && response.body && contentType.includes(STREAM_CONTENT_TYPE)) {
+        // Streamed: follow real progress until the done (or error) event
+        data = { error: 'Report generation was interrupted. Please try again.' }
+        await readEvents(response.body, (event) => {
+          if (event.type === 'progress') {
+            setProgress(prev => ({ ...prev, stage: event.stage }))
+          } else if (event.type === 'reset') {
+            // Sections so far came from a failed attempt; the retry writes them again
+            setProgress(prev => ({ ...prev, workflowsWritten: 0 }))
+          } else if (event.type === 'section' && event.key === 'workflows') {
+            setProgress(prev => ({ ...prev, workflowsWritten: prev.workflowsWritten + 1 }))
+          } else if (event.type === 'done') {
+            data = { status: event.status, report: event.report }
+          } else if (event.type === 'error') {
+            data = { error: event.error, retryToken: event.retryToken }
+          }
+        })
+      } else {
+        data = await response.json()
+      }
 
-      if (!response.ok) {
+      if (!response.ok || data.error) {
         if (data.retryToken) {
           setRetryToken(data.retryToken)
         }
@@ -114,7 +141,7 @@ export default function WizardShell() {
             </div>
           )
         }
-        return <GeneratingScreen />
+        return <GeneratingScreen progress={progress} />
       default:
         return <QualificationStep />
     }
@@ -78,7 +78,7 @@ export default function CountUp({
 
   // Always render with ref so useInView can observe the element
   return (
-    <span ref={ref} className={className} style={{ fontFamily: 'inherit' }}>
+    <span ref={ref} className={className} style={{ fontFamily: 'inherit' }} data-qa-mask>
       {prefix}{displayValue}{suffix}
     </span>
   )
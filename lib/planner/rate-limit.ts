@@ -0,0 +1,92 @@
+/**
+ * Generation rate limits for the planner.
+ * A Lua script checks the global daily cap and the per-email limit and
+ * increments both in one atomic KV round trip, so concurrent requests
+ * can't both pass the check before either increments.
+ * scripts/bench-rate-limit.py runs these same scripts against a local KV.
+ */
+
+import { kv } from '@vercel/kv'
+
+export const DAILY_GENERATION_LIMIT = 50
+export const PER_EMAIL_DAILY_LIMIT = 3
+
+const KV_DAILY_CAP_KEY = 'planner:daily-cap'
+const DAY_SECONDS = 60 * 60 * 24
+
+/**
+ * fixed: counters per calendar day (UTC), reset at midnight.
+ * sliding: timestamps in sorted sets, counting the last 24 hours.
+ */
+export type RateLimitWindow = 'fixed' | 'sliding'
+
+export interface RateLimitResult {
+  allowed: boolean
+  reason?: string
+}
+
+// KEYS: daily counter, email counter
+// ARGV: daily limit, email limit, TTL seconds
+// Returns {allowed, reason code (1 daily, 2 email), count}
+export const FIXED_WINDOW_SCRIPT = `
+local daily = tonumber(redis.call('GET', KEYS[1]) or '0')
+if daily >= tonumber(ARGV[1]) then return {0, 1, daily} end
+local email = tonumber(redis.call('GET', KEYS[2]) or '0')
+if email >= tonumber(ARGV[2]) then return {0, 2, email} end
+daily = redis.call('INCR', KEYS[1])
+if daily == 1 then redis.call('EXPIRE', KEYS[1], ARGV[3]) end
+email = redis.call('INCR', KEYS[2])
+if email == 1 then redis.call('EXPIRE', KEYS[2], ARGV[3]) end
+return {1, 0, daily}
+`
+
+// KEYS: daily log, email log (sorted sets scored by time)
+// ARGV: daily limit, email limit, window ms, now ms, unique member
+export const SLIDING_WINDOW_SCRIPT = `
+local cutoff = tonumber(ARGV[4]) - tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', cutoff)
+local daily = redis.call('ZCARD', KEYS[1])
+if daily >= tonumber(ARGV[1]) then return {0, 1, daily} end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', cutoff)
+local email = redis.call('ZCARD', KEYS[2])
+if email >= tonumber(ARGV[2]) then return {0, 2, email} end
+redis.call('ZADD', KEYS[1], ARGV[4], ARGV[5])
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[5])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+redis.call('PEXPIRE', KEYS[2], ARGV[3])
+return {1, 0, daily + 1}
+`
+
+const REASONS: Record<number, string> = {
+  1: 'Daily generation limit reached. Please try again tomorrow.',
+  2: 'You have reached the maximum reports per day. Please try again tomorrow.',
+}
+
+export async function checkRateLimits(
+  email: string,
+  window: RateLimitWindow = 'fixed'
+): Promise<RateLimitResult> {
+  try {
+    let result: [number, number, number]
+    if (window === 'fixed') {
+      const today = new Date().toISOString().slice(0, 10)
+      result = await kv.eval(
+        FIXED_WINDOW_SCRIPT,
+        [`${KV_DAILY_CAP_KEY}:${today}`, `planner:email:${email}:${today}`],
+        [DAILY_GENERATION_LIMIT, PER_EMAIL_DAILY_LIMIT, DAY_SECONDS]
+      )
+    } else {
+      result = await kv.eval(
+        SLIDING_WINDOW_SCRIPT,
+        [`${KV_DAILY_CAP_KEY}:log`, `planner:email-log:${email}`],
+        [DAILY_GENERATION_LIMIT, PER_EMAIL_DAILY_LIMIT, DAY_SECONDS * 1000, Date.now(), crypto.randomUUID()]
+      )
+    }
+
+    const [allowed, reason] = result
+    return allowed === 1 ? { allowed: true } : { allowed: false, reason: REASONS[reason] }
+  } catch {
+    // If KV is unavailable, allow the request (fail open for availability)
+    return { allowed: true }
+  }
+}
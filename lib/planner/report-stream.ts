@@ -0,0 +1,146 @@
+/**
+ * Streamed generate responses.
+ * The generate route sends newline-delimited JSON events when the client
+ * asks for `application/x-ndjson`; this module holds the event types and
+ * the incremental parser that turns model text deltas into report sections.
+ */
+
+import type { TimingSummary } from './timing'
+import type { GeneratedReport } from './types'
+
+export const STREAM_CONTENT_TYPE = 'application/x-ndjson'
+
+export type GenerateStage = 'validated' | 'scrape' | 'scoring' | 'prompt' | 'generating' | 'retrying'
+
+// 'reset' precedes a retried model call: sections sent before it came from
+// the failed attempt and should be discarded
+export type GenerateEvent =
+  | { type: 'progress'; stage: GenerateStage; elapsedMs: number }
+  | { type: 'section'; key: string; index?: number; value: unknown; elapsedMs: number }
+  | { type: 'reset'; elapsedMs: number }
+  | { type: 'done'; status: 'success'; report: GeneratedReport; reportId: string; elapsedMs: number; timing?: TimingSummary }
+  | { type: 'error'; error: string; retryToken?: string; elapsedMs: number; timing?: TimingSummary }
+
+export function encodeEvent(event: GenerateEvent): Uint8Array {
+  return new TextEncoder().encode(`${JSON.stringify(event)}\n`)
+}
+
+/**
+ * Read a streamed generate response, calling onEvent for each event.
+ */
+export async function readEvents(
+  body: ReadableStream<Uint8Array>,
+  onEvent: (event: GenerateEvent) => void
+): Promise<void> {
+  const reader = body.getReader()
+  const decoder = new TextDecoder()
+  let buffered = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    buffered += decoder.decode(value, { stream: !done })
+    const lines = buffered.split('\n')
+    buffered = lines.pop() ?? ''
+    for (const line of lines) {
+      if (line.trim()) onEvent(JSON.parse(line) as GenerateEvent)
+    }
+    if (done) break
+  }
+  if (buffered.trim()) onEvent(JSON.parse(buffered) as GenerateEvent)
+}
+
+/**
+ * Incremental scanner over the model's JSON output.
+ * Calls onSection once per completed top-level field, and once per
+ * completed object inside a top-level array (e.g. each workflow), so
+ * sections arrive while the rest of the report is still being written.
+ * Values are the model's raw output — the final report is still
+ * validated before it is returned.
+ */
+export function createSectionParser(
+  onSection: (key: string, value: unknown, index?: number) => void
+) {
+  let buffer = ''
+  let pos = 0
+  let started = false
+  let depth = 0
+  let inString = false
+  let escaped = false
+  let stringStart = -1
+  let lastString = ''
+  let currentKey: string | null = null
+  let valueStart = -1
+  let arrayOfKey: string | null = null
+  let elementStart = -1
+  let elementIndex = 0
+
+  function emit(key: string, text: string, index?: number) {
+    try {
+      onSection(key, JSON.parse(text), index)
+    } catch {
+      // Malformed fragment — the final parse reports the real error
+    }
+  }
+
+  function push(text: string) {
+    buffer += text
+    for (; pos < buffer.length; pos++) {
+      const ch = buffer[pos]
+
+      // Skip any code fence or preamble before the opening brace
+      if (!started) {
+        if (ch === '{') {
+          started = true
+          depth = 1
+        }
+        continue
+      }
+
+      if (inString) {
+        if (escaped) escaped = false
+        else if (ch === '\\') escaped = true
+        else if (ch === '"') {
+          inString = false
+          lastString = buffer.slice(stringStart, pos + 1)
+        }
+        continue
+      }
+
+      if (ch === '"') {
+        inString = true
+        stringStart = pos
+      } else if (ch === ':' && depth === 1) {
+        currentKey = JSON.parse(lastString) as string
+        valueStart = pos + 1
+      } else if (ch === '{' || ch === '[') {
+        depth++
+        if (depth === 2 && ch === '[') {
+          arrayOfKey = currentKey
+          elementIndex = 0
+        } else if (depth === 3 && ch === '{' && arrayOfKey) {
+          elementStart = pos
+        }
+      } else if (ch === '}' || ch === ']') {
+        if (depth === 3 && ch === '}' && arrayOfKey && elementStart >= 0) {
+          emit(arrayOfKey, buffer.slice(elementStart, pos + 1), elementIndex++)
+          elementStart = -1
+        }
+        depth--
+        if (depth === 1 && ch === ']') {
+          // Arrays of objects were already sent element by element
+          if (arrayOfKey && elementIndex === 0) emit(arrayOfKey, buffer.slice(valueStart, pos + 1))
+          arrayOfKey = null
+          currentKey = null
+        } else if (depth === 0) {
+          if (currentKey) emit(currentKey, buffer.slice(valueStart, pos).trim())
+          currentKey = null
+          started = false
+        }
+      } else if (ch === ',' && depth === 1 && currentKey) {
+        emit(currentKey, buffer.slice(valueStart, pos).trim())
+        currentKey = null
+      }
+    }
+  }
+
+  return { push }
+}
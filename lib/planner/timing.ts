@@ -0,0 +1,51 @@
+/**
+ * Per-request phase timing for the planner generate route.
+ * Phases are reported in a Server-Timing header (JSON responses) and, for
+ * internal and development calls, as a `timing` debug field that
+ * scripts/test-generate.py prints as a waterfall.
+ */
+
+export interface PhaseTiming {
+  name: string
+  startMs: number
+  durationMs: number
+}
+
+export interface TimingSummary {
+  totalMs: number
+  phases: PhaseTiming[]
+}
+
+function round(ms: number): number {
+  return Math.round(ms * 10) / 10
+}
+
+export class PhaseTimer {
+  private readonly origin = performance.now()
+  private readonly phases: PhaseTiming[] = []
+
+  /** Run fn as the named phase, recording its duration even if it throws. */
+  async time<T>(name: string, fn: () => T | Promise<T>): Promise<T> {
+    const start = performance.now()
+    try {
+      return await fn()
+    } finally {
+      this.record(name, start)
+    }
+  }
+
+  /** Record a phase that started at `start` (a performance.now() value). */
+  record(name: string, start: number, end = performance.now()): void {
+    this.phases.push({ name, startMs: round(start - this.origin), durationMs: round(end - start) })
+  }
+
+  summary(): TimingSummary {
+    return { totalMs: round(performance.now() - this.origin), phases: [...this.phases] }
+  }
+
+  /** Server-Timing header value, phases in the order they ran plus the total. */
+  header(): string {
+    const { totalMs, phases } = this.summary()
+    return [...phases.map((p) => `${p.name};dur=${p.durationMs}`), `total;dur=${totalMs}`].join(', ')
+  }
+}
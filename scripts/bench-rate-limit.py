@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Benchmark the planner's generation rate limiter against a local KV.
+
+Runs the same burst of concurrent checks through three strategies:
+
+  legacy   - the old checkRateLimits: GET, GET, INCR, EXPIRE, INCR, EXPIRE
+             as six sequential round trips, with a gap between check and
+             increment that concurrent requests slip through
+  fixed    - FIXED_WINDOW_SCRIPT from lib/planner/rate-limit.ts, one EVAL
+  sliding  - SLIDING_WINDOW_SCRIPT, one EVAL
+
+The Lua is read straight from rate-limit.ts, so the benchmark always runs
+what the route runs. By default it talks the Upstash REST protocol to
+scripts/mock-kv.py (which needs lupa for EVAL); --redis runs it against a
+real Redis via redis-py instead.
+
+Usage:
+  python scripts/mock-kv.py &
+  python scripts/bench-rate-limit.py                        # 400 checks, 20 emails
+  python scripts/bench-rate-limit.py --rtt 5                # Add 5ms per round trip
+  python scripts/bench-rate-limit.py --concurrency 64 --requests 2000
+  python scripts/bench-rate-limit.py --redis redis://localhost:6379/0
+
+--rtt sleeps client-side before every round trip, standing in for the
+function-to-KV network hop that localhost hides. Each run uses fresh
+bench:<run>:<strategy>: keys, so it never touches planner keys.
+
+The report shows round trips and latency per check, and how many checks
+were allowed against what the limits permit: a correct limiter allows
+exactly min(daily limit, sum over emails of min(email limit, attempts)),
+and no email more than the per-email limit. It is saved under
+scripts/test-fixtures/runs/.
+"""
+
+import argparse
+import http.client
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
+
+from qa_stats import percentile
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+RATE_LIMIT_SOURCE = SCRIPT_DIR.parent / "lib" / "planner" / "rate-limit.ts"
+RUNS_DIR = SCRIPT_DIR / "test-fixtures" / "runs"
+
+DEFAULT_KV_URL = "http://localhost:8079"
+DEFAULT_KV_TOKEN = "local"
+
+# Mirrors DAILY_GENERATION_LIMIT / PER_EMAIL_DAILY_LIMIT
+DEFAULT_DAILY_LIMIT = 50
+DEFAULT_EMAIL_LIMIT = 3
+DAY_SECONDS = 60 * 60 * 24
+
+STRATEGIES = ("legacy", "fixed", "sliding")
+
+
+def load_scripts() -> dict[str, str]:
+    """The *_SCRIPT template literals exported by rate-limit.ts, by strategy."""
+    source = RATE_LIMIT_SOURCE.read_text()
+    scripts = {
+        name.split("_")[0].lower(): body
+        for name, body in re.findall(r"export const (\w+)_SCRIPT = `([\s\S]*?)`", source)
+    }
+    missing = {"fixed", "sliding"} - scripts.keys()
+    if missing:
+        raise SystemExit(f"No {', '.join(sorted(missing))} script found in {RATE_LIMIT_SOURCE}")
+    return scripts
+
+
+# ============================================
+# Backends
+# ============================================
+
+class RestBackend:
+    """Upstash REST client with one keep-alive connection per thread."""
+
+    def __init__(self, url: str, token: str, rtt_ms: float):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.https = parsed.scheme == "https"
+        self.token = token
+        self.rtt = rtt_ms / 1000
+        self.local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if getattr(self.local, "conn", None) is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.local.conn = cls(self.host, self.port, timeout=10)
+        return self.local.conn
+
+    def call(self, *command):
+        if self.rtt:
+            time.sleep(self.rtt)
+        body = json.dumps([str(part) for part in command]).encode("utf-8")
+        headers = {"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"}
+        conn = self._connection()
+        try:
+            conn.request("POST", "/", body=body, headers=headers)
+            reply = json.loads(conn.getresponse().read())
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            raise
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+
+class RedisBackend:
+    """redis-py client; its connection pool is thread-safe."""
+
+    def __init__(self, url: str, rtt_ms: float):
+        if redis is None:
+            raise SystemExit("--redis needs redis-py (pip install redis)")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.rtt = rtt_ms / 1000
+
+    def call(self, *command):
+        if self.rtt:
+            time.sleep(self.rtt)
+        return self.client.execute_command(*command)
+
+
+# ============================================
+# Strategies
+# ============================================
+
+def check_legacy(backend, prefix: str, email: str, args) -> tuple[bool, int]:
+    """The pre-script checkRateLimits, round trip for round trip."""
+    daily_key, email_key = f"{prefix}daily", f"{prefix}email:{email}"
+    if int(backend.call("GET", daily_key) or 0) >= args.daily_limit:
+        return False, 1
+    if int(backend.call("GET", email_key) or 0) >= args.email_limit:
+        return False, 2
+    backend.call("INCR", daily_key)
+    backend.call("EXPIRE", daily_key, DAY_SECONDS)
+    backend.call("INCR", email_key)
+    backend.call("EXPIRE", email_key, DAY_SECONDS)
+    return True, 6
+
+
+def check_fixed(backend, prefix: str, email: str, args) -> tuple[bool, int]:
+    allowed, _, _ = backend.call(
+        "EVAL", args.scripts["fixed"], 2, f"{prefix}daily", f"{prefix}email:{email}",
+        args.daily_limit, args.email_limit, DAY_SECONDS,
+    )
+    return allowed == 1, 1
+
+
+def check_sliding(backend, prefix: str, email: str, args) -> tuple[bool, int]:
+    allowed, _, _ = backend.call(
+        "EVAL", args.scripts["sliding"], 2, f"{prefix}daily-log", f"{prefix}email-log:{email}",
+        args.daily_limit, args.email_limit, DAY_SECONDS * 1000, int(time.time() * 1000), uuid.uuid4(),
+    )
+    return allowed == 1, 1
+
+
+CHECKS = {"legacy": check_legacy, "fixed": check_fixed, "sliding": check_sliding}
+
+
+# ============================================
+# Runs
+# ============================================
+
+def expected_allowed(emails: list[str], args) -> int:
+    attempts = Counter(emails)
+    return min(args.daily_limit, sum(min(args.email_limit, n) for n in attempts.values()))
+
+
+def run_strategy(strategy: str, backend, emails: list[str], run_id: str, args) -> dict:
+    prefix = f"bench:{run_id}:{strategy}:"
+    check = CHECKS[strategy]
+    results = []
+    errors = Counter()
+
+    def one(email: str) -> None:
+        start = time.perf_counter()
+        try:
+            allowed, trips = check(backend, prefix, email, args)
+        except Exception as e:
+            errors[type(e).__name__ + ": " + str(e)[:80]] += 1
+            return
+        results.append((email, allowed, trips, (time.perf_counter() - start) * 1000))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, emails))
+    elapsed = time.perf_counter() - started
+
+    if not results:
+        return {"strategy": strategy, "errors": dict(errors)}
+
+    latencies = [r[3] for r in results]
+    # Most production checks pass, and that's where legacy pays all six trips
+    allowed_latencies = [r[3] for r in results if r[1]]
+    per_email = Counter(email for email, allowed, _, _ in results if allowed)
+    allowed = sum(per_email.values())
+    expected = expected_allowed(emails, args)
+    return {
+        "strategy": strategy,
+        "checks": len(results),
+        "errors": dict(errors),
+        "round_trips": round(sum(r[2] for r in results) / len(results), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "max_ms": round(max(latencies), 2),
+        "allowed_p50_ms": round(percentile(allowed_latencies, 50), 2) if allowed_latencies else None,
+        "checks_per_s": round(len(results) / elapsed, 1),
+        "allowed": allowed,
+        "expected": expected,
+        "overshoot": allowed - expected,
+        "emails_over_limit": sum(1 for n in per_email.values() if n > args.email_limit),
+    }
+
+
+def print_report(summaries: list[dict]) -> None:
+    print(f"\n{'strategy':<10}{'trips':>7}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'pass p50':>10}{'checks/s':>10}"
+          f"{'allowed':>9}{'expected':>10}{'overshoot':>11}{'emails>cap':>12}")
+    for s in summaries:
+        if "checks" not in s:
+            print(f"{s['strategy']:<10}  all checks failed")
+            continue
+        print(f"{s['strategy']:<10}{s['round_trips']:>7}{s['p50_ms']:>9}{s['p95_ms']:>9}{s['max_ms']:>9}"
+              f"{s['allowed_p50_ms'] or '-':>10}{s['checks_per_s']:>10}{s['allowed']:>9}{s['expected']:>10}{s['overshoot']:>+11}"
+              f"{s['emails_over_limit']:>12}")
+    for s in summaries:
+        for error, count in s["errors"].items():
+            print(f"  {s['strategy']}: {count}x {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the planner rate limiter against a local KV")
+    parser.add_argument("--kv-url", default=DEFAULT_KV_URL, help=f"Upstash REST URL (default: {DEFAULT_KV_URL})")
+    parser.add_argument("--kv-token", default=DEFAULT_KV_TOKEN, help=f"REST token (default: {DEFAULT_KV_TOKEN})")
+    parser.add_argument("--redis", metavar="URL", help="Benchmark a Redis server via redis-py instead")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES),
+                        help=f"Comma-separated subset of {', '.join(STRATEGIES)}")
+    parser.add_argument("--requests", type=int, default=400, help="Checks per strategy (default: 400)")
+    parser.add_argument("--emails", type=int, default=20, help="Distinct emails the checks spread over (default: 20)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Checks in flight at once (default: 8)")
+    parser.add_argument("--rtt", type=float, default=0.0, help="ms of simulated network delay per round trip")
+    parser.add_argument("--daily-limit", type=int, default=DEFAULT_DAILY_LIMIT)
+    parser.add_argument("--email-limit", type=int, default=DEFAULT_EMAIL_LIMIT)
+    args = parser.parse_args()
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    unknown = set(strategies) - set(STRATEGIES)
+    if unknown:
+        parser.error(f"unknown strategies: {', '.join(sorted(unknown))}")
+    args.scripts = load_scripts()
+
+    if args.redis:
+        backend = RedisBackend(args.redis, args.rtt)
+        target = args.redis
+    else:
+        backend = RestBackend(args.kv_url, args.kv_token, args.rtt)
+        target = args.kv_url
+    try:
+        backend.call("PING")
+    except Exception as e:
+        print(f"Cannot reach {target}: {e}")
+        print("Start the stand-in with: python scripts/mock-kv.py")
+        return 1
+
+    # Same email sequence for every strategy, interleaved so each email's
+    # attempts overlap in time
+    emails = [f"bench-{i % args.emails}@example.com" for i in range(args.requests)]
+    run_id = uuid.uuid4().hex[:8]
+    print(f"{args.requests} checks over {args.emails} emails, concurrency {args.concurrency}, "
+          f"rtt {args.rtt}ms, limits {args.daily_limit}/day and {args.email_limit}/email -> {target}")
+
+    summaries = []
+    for strategy in strategies:
+        print(f"  {strategy}...", flush=True)
+        summaries.append(run_strategy(strategy, backend, emails, run_id, args))
+    print_report(summaries)
+
+    RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    report_path = RUNS_DIR / f"ratelimit-{datetime.now().strftime('%Y-%m-%dT%H-%M-%S')}.json"
+    with open(report_path, "w") as f:
+        json.dump({
+            "target": target,
+            "run_id": run_id,
+            "requests": args.requests,
+            "emails": args.emails,
+            "concurrency": args.concurrency,
+            "rtt_ms": args.rtt,
+            "daily_limit": args.daily_limit,
+            "email_limit": args.email_limit,
+            "strategies": summaries,
+        }, f, indent=2)
+    print(f"\nReport saved to {report_path.relative_to(SCRIPT_DIR.parent)}")
+
+    failed = any(s.get("overshoot", 0) > 0 or s.get("emails_over_limit", 0) for s in summaries
+                 if s["strategy"] != "legacy")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
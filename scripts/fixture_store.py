@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Indexed fixture store for the planner's captured generate inputs and outputs.
+
+The dev server drops each generate input into scripts/test-fixtures/ as a
+loose input-<timestamp>.json. `ingest` folds those (and loose output-*.json
+files) into the store and deletes them. The store layout is:
+
+  test-fixtures/manifest.json             index of every fixture
+  test-fixtures/inputs/<id>.json          one file per distinct payload
+  test-fixtures/outputs/<id>-<ts>.json.gz generate responses, gzipped
+
+A fixture's id is the hash of its canonical payload, so re-capturing the
+same form adds a name and a capture to the existing entry instead of a new
+file. `scenario` hashes the payload without contact details, so payloads
+that differ only by name or email share a scenario. Each manifest entry
+records firm type, team size, pain points, sizing archetypes, first and
+last capture time and linked outputs, which lets you select fixtures
+without opening them.
+
+Usage:
+  python scripts/fixture_store.py ingest                   # Index loose captures
+  python scripts/fixture_store.py list
+  python scripts/fixture_store.py list --where firm_type=law --where 'pain_points>3'
+  python scripts/fixture_store.py list --per firm_type,team_size   # One per combination
+  python scripts/fixture_store.py show emsere-v2 --output   # Input and latest output
+
+--where takes FIELD OP VALUE with =, !=, >, >=, < or <=. List fields
+(pain_points, archetypes, names, outputs) compare their length against
+numbers, and `=` tests membership otherwise: pain_points=invoicing
+matches any invoicing pain point. --per keeps the most recently captured
+fixture for each distinct value of the given fields.
+
+test-generate.py and load-test.py select fixtures through this module and
+ingest loose captures first, so a fresh capture is replayable straight away.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timezone
+from fnmatch import fnmatch
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = SCRIPT_DIR / "test-fixtures"
+MANIFEST_PATH = FIXTURES_DIR / "manifest.json"
+
+MANIFEST_VERSION = 1
+ID_LENGTH = 16
+
+# Contact details that don't change what the report is generated from
+CONTACT_FIELDS = ("name", "email", "company", "companyWebsite", "consentGiven")
+
+# A loose output is linked to the input captured at most this long before it
+# (the route captures on arrival, test-generate saves after the response)
+OUTPUT_LINK_WINDOW = 10 * 60
+
+FIELDS = ("id", "scenario", "names", "first_captured", "last_captured", "captures", "firm_type",
+          "team_size", "pain_points", "archetypes", "outputs")
+LIST_FIELDS = ("pain_points", "archetypes", "names", "outputs")
+WHERE_PATTERN = re.compile(r"^(\w+)\s*(!=|>=|<=|=|>|<)\s*(.*)$")
+
+
+# ============================================
+# Hashing and attributes
+# ============================================
+
+def payload_hash(payload) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:ID_LENGTH]
+
+
+def scenario_hash(payload: dict) -> str:
+    qualification = {k: v for k, v in payload.get("qualification", {}).items() if k not in CONTACT_FIELDS}
+    return payload_hash({**payload, "qualification": qualification})
+
+
+def attributes(payload: dict) -> dict:
+    """The selectable attributes of a generate payload."""
+    diagnostic = payload.get("diagnostic", {})
+    pain_points = sorted(
+        f"{p.get('area')}:{p.get('symptom')}" for p in diagnostic.get("painPoints", []) if isinstance(p, dict)
+    )
+    return {
+        "firm_type": diagnostic.get("firmType"),
+        "team_size": diagnostic.get("teamSize"),
+        "pain_points": pain_points,
+        "archetypes": [s.get("archetypeId") for s in payload.get("sizing", []) if isinstance(s, dict)],
+    }
+
+
+def parse_capture_time(name: str) -> datetime | None:
+    """Capture time from a loose fixture name.
+
+    The route names inputs with UTC ISO timestamps (trailing Z);
+    test-generate names outputs with local time.
+    """
+    match = re.search(r"(\d{4}-\d{2}-\d{2})T(\d{2})-(\d{2})-(\d{2})(?:-\d{3})?(Z)?", name)
+    if not match:
+        return None
+    date, hour, minute, second, utc = match.groups()
+    moment = datetime.fromisoformat(f"{date}T{hour}:{minute}:{second}")
+    return moment.replace(tzinfo=timezone.utc) if utc else moment.astimezone(timezone.utc)
+
+
+def format_time(moment: datetime | None) -> str | None:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if moment else None
+
+
+def now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ============================================
+# Manifest
+# ============================================
+
+def load_manifest() -> dict:
+    if not MANIFEST_PATH.exists():
+        return {"version": MANIFEST_VERSION, "fixtures": []}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def save_manifest(manifest: dict) -> None:
+    manifest["fixtures"].sort(key=lambda e: (e["first_captured"] or "", e["id"]))
+    write_atomic(MANIFEST_PATH, (json.dumps(manifest, indent=2, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+def find_entry(manifest: dict, key: str) -> dict | None:
+    """An entry by id (or unique id prefix) or by one of its names."""
+    key = key.removeprefix("input-").removesuffix(".json")
+    for entry in manifest["fixtures"]:
+        if key in entry["names"]:
+            return entry
+    matches = [e for e in manifest["fixtures"] if e["id"].startswith(key)]
+    return matches[0] if len(matches) == 1 else None
+
+
+def get_entry(manifest: dict, payload: dict) -> dict | None:
+    fixture_id = payload_hash(payload)
+    return next((e for e in manifest["fixtures"] if e["id"] == fixture_id), None)
+
+
+def add_input(manifest: dict, payload: dict, name: str | None = None,
+              captured: datetime | None = None) -> dict:
+    """Record a capture of the payload, creating its entry on first sight.
+
+    The caller saves the manifest.
+    """
+    fixture_id = payload_hash(payload)
+    entry = get_entry(manifest, payload)
+    if entry is None:
+        entry = {
+            "id": fixture_id,
+            "scenario": scenario_hash(payload),
+            "input": f"inputs/{fixture_id}.json",
+            "names": [],
+            "first_captured": None,
+            "last_captured": None,
+            "captures": 0,
+            **attributes(payload),
+            "outputs": [],
+        }
+        write_atomic(FIXTURES_DIR / entry["input"], (json.dumps(payload, indent=2, ensure_ascii=False) + "\n").encode("utf-8"))
+        manifest["fixtures"].append(entry)
+    entry["captures"] += 1
+    if name and name not in entry["names"]:
+        # Names are unique, so a re-used name moves to the newer payload
+        for other in manifest["fixtures"]:
+            if name in other["names"]:
+                other["names"].remove(name)
+        entry["names"].append(name)
+    stamp = format_time(captured)
+    if stamp and (entry["first_captured"] is None or stamp < entry["first_captured"]):
+        entry["first_captured"] = stamp
+    if stamp and (entry["last_captured"] is None or stamp > entry["last_captured"]):
+        entry["last_captured"] = stamp
+    return entry
+
+
+def add_output(entry: dict, response: dict, captured: datetime | None = None, tag: str | None = None) -> Path:
+    """Store a generate response gzipped and link it to the entry.
+
+    The file is named by capture time, or by `tag` for outputs whose
+    capture time is unknown (hand-named legacy fixtures).
+    """
+    if tag is None:
+        captured = captured or now()
+        utc = captured.astimezone(timezone.utc)
+        tag = utc.strftime("%Y-%m-%dT%H-%M-%S-") + f"{utc.microsecond // 1000:03d}Z"
+    relative = f"outputs/{entry['id']}-{tag}.json.gz"
+    data = json.dumps(response, indent=2, ensure_ascii=False).encode("utf-8")
+    # mtime=0 keeps the bytes stable, so re-ingesting doesn't churn git
+    write_atomic(FIXTURES_DIR / relative, gzip.compress(data, mtime=0))
+    entry["outputs"] = [o for o in entry["outputs"] if o["file"] != relative]
+    entry["outputs"].append({
+        "file": relative,
+        "captured": format_time(captured),
+        "status": response.get("status"),
+        "report_id": response.get("reportId"),
+        "bytes": len(data),
+    })
+    entry["outputs"].sort(key=lambda o: o["captured"] or "")
+    return FIXTURES_DIR / relative
+
+
+def load_input(entry: dict) -> dict:
+    with open(FIXTURES_DIR / entry["input"]) as f:
+        return json.load(f)
+
+
+def load_output(output: dict) -> dict:
+    with gzip.open(FIXTURES_DIR / output["file"], "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ============================================
+# Ingest
+# ============================================
+
+def ingest(keep: bool = False) -> dict:
+    """Fold loose input-*/output-*.json files into the store.
+
+    Outputs link to the input with the same name, else to the input
+    captured closest before them within OUTPUT_LINK_WINDOW. Unlinked
+    outputs stay loose. Returns counts of what changed.
+    """
+    inputs = sorted(FIXTURES_DIR.glob("input-*.json"))
+    outputs = sorted(FIXTURES_DIR.glob("output-*.json"))
+    counts = {"inputs": 0, "new": 0, "outputs": 0, "unlinked": []}
+    if not inputs and not outputs:
+        return counts
+
+    manifest = load_manifest()
+    known = {e["id"] for e in manifest["fixtures"]}
+    by_name: dict[str, dict] = {}
+    timeline: list[tuple[datetime, dict]] = []
+    for path in inputs:
+        with open(path) as f:
+            payload = json.load(f)
+        name = path.stem.removeprefix("input-")
+        captured = parse_capture_time(name)
+        entry = add_input(manifest, payload, name, captured)
+        by_name[name] = entry
+        if captured:
+            timeline.append((captured, entry))
+        counts["inputs"] += 1
+    # Earlier sessions' captures can link outputs too
+    for entry in manifest["fixtures"]:
+        for name in entry["names"]:
+            by_name.setdefault(name, entry)
+            captured = parse_capture_time(name)
+            if captured:
+                timeline.append((captured, entry))
+    counts["new"] = len({e["id"] for e in manifest["fixtures"]} - known)
+
+    linked = []
+    for path in outputs:
+        name = path.stem.removeprefix("output-")
+        captured = parse_capture_time(name)
+        entry = by_name.get(name)
+        if entry is None and captured:
+            before = [(t, e) for t, e in timeline if 0 <= (captured - t).total_seconds() <= OUTPUT_LINK_WINDOW]
+            entry = max(before, key=lambda c: c[0])[1] if before else None
+        if entry is None:
+            counts["unlinked"].append(path.name)
+            continue
+        with open(path) as f:
+            add_output(entry, json.load(f), captured, tag=None if captured else name)
+        linked.append(path)
+        counts["outputs"] += 1
+
+    save_manifest(manifest)
+    if not keep:
+        for path in [*inputs, *linked]:
+            path.unlink()
+    return counts
+
+
+def ingest_quietly() -> None:
+    """Ingest before selecting, mentioning it only when something changed."""
+    counts = ingest()
+    if counts["inputs"] or counts["outputs"]:
+        print(f"Indexed {counts['inputs']} loose inputs ({counts['new']} new) "
+              f"and {counts['outputs']} outputs into {MANIFEST_PATH.relative_to(SCRIPT_DIR.parent)}")
+    for name in counts["unlinked"]:
+        print(f"  ⚠ {name}: no matching input, left in place")
+
+
+# ============================================
+# Selection
+# ============================================
+
+def parse_where(expression: str) -> tuple[str, str, str]:
+    match = WHERE_PATTERN.match(expression.strip())
+    if not match:
+        raise ValueError(f"expected FIELD OP VALUE, got {expression!r}")
+    if match.group(1) not in FIELDS:
+        raise ValueError(f"unknown field {match.group(1)!r} (one of {', '.join(FIELDS)})")
+    return match.groups()
+
+
+def _compare(actual, op: str, expected: str) -> bool:
+    if op in ("=", "!="):
+        if isinstance(actual, list):
+            hit = any(item == expected or str(item).split(":")[0] == expected for item in actual)
+        else:
+            hit = str(actual) == expected
+        return hit if op == "=" else not hit
+    if isinstance(actual, list):
+        actual = len(actual)
+    try:
+        left, right = float(actual), float(expected)
+    except (TypeError, ValueError):
+        left, right = str(actual), expected
+    return {">": left > right, ">=": left >= right, "<": left < right, "<=": left <= right}[op]
+
+
+def matches(entry: dict, where: list[tuple[str, str, str]]) -> bool:
+    for field, op, value in where:
+        actual = entry.get(field)
+        # Membership tests on a count make no sense; count tests on a list do
+        if field in LIST_FIELDS and op in ("=", "!=") and value.isdigit():
+            actual = len(actual or [])
+        if not _compare(actual, op, value):
+            return False
+    return True
+
+
+def select(manifest: dict, names: str | None = None, where: list[str] = (),
+           per: list[str] | None = None) -> list[dict]:
+    """Entries matching a name glob and --where filters, optionally one per --per group."""
+    conditions = [parse_where(w) for w in where]
+    if names:
+        names = names.removeprefix("input-").removesuffix(".json")
+    chosen = [
+        e for e in manifest["fixtures"]
+        if (not names or any(fnmatch(n, names) for n in e["names"]) or e["id"].startswith(names))
+        and matches(e, conditions)
+    ]
+    if per:
+        groups: dict[tuple, dict] = {}
+        for entry in chosen:
+            group = tuple(json.dumps(entry.get(field), sort_keys=True) for field in per)
+            if group not in groups or (entry["last_captured"] or "") > (groups[group]["last_captured"] or ""):
+                groups[group] = entry
+        chosen = [e for e in chosen if e in groups.values()]
+    return chosen
+
+
+def label(entry: dict) -> str:
+    """Human-readable name: the first non-timestamp name, else the first, else the id."""
+    named = [n for n in entry["names"] if not parse_capture_time(n)]
+    return (named or entry["names"] or [entry["id"]])[0]
+
+
+# ============================================
+# CLI
+# ============================================
+
+def print_entries(entries: list[dict]) -> None:
+    print(f"{'id':<18}{'name':<24}{'firm':<17}{'team':<10}{'pains':>6}{'caps':>5}{'outs':>5}  last captured")
+    for e in entries:
+        print(f"{e['id']:<18}{label(e)[:23]:<24}{str(e['firm_type'])[:16]:<17}{str(e['team_size'])[:9]:<10}"
+              f"{len(e['pain_points']):>6}{e['captures']:>5}{len(e['outputs']):>5}  {e['last_captured'] or '-'}")
+    scenarios = len({e["scenario"] for e in entries})
+    print(f"\n{len(entries)} fixtures, {scenarios} scenarios, {sum(len(e['outputs']) for e in entries)} outputs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed store of planner generate fixtures")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="Index loose input-*/output-*.json captures")
+    ingest_parser.add_argument("--keep", action="store_true", help="Leave the loose files in place")
+
+    list_parser = commands.add_parser("list", help="List fixtures, optionally filtered")
+    list_parser.add_argument("--glob", help="Match fixture names (e.g. 'integration-*')")
+    list_parser.add_argument("--where", action="append", default=[], help="FIELD OP VALUE filter, repeatable")
+    list_parser.add_argument("--per", help="Comma-separated fields: keep one fixture per combination")
+    list_parser.add_argument("--json", action="store_true", help="Print matching manifest entries as JSON")
+
+    show_parser = commands.add_parser("show", help="Print a fixture's input")
+    show_parser.add_argument("fixture", help="Fixture name or id prefix")
+    show_parser.add_argument("--output", action="store_true", help="Print its latest output instead")
+
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        counts = ingest(keep=args.keep)
+        print(f"{counts['inputs']} inputs ({counts['new']} new fixtures), {counts['outputs']} outputs indexed")
+        for name in counts["unlinked"]:
+            print(f"  ⚠ {name}: no matching input, left in place")
+        return 0
+
+    manifest = load_manifest()
+    if args.command == "list":
+        per = [f.strip() for f in args.per.split(",")] if args.per else None
+        try:
+            entries = select(manifest, args.glob, args.where, per)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.json:
+            print(json.dumps(entries, indent=2))
+        else:
+            print_entries(entries)
+        return 0
+
+    entry = find_entry(manifest, args.fixture)
+    if entry is None:
+        print(f"No fixture named {args.fixture}")
+        return 1
+    if args.output:
+        if not entry["outputs"]:
+            print(f"{label(entry)} has no stored outputs")
+            return 1
+        # Hand-named fixtures sharing a payload keep outputs under their own names
+        named = [o for o in entry["outputs"] if o["file"].endswith(f"-{args.fixture}.json.gz")]
+        print(json.dumps(load_output((named or entry["outputs"])[-1]), indent=2, ensure_ascii=False))
+    else:
+        print(json.dumps(load_input(entry), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Load-test the planner API with simulated wizard sessions.
+
+Each session follows the wizard's funnel with a random fixture from the
+store (scripts/fixture_store.py, filtered by --glob/--where): /score (diagnostic step), /qualify, then
+/generate, then /pdf/[id] for the report it got back. Each step is
+reached with a conditional probability (--funnel) after an exponential
+think time, so endpoints are mixed in realistic ratios.
+
+Run it against the dev server backed by local stand-ins, so nothing
+leaves the machine and KV/LLM latency is under your control:
+
+  python scripts/mock-kv.py &
+  python scripts/mock-anthropic.py --fallback --latency recorded &
+  KV_REST_API_URL=http://localhost:8079 KV_REST_API_TOKEN=local \\
+  ANTHROPIC_BASE_URL=http://localhost:4010 \\
+  RESEND_API_KEY= ATTIO_API_KEY= SUPABASE_URL= npm run dev
+
+Usage:
+  python scripts/load-test.py --closed 1:20 --ramp 60 --hold 60   # Users ramped 1 -> 20
+  python scripts/load-test.py --open 0.1:2 --ramp 120             # Sessions/s ramped 0.1 -> 2
+  python scripts/load-test.py --open 1 --funnel score=1,qualify=0.7,generate=0.9,pdf=0.5
+  python scripts/load-test.py --closed 10 --internal               # Bypass rate limits
+
+Closed loop: a fixed (ramping) number of users, each starting a new
+session when the last ends - throughput adapts to response times. Open
+loop: sessions arrive as a Poisson process at the target rate whatever
+the server is doing, which exposes queueing; arrivals beyond
+--max-inflight are counted as dropped rather than delaying the schedule.
+
+Sessions use unique @example.com emails and drop companyWebsite (the
+scrape would hit the network), so the per-email limit doesn't dominate
+and DAILY_GENERATION_LIMIT rejections show up as rate_limited (the
+limiter is a Lua script, so mock-kv needs lupa installed). The
+report covers throughput, latency percentiles per endpoint, error
+classes, rate-limit rejections and a timeline, and is saved under
+scripts/test-fixtures/runs/.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import fixture_store
+from qa_stats import percentile
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = SCRIPT_DIR / "test-fixtures"
+RUNS_DIR = FIXTURES_DIR / "runs"
+
+# Wizard order, with the probability of reaching each step from the last
+STEPS = ("score", "qualify", "generate", "pdf")
+DEFAULT_FUNNEL = {"score": 1.0, "qualify": 0.7, "generate": 0.85, "pdf": 0.5}
+
+# Generate's maxDuration, so a slow-but-successful call isn't a client timeout
+DEFAULT_TIMEOUT = 300
+DEFAULT_MAX_INFLIGHT = 200
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+# ============================================
+# Requests
+# ============================================
+
+def error_class(status: int | None, error: str | None) -> str:
+    if status is not None and 200 <= status < 300:
+        return "ok"
+    if status == 429:
+        return "rate_limited"
+    if status is not None and 400 <= status < 500:
+        return f"http_{status}"
+    if status is not None:
+        return "server_error"
+    return "timeout" if error and "timed out" in error else "connection"
+
+
+class Client:
+    """Planner API calls that never raise; each returns a result record."""
+
+    def __init__(self, args, started_at: float):
+        self.base = f"http://localhost:{args.port}/api/planner"
+        self.origin = f"http://localhost:{args.port}"
+        self.timeout = args.timeout
+        self.internal_key = os.environ.get("PLANNER_INTERNAL_KEY") if args.internal else None
+        self.started_at = started_at
+
+    def call(self, endpoint: str, path: str, payload: dict | None = None) -> tuple[dict, bytes | None]:
+        headers = {"Origin": self.origin}
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+        if self.internal_key:
+            headers["Authorization"] = f"Bearer {self.internal_key}"
+        req = urllib.request.Request(
+            f"{self.base}{path}",
+            data=json.dumps(payload).encode("utf-8") if payload is not None else None,
+            headers=headers,
+            method="POST" if payload is not None else "GET",
+        )
+
+        start = time.perf_counter()
+        status, body, error = None, None, None
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                status, body = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read() if e.fp else b""
+            error = _error_message(body) or f"HTTP {e.code}"
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            error = str(getattr(e, "reason", e))
+        end = time.perf_counter()
+
+        return {
+            "endpoint": endpoint,
+            "at": start - self.started_at,
+            "latency": end - start,
+            "status": status,
+            "class": error_class(status, error),
+            "error": error,
+        }, body
+
+
+def _error_message(body: bytes) -> str | None:
+    try:
+        return json.loads(body.decode("utf-8")).get("error")
+    except (ValueError, AttributeError, UnicodeDecodeError):
+        return None
+
+
+# ============================================
+# Sessions
+# ============================================
+
+class LoadTest:
+    def __init__(self, args, fixtures: list[dict]):
+        self.args = args
+        self.fixtures = fixtures
+        self.funnel = args.funnel
+        self.rng = random.Random(args.seed)
+        self.rng_lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.client = Client(args, self.started_at)
+        self.run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+        self.stop = threading.Event()
+
+        self.lock = threading.Lock()
+        self.results: list[dict] = []
+        self.reached = Counter()
+        self.sessions = 0
+        self.dropped = 0
+        self.inflight = 0
+        self.targets: list[tuple[float, float]] = []
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def target(self, start: float, end: float, at: float | None = None) -> float:
+        """Linear ramp from start to end over --ramp seconds, then hold.
+
+        Evaluated now, or at `at` seconds into the test.
+        """
+        ramp = self.args.ramp
+        at = self.elapsed() if at is None else at
+        progress = 1.0 if ramp <= 0 else min(1.0, at / ramp)
+        return start + (end - start) * progress
+
+    def random(self) -> float:
+        with self.rng_lock:
+            return self.rng.random()
+
+    def think(self) -> bool:
+        """Pause between steps; False if the test ended meanwhile."""
+        if self.args.think <= 0:
+            return not self.stop.is_set()
+        with self.rng_lock:
+            pause = self.rng.expovariate(1 / self.args.think)
+        return not self.stop.wait(pause)
+
+    def make_payload(self, number: int) -> dict:
+        with self.rng_lock:
+            fixture = self.rng.choice(self.fixtures)
+        payload = json.loads(json.dumps(fixture))
+        qualification = payload["qualification"]
+        qualification["email"] = f"load-{self.run_id}-{number}@example.com"
+        qualification.pop("companyWebsite", None)
+        return payload
+
+    def record(self, result: dict) -> None:
+        with self.lock:
+            self.results.append(result)
+
+    def session(self) -> None:
+        with self.lock:
+            self.sessions += 1
+            number = self.sessions
+            self.inflight += 1
+        try:
+            self._session(self.make_payload(number))
+        finally:
+            with self.lock:
+                self.inflight -= 1
+
+    def _session(self, payload: dict) -> None:
+        report_id = None
+        for step in STEPS:
+            if self.random() >= self.funnel.get(step, 0):
+                return
+            if step != STEPS[0] and not self.think():
+                return
+            with self.lock:
+                self.reached[step] += 1
+
+            if step == "score":
+                result, _ = self.client.call(step, "/score", payload["diagnostic"])
+            elif step == "qualify":
+                result, _ = self.client.call(step, "/qualify", payload["qualification"])
+            elif step == "generate":
+                result, body = self.client.call(step, "/generate", payload)
+                if result["class"] == "ok":
+                    report_id = json.loads(body.decode("utf-8")).get("reportId")
+            else:
+                if not report_id:
+                    return
+                result, _ = self.client.call(step, f"/pdf/{report_id}")
+
+            self.record(result)
+            if result["class"] != "ok":
+                return  # Users abandon the wizard on an error
+
+    # Profiles
+
+    def run_closed(self, start: float, end: float) -> None:
+        """Keep target(start, end) users busy, each running sessions back to back."""
+        def user():
+            while not self.stop.is_set():
+                self.session()
+
+        users = []
+        duration = self.args.ramp + self.args.hold
+        while self.elapsed() < duration:
+            wanted = round(self.target(start, end))
+            while len(users) < wanted:
+                thread = threading.Thread(target=user, daemon=True)
+                thread.start()
+                users.append(thread)
+            self.targets.append((self.elapsed(), len(users)))
+            time.sleep(0.5)
+        self.stop.set()
+        for thread in users:
+            thread.join(self.args.timeout)
+
+    def run_open(self, start: float, end: float) -> None:
+        """Poisson arrivals at target(start, end) sessions per second.
+
+        The rate changes over the ramp, so arrivals are drawn by thinning:
+        candidates come at the peak rate and each is kept with probability
+        target/peak at its arrival time. A ramp from (or to) 0 works too.
+        """
+        duration = self.args.ramp + self.args.hold
+        peak = max(start, end)
+        with ThreadPoolExecutor(max_workers=self.args.max_inflight) as pool:
+            next_arrival = 0.0
+            last_target = -1.0
+            while True:
+                with self.rng_lock:
+                    next_arrival += self.rng.expovariate(peak)
+                    keep = self.rng.random() * peak < self.target(start, end, next_arrival)
+                if next_arrival >= duration:
+                    break
+                if not keep:
+                    continue
+                rate = self.target(start, end, next_arrival)
+                delay = next_arrival - self.elapsed()
+                if delay > 0:
+                    time.sleep(delay)
+                if self.elapsed() - last_target >= 0.5:
+                    self.targets.append((self.elapsed(), rate))
+                    last_target = self.elapsed()
+                with self.lock:
+                    saturated = self.inflight >= self.args.max_inflight
+                    if saturated:
+                        self.dropped += 1
+                    else:
+                        self.inflight += 1  # Reserved until the session starts
+                if not saturated:
+                    pool.submit(self._open_session)
+            self.stop.set()
+
+    def _open_session(self) -> None:
+        with self.lock:
+            self.inflight -= 1
+        self.session()
+
+
+# ============================================
+# Reporting
+# ============================================
+
+def stand_in_stats(url: str | None, path: str) -> dict | None:
+    if not url:
+        return None
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}{path}", timeout=2) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except (urllib.error.URLError, TimeoutError, ValueError, ConnectionError):
+        return None
+
+
+def summarise(results: list[dict], duration: float) -> dict:
+    summary = {}
+    for endpoint in STEPS:
+        rows = [r for r in results if r["endpoint"] == endpoint]
+        if not rows:
+            continue
+        latencies = [r["latency"] for r in rows if r["status"] is not None]
+        ok = [r for r in rows if r["class"] == "ok"]
+        summary[endpoint] = {
+            "requests": len(rows),
+            "ok": len(ok),
+            "throughput": len(ok) / duration,
+            "latency": {
+                **{f"p{p}": percentile(latencies, p) for p in PERCENTILES},
+                "max": max(latencies),
+            } if latencies else None,
+            "classes": dict(Counter(r["class"] for r in rows)),
+            "errors": dict(Counter(r["error"] for r in rows if r["error"]).most_common(5)),
+        }
+    return summary
+
+
+def timeline(results: list[dict], targets: list[tuple[float, float]], duration: float, interval: float) -> list[dict]:
+    rows = []
+    for i in range(math.ceil(duration / interval)):
+        start, end = i * interval, (i + 1) * interval
+        bucket = [r for r in results if start <= r["at"] + r["latency"] < end]
+        in_window = [value for t, value in targets if start <= t < end]
+        latencies = [r["latency"] for r in bucket if r["status"] is not None]
+        rows.append({
+            "start": start,
+            "target": max(in_window) if in_window else None,
+            "completed": len(bucket),
+            "ok": sum(1 for r in bucket if r["class"] == "ok"),
+            "rate_limited": sum(1 for r in bucket if r["class"] == "rate_limited"),
+            "errors": sum(1 for r in bucket if r["class"] not in ("ok", "rate_limited")),
+            "p95": percentile(latencies, 95) if latencies else None,
+        })
+    return rows
+
+
+def print_report(test: LoadTest, summary: dict, rows: list[dict], duration: float, profile: str) -> None:
+    sep = "─" * 78
+    print(f"\n{sep}")
+    print(f"  {profile} · {duration:.0f}s · {test.sessions} sessions"
+          + (f" · {test.dropped} arrivals dropped (--max-inflight)" if test.dropped else ""))
+    print("  Funnel: " + " → ".join(f"{step} {test.reached[step]}" for step in STEPS))
+    print(sep)
+
+    print(f"  {'Endpoint':<10} {'reqs':>5} {'ok':>5} {'ok/s':>6} "
+          + " ".join(f"{'p' + str(p):>7}" for p in PERCENTILES) + f" {'max':>7}")
+    for endpoint, s in summary.items():
+        latency = s["latency"] or {}
+        cells = " ".join(f"{latency[f'p{p}']:>6.2f}s" if latency else f"{'-':>7}" for p in PERCENTILES)
+        peak = f"{latency['max']:>6.2f}s" if latency else f"{'-':>7}"
+        print(f"  {endpoint:<10} {s['requests']:>5} {s['ok']:>5} {s['throughput']:>6.2f} {cells} {peak}")
+
+    print("\n  Error classes")
+    for endpoint, s in summary.items():
+        failures = {k: v for k, v in s["classes"].items() if k != "ok"}
+        if failures:
+            print(f"    {endpoint:<10} " + ", ".join(f"{k} {v}" for k, v in sorted(failures.items())))
+            for message, count in s["errors"].items():
+                print(f"      {count:>4} × {message[:70]}")
+    rate_limited = sum(s["classes"].get("rate_limited", 0) for s in summary.values())
+    print(f"\n  Rate-limit rejections: {rate_limited}")
+
+    print(f"\n  {'t':>6} {'target':>7} {'done':>5} {'ok':>5} {'429':>5} {'err':>5} {'p95':>7}")
+    for row in rows:
+        target = f"{row['target']:.2f}" if row["target"] is not None else "-"
+        p95 = f"{row['p95']:.2f}s" if row["p95"] is not None else "-"
+        print(f"  {row['start']:>5.0f}s {target:>7} {row['completed']:>5} {row['ok']:>5} "
+              f"{row['rate_limited']:>5} {row['errors']:>5} {p95:>7}")
+    print(sep)
+
+
+# ============================================
+# CLI
+# ============================================
+
+def parse_range(value: str) -> tuple[float, float]:
+    """'N' or 'START:END'."""
+    try:
+        parts = [float(v) for v in value.split(":")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected N or START:END")
+    if len(parts) == 1:
+        return parts[0], parts[0]
+    if len(parts) == 2 and min(parts) >= 0:
+        return parts[0], parts[1]
+    raise argparse.ArgumentTypeError("expected N or START:END")
+
+
+def parse_funnel(value: str) -> dict:
+    funnel = dict(DEFAULT_FUNNEL)
+    for item in value.split(","):
+        step, _, probability = item.partition("=")
+        if step not in STEPS:
+            raise argparse.ArgumentTypeError(f"unknown step '{step}' (expected {', '.join(STEPS)})")
+        try:
+            funnel[step] = min(1.0, max(0.0, float(probability)))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad probability for {step}")
+    return funnel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the planner API with wizard sessions")
+    profile = parser.add_mutually_exclusive_group(required=True)
+    profile.add_argument("--closed", type=parse_range, metavar="USERS", help="Concurrent users, N or START:END")
+    profile.add_argument("--open", type=parse_range, metavar="RATE", help="Session arrivals per second, N or START:END")
+    parser.add_argument("--ramp", type=float, default=60, help="Seconds to ramp from START to END (default: 60)")
+    parser.add_argument("--hold", type=float, default=60, help="Seconds to hold END after the ramp (default: 60)")
+    parser.add_argument("--funnel", type=parse_funnel, default=dict(DEFAULT_FUNNEL),
+                        help="Step probabilities, e.g. score=1,qualify=0.7,generate=0.85,pdf=0.5")
+    parser.add_argument("--think", type=float, default=2.0, help="Mean think time between steps in s (default: 2)")
+    parser.add_argument("--port", type=int, default=3000, help="Dev server port (default: 3000)")
+    parser.add_argument("--glob", help="Draw sessions from fixtures whose name matches a glob")
+    parser.add_argument("--where", action="append", default=[],
+                        help="Draw sessions from fixtures matching FIELD OP VALUE (repeatable)")
+    parser.add_argument("--internal", action="store_true",
+                        help="Send PLANNER_INTERNAL_KEY (skips origin checks and rate limits)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Per-request timeout in s")
+    parser.add_argument("--max-inflight", type=int, default=DEFAULT_MAX_INFLIGHT,
+                        help=f"Open loop: concurrent sessions before arrivals are dropped (default: {DEFAULT_MAX_INFLIGHT})")
+    parser.add_argument("--interval", type=float, default=10, help="Timeline bucket in s (default: 10)")
+    parser.add_argument("--kv-url", default="http://localhost:8079", help="mock-kv.py, for its stats ('' to skip)")
+    parser.add_argument("--llm-url", default="http://localhost:4010", help="mock-anthropic.py, for its stats ('' to skip)")
+    parser.add_argument("--seed", type=int, help="Random seed for a repeatable session mix")
+    args = parser.parse_args()
+    if args.open and max(args.open) <= 0:
+        parser.error("--open needs a rate above 0 at the start or end of the ramp")
+
+    fixture_store.ingest_quietly()
+    try:
+        entries = fixture_store.select(fixture_store.load_manifest(), args.glob, args.where)
+    except ValueError as e:
+        parser.error(str(e))
+    fixtures = [fixture_store.load_input(entry) for entry in entries]
+    if not fixtures:
+        print("No stored fixtures match the selection (see: python scripts/fixture_store.py list)")
+        return 1
+    if args.internal and not os.environ.get("PLANNER_INTERNAL_KEY"):
+        print("--internal needs PLANNER_INTERNAL_KEY in the environment")
+        return 1
+
+    kv_before = stand_in_stats(args.kv_url, "/stats")
+    llm_before = stand_in_stats(args.llm_url, "/")
+    for name, url, stats in (("KV stand-in", args.kv_url, kv_before), ("LLM stand-in", args.llm_url, llm_before)):
+        if not url:
+            continue
+        state = "up" if stats is not None else "not reachable - is the dev server using the real service?"
+        print(f"  {name}: {state}")
+
+    if args.closed:
+        start, end = args.closed
+        profile_name = f"closed loop, {start:g}→{end:g} users"
+    else:
+        start, end = args.open
+        profile_name = f"open loop, {start:g}→{end:g} sessions/s"
+    print(f"\n{profile_name}, {args.ramp:g}s ramp + {args.hold:g}s hold, {len(fixtures)} fixtures\n")
+
+    test = LoadTest(args, fixtures)
+    try:
+        if args.closed:
+            test.run_closed(start, end)
+        else:
+            test.run_open(start, end)
+    except KeyboardInterrupt:
+        test.stop.set()
+        print("\nInterrupted - reporting what completed")
+    duration = test.elapsed()
+
+    with test.lock:
+        results = list(test.results)
+    summary = summarise(results, duration)
+    rows = timeline(results, test.targets, duration, args.interval)
+    print_report(test, summary, rows, duration, profile_name)
+
+    stand_ins = {
+        "kv": {"before": kv_before, "after": stand_in_stats(args.kv_url, "/stats")},
+        "llm": {"before": llm_before, "after": stand_in_stats(args.llm_url, "/")},
+    }
+    llm_after = stand_ins["llm"]["after"]
+    if llm_after:
+        print("  LLM stand-in: " + ", ".join(
+            f"{k} {v - (llm_before or {}).get(k, 0)}" for k, v in llm_after.items() if isinstance(v, int)
+        ))
+
+    RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    report_path = RUNS_DIR / f"load-{datetime.now().strftime('%Y-%m-%dT%H-%M-%S')}.json"
+    with open(report_path, "w") as f:
+        json.dump({
+            "profile": "closed" if args.closed else "open",
+            "start": start,
+            "end": end,
+            "ramp": args.ramp,
+            "hold": args.hold,
+            "funnel": args.funnel,
+            "think": args.think,
+            "internal": args.internal,
+            "duration": duration,
+            "sessions": test.sessions,
+            "dropped": test.dropped,
+            "reached": dict(test.reached),
+            "endpoints": summary,
+            "timeline": rows,
+            "stand_ins": stand_ins,
+            "results": results,
+        }, f, indent=2)
+    print(f"  Results saved to: {report_path}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Local record/replay stand-in for the Anthropic Messages API.
+
+Point the dev server at it and /api/planner/generate runs end to end
+(scoring, prompts, sanitising, KV, PDF) without a network call:
+
+  python scripts/mock-anthropic.py                       # Replay cassettes on :4010
+  ANTHROPIC_BASE_URL=http://localhost:4010 npm run dev
+
+Responses are stored as cassettes in scripts/test-fixtures/cassettes/,
+one JSON file per request keyed by a hash of the prompt (model, system,
+messages, sampling parameters - not `stream`). The planner prompts are
+deterministic apart from the company website scrape: a fixture with
+companyWebsite puts the live site's text into both prompts, so its key
+misses offline or once the site changes. test-generate.py and
+load-test.py drop companyWebsite for that reason (test-generate --scrape
+keeps it), and with that a replayed fixture always maps to the same
+cassette.
+
+Usage:
+  python scripts/mock-anthropic.py --mode record         # Forward every call upstream and save it
+  python scripts/mock-anthropic.py --mode auto           # Replay, recording only misses
+  python scripts/mock-anthropic.py --latency 800 --jitter 200
+  python scripts/mock-anthropic.py --latency recorded    # Replay with the upstream's own timing
+  python scripts/mock-anthropic.py --chunk-chars 12 --chunk-delay 15
+  python scripts/mock-anthropic.py --fallback            # Misses get any recorded response (load tests)
+
+Recording needs ANTHROPIC_API_KEY (the dev server's x-api-key header is
+forwarded as-is, so the usual .env.local key works). Replay needs no key
+and no network; a miss returns a 404 not_found_error, which the SDK does
+not retry, unless --fallback is set. The route injects its own report
+ID, so any valid recorded report stands in for a load test.
+
+Streaming requests ("stream": true) are answered with the Messages SSE
+event sequence, the text split into --chunk-chars deltas --chunk-delay
+ms apart. Cassettes always hold the complete message, so one recording
+serves both streaming and non-streaming calls.
+
+GET / returns hit/miss/record counters for load-test runs.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+CASSETTES_DIR = SCRIPT_DIR / "test-fixtures" / "cassettes"
+
+DEFAULT_PORT = 4010
+DEFAULT_UPSTREAM = "https://api.anthropic.com"
+UPSTREAM_TIMEOUT = 300
+
+# Request fields that decide the response; everything else (stream,
+# metadata) is transport and doesn't change what the model returns
+KEY_FIELDS = (
+    "model", "system", "messages", "max_tokens", "temperature", "top_p", "top_k",
+    "stop_sequences", "tools", "tool_choice",
+)
+
+# Client headers passed through when recording
+FORWARD_HEADERS = ("x-api-key", "anthropic-version", "anthropic-beta", "authorization")
+
+MODES = ("replay", "record", "auto")
+
+
+# ============================================
+# Cassettes
+# ============================================
+
+def cassette_key(body: dict) -> str:
+    """Stable hash of the fields that determine a response."""
+    keyed = {field: body[field] for field in KEY_FIELDS if field in body}
+    canonical = json.dumps(keyed, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def cassette_path(key: str) -> Path:
+    return CASSETTES_DIR / f"{key}.json"
+
+
+def load_cassette(key: str) -> dict | None:
+    try:
+        with open(cassette_path(key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cassette(key: str, body: dict, response: dict, upstream_ms: float) -> None:
+    """Write a cassette atomically; concurrent recordings of one prompt just race."""
+    CASSETTES_DIR.mkdir(parents=True, exist_ok=True)
+    cassette = {
+        "key": key,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "upstream_ms": round(upstream_ms),
+        "request": {field: body[field] for field in KEY_FIELDS if field in body},
+        "response": response,
+    }
+    fd, tmp = tempfile.mkstemp(dir=CASSETTES_DIR, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(cassette, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, cassette_path(key))
+
+
+def index_cassettes() -> dict[str, list[dict]]:
+    """Every cassette, grouped by model, for --fallback.
+
+    Loaded once at startup, so a miss costs no disk I/O in the latency the
+    load test is measuring.
+    """
+    by_model: dict[str, list[dict]] = {}
+    paths = sorted(CASSETTES_DIR.glob("*.json")) if CASSETTES_DIR.exists() else []
+    for path in paths:
+        try:
+            with open(path) as f:
+                cassette = json.load(f)
+        except (OSError, ValueError):
+            continue
+        by_model.setdefault(cassette.get("request", {}).get("model"), []).append(cassette)
+    return by_model
+
+
+def record(body: dict, headers: dict, upstream: str) -> tuple[dict, float]:
+    """Send the request upstream (never streamed) and return (message, elapsed ms)."""
+    forwarded = {"Content-Type": "application/json"}
+    for name in FORWARD_HEADERS:
+        if headers.get(name):
+            forwarded[name] = headers[name]
+    if "x-api-key" not in forwarded and os.environ.get("ANTHROPIC_API_KEY"):
+        forwarded["x-api-key"] = os.environ["ANTHROPIC_API_KEY"]
+    forwarded.setdefault("anthropic-version", "2023-06-01")
+
+    payload = {k: v for k, v in body.items() if k != "stream"}
+    req = urllib.request.Request(
+        f"{upstream.rstrip('/')}/v1/messages",
+        data=json.dumps(payload).encode("utf-8"),
+        headers=forwarded,
+        method="POST",
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=UPSTREAM_TIMEOUT) as resp:
+        message = json.loads(resp.read().decode("utf-8"))
+    return message, (time.perf_counter() - start) * 1000
+
+
+# ============================================
+# Streaming
+# ============================================
+
+def sse_events(message: dict, chunk_chars: int):
+    """(event, data) pairs reproducing a complete message as a Messages stream."""
+    usage = message.get("usage", {})
+    start = {
+        **message,
+        "content": [],
+        "stop_reason": None,
+        "stop_sequence": None,
+        "usage": {**usage, "output_tokens": 1},
+    }
+    yield "message_start", {"type": "message_start", "message": start}
+    yield "ping", {"type": "ping"}
+
+    for index, block in enumerate(message.get("content", [])):
+        if block.get("type") == "text":
+            empty, field, delta_type = {"type": "text", "text": ""}, "text", "text_delta"
+            text = block["text"]
+        elif block.get("type") == "tool_use":
+            empty = {**block, "input": {}}
+            field, delta_type = "partial_json", "input_json_delta"
+            text = json.dumps(block.get("input", {}))
+        else:
+            empty, text = block, ""
+        yield "content_block_start", {"type": "content_block_start", "index": index, "content_block": empty}
+        for i in range(0, len(text), chunk_chars):
+            yield "content_block_delta", {
+                "type": "content_block_delta",
+                "index": index,
+                "delta": {"type": delta_type, field: text[i:i + chunk_chars]},
+            }
+        yield "content_block_stop", {"type": "content_block_stop", "index": index}
+
+    yield "message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": message.get("stop_reason"), "stop_sequence": message.get("stop_sequence")},
+        "usage": {"output_tokens": usage.get("output_tokens", 0)},
+    }
+    yield "message_stop", {"type": "message_stop"}
+
+
+# ============================================
+# Server
+# ============================================
+
+class MockAnthropic(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, args):
+        super().__init__(address, MessagesHandler)
+        self.args = args
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.fallbacks = index_cassettes() if args.fallback else {}
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.stats[name] += 1
+
+    def fallback_cassette(self, model: str | None) -> dict | None:
+        """Any recorded response for the same model, for load tests with unrecorded prompts."""
+        candidates = self.fallbacks.get(model)
+        return random.choice(candidates) if candidates else None
+
+    def response_delay(self, cassette: dict) -> float:
+        """Seconds to wait before answering a replayed call."""
+        latency = self.args.latency
+        base = cassette.get("upstream_ms", 0) if latency == "recorded" else float(latency)
+        jitter = random.uniform(-self.args.jitter, self.args.jitter) if self.args.jitter else 0
+        return max(0.0, base + jitter) / 1000
+
+
+class MessagesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockAnthropic
+
+    def log_message(self, format, *args):
+        if not self.server.args.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, error_type: str, message: str) -> None:
+        self.send_json(status, {"type": "error", "error": {"type": error_type, "message": message}})
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("", "/health"):
+            with self.server.lock:
+                stats = dict(self.server.stats)
+            self.send_json(200, {"status": "ok", "mode": self.server.args.mode, **stats})
+        else:
+            self.send_error_json(404, "not_found_error", f"No route for GET {self.path}")
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/v1/messages":
+            self.send_error_json(404, "not_found_error", f"No route for POST {self.path}")
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length).decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            self.send_error_json(400, "invalid_request_error", "Request body is not valid JSON")
+            return
+
+        args = self.server.args
+        key = cassette_key(body)
+        cassette = None if args.mode == "record" else load_cassette(key)
+        if cassette is not None:
+            self.server.count("hits")
+        elif args.mode == "replay" and args.fallback:
+            cassette = self.server.fallback_cassette(body.get("model"))
+            if cassette is not None:
+                self.server.count("fallbacks")
+
+        if cassette is not None:
+            time.sleep(self.server.response_delay(cassette))
+            message = cassette["response"]
+        elif args.mode == "replay":
+            self.server.count("misses")
+            self.send_error_json(404, "not_found_error", f"No cassette for request {key[:12]} (replay mode)")
+            return
+        else:
+            try:
+                message, upstream_ms = record(body, {k.lower(): v for k, v in self.headers.items()}, args.upstream)
+            except urllib.error.HTTPError as e:
+                # Pass upstream errors through untouched so the SDK sees the real thing
+                self.server.count("upstream_errors")
+                data = e.read()
+                self.send_response(e.code)
+                self.send_header("Content-Type", e.headers.get("Content-Type", "application/json"))
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            except (urllib.error.URLError, TimeoutError) as e:
+                self.server.count("upstream_errors")
+                self.send_error_json(502, "api_error", f"Upstream unreachable: {getattr(e, 'reason', e)}")
+                return
+            save_cassette(key, body, message, upstream_ms)
+            self.server.count("recorded")
+
+        if body.get("stream"):
+            self.stream(message)
+        else:
+            self.send_json(200, message)
+
+    def stream(self, message: dict) -> None:
+        args = self.server.args
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            for event, data in sse_events(message, args.chunk_chars):
+                self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if event == "content_block_delta" and args.chunk_delay:
+                    time.sleep(args.chunk_delay / 1000)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client aborted the stream
+
+
+def parse_latency(value: str) -> str | float:
+    if value == "recorded":
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected milliseconds or 'recorded'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/replay stand-in for the Anthropic Messages API")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--mode", choices=MODES, default="replay",
+                        help="replay cassettes only, record every call, or auto (record misses)")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM, help="API to record from")
+    parser.add_argument("--latency", type=parse_latency, default=0.0,
+                        help="Replay delay in ms before responding, or 'recorded' (default: 0)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± random ms added to the replay delay")
+    parser.add_argument("--chunk-chars", type=int, default=20, help="Characters per streamed text delta")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="ms between streamed deltas")
+    parser.add_argument("--fallback", action="store_true",
+                        help="On a replay miss, answer with a random cassette for the same model")
+    parser.add_argument("--quiet", action="store_true", help="Don't log each request")
+    args = parser.parse_args()
+    args.chunk_chars = max(1, args.chunk_chars)
+
+    cassettes = len(list(CASSETTES_DIR.glob("*.json"))) if CASSETTES_DIR.exists() else 0
+    print(f"Mock Anthropic API ({args.mode}) on http://localhost:{args.port}")
+    print(f"  {cassettes} cassettes in {CASSETTES_DIR.relative_to(SCRIPT_DIR.parent)}")
+    if args.fallback:
+        print("  Fallback cassettes are indexed at startup; restart to pick up new recordings")
+    print(f"  Run the dev server with ANTHROPIC_BASE_URL=http://localhost:{args.port}\n")
+
+    server = MockAnthropic(("127.0.0.1", args.port), args)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped. {dict(server.stats) or 'No requests'}")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Vercel KV (the Upstash Redis REST API).
+
+@vercel/kv talks HTTP, not the Redis protocol, so a plain local Redis
+can't back it directly. This serves the REST API from memory, enough for
+the planner routes (rate-limit counters, report and retry storage):
+
+  python scripts/mock-kv.py                              # Listen on :8079
+  KV_REST_API_URL=http://localhost:8079 KV_REST_API_TOKEN=local npm run dev
+
+Usage:
+  python scripts/mock-kv.py --port 8079 --token local
+  python scripts/mock-kv.py --latency 5                  # Add ms per request (Upstash round trip)
+
+Commands: GET, SET (EX/PX/NX/XX), DEL, EXISTS, INCR, INCRBY, DECR,
+EXPIRE, PEXPIRE, TTL, ZADD, ZCARD, ZREMRANGEBYSCORE, PING, FLUSHALL -
+single (POST /), pipelined (POST /pipeline) and transactions
+(POST /multi-exec). Responses honour the `Upstash-Encoding: base64`
+header the client sends.
+
+EVAL, EVALSHA and SCRIPT LOAD run real Lua (the planner's rate limiter,
+lib/planner/rate-limit.ts) when lupa is installed (pip install lupa);
+scripts run under the store lock, so they are atomic as in Redis.
+Without lupa they return an error and the limiter fails open.
+
+GET /stats returns command counts and key totals for load-test runs.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import lupa
+except ImportError:
+    lupa = None
+
+DEFAULT_PORT = 8079
+DEFAULT_TOKEN = "local"
+
+
+class CommandError(Exception):
+    """A Redis error reply (the command failed, the request didn't)."""
+
+
+# ============================================
+# Store
+# ============================================
+
+WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+
+class Store:
+    """In-memory keyspace (strings and sorted sets) with millisecond expiry."""
+
+    def __init__(self):
+        self.data: dict[str, str | dict[str, float]] = {}
+        self.expires: dict[str, float] = {}
+        # Re-entrant so /multi-exec and scripts can hold it across commands
+        self.lock = threading.RLock()
+        self.scripts: dict[str, str] = {}
+        self.lua = lupa.LuaRuntime(unpack_returned_tuples=True) if lupa else None
+        self.compiled = {}
+
+    def _live(self, key: str) -> bool:
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _zset(self, key: str, create: bool = False) -> dict[str, float] | None:
+        if not self._live(key):
+            if not create:
+                return None
+            self.data[key] = {}
+        value = self.data[key]
+        if not isinstance(value, dict):
+            raise CommandError(WRONGTYPE)
+        return value
+
+    def _incrby(self, key: str, amount: int) -> int:
+        current = self.data.get(key, "0") if self._live(key) else "0"
+        if isinstance(current, dict):
+            raise CommandError(WRONGTYPE)
+        try:
+            value = int(current) + amount
+        except ValueError:
+            raise CommandError("ERR value is not an integer or out of range")
+        self.data[key] = str(value)
+        return value
+
+    def execute(self, command: list):
+        """Run one command (name plus arguments) under the store lock."""
+        if not command:
+            raise CommandError("ERR empty command")
+        name, args = str(command[0]).upper(), [str(a) for a in command[1:]]
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            raise CommandError(f"ERR unknown command '{name}'")
+        with self.lock:
+            return handler(*args)
+
+    def cmd_ping(self, *args):
+        return args[0] if args else "PONG"
+
+    def cmd_get(self, key):
+        if not self._live(key):
+            return None
+        if isinstance(self.data[key], dict):
+            raise CommandError(WRONGTYPE)
+        return self.data[key]
+
+    def cmd_set(self, key, value, *options):
+        opts = [o.upper() for o in options]
+        exists = self._live(key)
+        if ("NX" in opts and exists) or ("XX" in opts and not exists):
+            return None
+        expires_at = None
+        for unit, scale in (("EX", 1), ("PX", 0.001)):
+            if unit in opts:
+                expires_at = time.time() + int(options[opts.index(unit) + 1]) * scale
+        self.data[key] = value
+        if expires_at is not None:
+            self.expires[key] = expires_at
+        elif "KEEPTTL" not in opts:
+            self.expires.pop(key, None)
+        return "OK"
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._live(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._live(key))
+
+    def cmd_incr(self, key):
+        return self._incrby(key, 1)
+
+    def cmd_incrby(self, key, amount):
+        return self._incrby(key, int(amount))
+
+    def cmd_decr(self, key):
+        return self._incrby(key, -1)
+
+    def cmd_expire(self, key, seconds):
+        return self.cmd_pexpire(key, int(seconds) * 1000)
+
+    def cmd_pexpire(self, key, milliseconds):
+        if not self._live(key):
+            return 0
+        self.expires[key] = time.time() + int(milliseconds) / 1000
+        return 1
+
+    def cmd_ttl(self, key):
+        if not self._live(key):
+            return -2
+        expires_at = self.expires.get(key)
+        return -1 if expires_at is None else max(0, round(expires_at - time.time()))
+
+    def cmd_zadd(self, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise CommandError("ERR syntax error")
+        zset = self._zset(key, create=True)
+        added = 0
+        for score, member in zip(pairs[::2], pairs[1::2]):
+            added += member not in zset
+            zset[member] = float(score)
+        return added
+
+    def cmd_zcard(self, key):
+        zset = self._zset(key)
+        return len(zset) if zset else 0
+
+    def cmd_zremrangebyscore(self, key, low, high):
+        zset = self._zset(key)
+        if not zset:
+            return 0
+        low_score, high_score = _score_bound(low), _score_bound(high)
+        doomed = [m for m, score in zset.items() if low_score <= score <= high_score]
+        for member in doomed:
+            del zset[member]
+        return len(doomed)
+
+    def cmd_flushall(self, *args):
+        self.data.clear()
+        self.expires.clear()
+        return "OK"
+
+    # Scripting
+
+    def cmd_script(self, subcommand, *args):
+        if subcommand.upper() != "LOAD" or len(args) != 1:
+            raise CommandError("ERR only SCRIPT LOAD is supported")
+        sha = hashlib.sha1(args[0].encode("utf-8")).hexdigest()
+        self.scripts[sha] = args[0]
+        return sha
+
+    def cmd_eval(self, script, numkeys, *rest):
+        self.cmd_script("LOAD", script)
+        return self._run_script(script, int(numkeys), rest)
+
+    def cmd_evalsha(self, sha, numkeys, *rest):
+        script = self.scripts.get(sha.lower())
+        if script is None:
+            raise CommandError("NOSCRIPT No matching script. Please use EVAL.")
+        return self._run_script(script, int(numkeys), rest)
+
+    def _run_script(self, script: str, numkeys: int, rest: tuple):
+        if self.lua is None:
+            raise CommandError("ERR scripting needs lupa (pip install lupa)")
+        sha = hashlib.sha1(script.encode("utf-8")).hexdigest()
+        if sha not in self.compiled:
+            try:
+                self.compiled[sha] = self.lua.compile(script)
+            except lupa.LuaError as e:
+                raise CommandError(f"ERR Error compiling script: {e}")
+        lua_globals = self.lua.globals()
+        lua_globals.KEYS = self.lua.table_from(list(rest[:numkeys]))
+        lua_globals.ARGV = self.lua.table_from(list(rest[numkeys:]))
+        lua_globals.redis = self.lua.table_from({"call": self._redis_call})
+        try:
+            return self._from_lua(self.compiled[sha]())
+        except lupa.LuaError as e:
+            raise CommandError(f"ERR Error running script: {e}")
+
+    def _redis_call(self, *command):
+        """redis.call: run a command in the script's context (the lock is held)."""
+        name = str(command[0]).lower()
+        handler = getattr(self, f"cmd_{name}", None)
+        if handler is None or name in ("eval", "evalsha", "script"):
+            raise CommandError(f"ERR unknown command '{command[0]}' in script")
+        return self._to_lua(handler(*[_lua_arg(a) for a in command[1:]]))
+
+    def _to_lua(self, value):
+        # Redis nil replies are false in Lua
+        if value is None:
+            return False
+        if isinstance(value, list):
+            return self.lua.table_from([self._to_lua(v) for v in value])
+        return value
+
+    def _from_lua(self, value):
+        # Lua -> Redis reply conversion: numbers truncate, false is nil, true is 1
+        if value is None or value is False:
+            return None
+        if value is True:
+            return 1
+        if isinstance(value, float):
+            return int(value)
+        if lupa.lua_type(value) == "table":
+            items = []
+            for i in range(1, len(value) + 1):
+                if value[i] is None:
+                    break
+                items.append(self._from_lua(value[i]))
+            return items
+        return value
+
+
+def _score_bound(value: str) -> float:
+    if value in ("-inf", "+inf", "inf"):
+        return float(value)
+    return float(value.lstrip("("))
+
+
+def _lua_arg(value) -> str:
+    # Lua numbers arrive as int/float; Redis sees every argument as a string
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+# ============================================
+# Server
+# ============================================
+
+def encode_result(value):
+    """Base64-encode string results, as Upstash does for `Upstash-Encoding: base64`."""
+    if isinstance(value, str):
+        return base64.b64encode(value.encode("utf-8")).decode("ascii")
+    if isinstance(value, list):
+        return [encode_result(v) for v in value]
+    return value
+
+
+class MockKV(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open many keep-alive connections at once
+    request_queue_size = 128
+
+    def __init__(self, address, args):
+        super().__init__(address, RestHandler)
+        self.args = args
+        self.store = Store()
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+
+    def run(self, command: list) -> dict:
+        """One command as an Upstash reply: {"result": ...} or {"error": ...}."""
+        with self.stats_lock:
+            self.stats[str(command[0]).upper() if command else "?"] += 1
+        try:
+            return {"result": self.store.execute(command)}
+        except CommandError as e:
+            return {"error": str(e)}
+        except (TypeError, ValueError, IndexError):
+            return {"error": f"ERR wrong arguments for '{command[0]}' command"}
+
+
+class RestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; Nagle would hold the body
+    # back for a delayed ACK (~40ms) on every keep-alive request
+    disable_nagle_algorithm = True
+    server: MockKV
+
+    def log_message(self, format, *args):
+        if self.server.args.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, data) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.server.stats_lock:
+                commands = dict(self.server.stats)
+            self.send_json(200, {"keys": len(self.server.store.data), "commands": commands})
+        else:
+            self.send_json(404, {"error": f"No route for GET {self.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+
+        if self.headers.get("Authorization") != f"Bearer {self.server.args.token}":
+            self.send_json(401, {"error": "Unauthorized"})
+            return
+        try:
+            body = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            self.send_json(400, {"error": "ERR failed to parse command"})
+            return
+
+        if self.server.args.latency:
+            time.sleep(self.server.args.latency / 1000)
+
+        base64_results = self.headers.get("Upstash-Encoding", "").lower() == "base64"
+        path = self.path.split("?")[0].rstrip("/")
+
+        if path in ("/pipeline", "/multi-exec"):
+            if path == "/multi-exec":
+                # Hold the store lock across the batch so it applies atomically
+                with self.server.store.lock:
+                    replies = [self.server.run(command) for command in body]
+            else:
+                replies = [self.server.run(command) for command in body]
+            if base64_results:
+                replies = [{**r, "result": encode_result(r["result"])} if "result" in r else r for r in replies]
+            self.send_json(200, replies)
+            return
+
+        reply = self.server.run(body)
+        if "error" in reply:
+            self.send_json(400, reply)
+            return
+        self.send_json(200, {"result": encode_result(reply["result"]) if base64_results else reply["result"]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory stand-in for the Vercel KV / Upstash REST API")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--token", default=DEFAULT_TOKEN, help=f"Bearer token to accept (default: {DEFAULT_TOKEN})")
+    parser.add_argument("--latency", type=float, default=0.0, help="ms added to every request")
+    parser.add_argument("--verbose", action="store_true", help="Log each request")
+    args = parser.parse_args()
+
+    print(f"Mock KV on http://localhost:{args.port}")
+    print(f"  Run the dev server with KV_REST_API_URL=http://localhost:{args.port} "
+          f"KV_REST_API_TOKEN={args.token}")
+    if lupa is None:
+        print("  lupa not installed: EVAL fails, so the rate limiter fails open")
+    print()
+
+    server = MockKV(("127.0.0.1", args.port), args)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped. {len(server.store.data)} keys, {sum(server.stats.values())} commands")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,62 +2,177 @@
 """
 Complete QA Suite for leomayn.com
 Runs all QA checks: SEO meta tags, visual screenshots, and OpenGraph previews.
+
+Usage:
+  python scripts/qa-all.py                       # All suites, one after another
+  python scripts/qa-all.py /services             # Limit suites to specific pages
+  python scripts/qa-all.py --parallel            # Run suites concurrently
+  python scripts/qa-all.py --parallel --workers 2
+  python scripts/qa-all.py --local               # Against the local production build
+  python scripts/qa-all.py --local=static        # Prerendered HTML only, no Node process
 """
 
+import argparse
 import os
 import sys
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime
 
+from qa_local import LOCAL_HELP, LocalServerError, local_server, parse_args_with_local
+
 SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# (result name, banner title, script, extra args)
+SUITES = [
+    ("SEO Meta Tags", "SEO Meta Tags Check", "qa-seo.py", []),
+    ("OpenGraph", "OpenGraph Validation", "qa-opengraph.py", []),
+    ("Visual QA", "Visual Screenshots", "qa-visual.py", ["--desktop"]),
+]
+
 
-def run_script(name, script_path, args=None):
-    """Run a QA script and return success status."""
+@dataclass
+class SuiteResult:
+    """Outcome of a single QA suite run."""
+    name: str
+    passed: bool
+    returncode: int
+    wall_time: float
+    cpu_time: float | None
+    output: str = ""
+
+
+def print_banner(title):
     print(f"\n{'='*60}")
-    print(f"Running: {name}")
+    print(f"Running: {title}")
     print('='*60)
 
+
+def run_script(name, script_path, args=None, capture=False):
+    """Run a QA script and return its SuiteResult.
+
+    With capture=True the script's stdout and stderr are collected into
+    the result instead of streaming to the terminal, so concurrent suites
+    don't interleave their output.
+    """
     cmd = [sys.executable, script_path]
     if args:
         cmd.extend(args)
 
-    result = subprocess.run(cmd, cwd=SCRIPTS_DIR)
-    return result.returncode == 0
+    env = dict(os.environ, PYTHONIOENCODING="utf-8", PYTHONUNBUFFERED="1")
+    pipe = subprocess.PIPE if capture else None
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd,
+        cwd=SCRIPTS_DIR,
+        env=env,
+        stdout=pipe,
+        stderr=subprocess.STDOUT if capture else None,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    output = proc.stdout.read() if capture else ""
+    if capture:
+        proc.stdout.close()
+
+    # wait4 gives us the child's own resource usage, which is what we want
+    # when several suites run at once (RUSAGE_CHILDREN would lump them together)
+    cpu_time = None
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        cpu_time = usage.ru_utime + usage.ru_stime
+    else:
+        proc.wait()
+    wall_time = time.perf_counter() - start
+
+    return SuiteResult(
+        name=name,
+        passed=proc.returncode == 0,
+        returncode=proc.returncode,
+        wall_time=wall_time,
+        cpu_time=cpu_time,
+        output=output,
+    )
+
+
+def run_serial(args):
+    """Run each suite in turn, streaming output live."""
+    results = []
+    for name, title, script, extra in SUITES:
+        print_banner(title)
+        results.append(run_script(name, os.path.join(SCRIPTS_DIR, script), args + extra))
+    return results
+
+
+def run_parallel(args, workers):
+    """Run suites concurrently, printing each one's output as it finishes."""
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                run_script, name, os.path.join(SCRIPTS_DIR, script), args + extra, True
+            ): title
+            for name, title, script, extra in SUITES
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            print_banner(f"{futures[future]} (finished in {result.wall_time:.1f}s)")
+            print(result.output, end="" if result.output.endswith("\n") else "\n")
+            results[result.name] = result
+
+    # Keep the summary in suite order regardless of completion order
+    return [results[name] for name, _, _, _ in SUITES]
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the complete leomayn.com QA suite")
+    parser.add_argument("pages", nargs="*", help="Page paths to check (e.g. / /services)")
+    parser.add_argument("--parallel", action="store_true", help="Run suites concurrently")
+    parser.add_argument("--workers", type=int, default=len(SUITES),
+                        help=f"Max concurrent suites in --parallel mode (default: {len(SUITES)})")
+    parser.add_argument("--local", action="store_true", help=LOCAL_HELP)
+    args = parse_args_with_local(parser)
+
+    if not args.local:
+        return run_suites(args)
+
+    # One server for all suites; the child scripts pick it up via QA_SITE_URL
+    try:
+        with local_server(args.local) as site_url:
+            os.environ["QA_SITE_URL"] = site_url
+            return run_suites(args)
+    except LocalServerError as e:
+        print(f"✗ {e}")
+        return 1
+
+
+def run_suites(args):
     print("\n" + "="*60)
     print("LEOMAYN.COM - COMPLETE QA SUITE")
     print(f"Run at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    if args.parallel:
+        print(f"Mode: parallel ({max(1, args.workers)} workers)")
+    if os.environ.get("QA_SITE_URL"):
+        print(f"Site: {os.environ['QA_SITE_URL']}")
     print("="*60)
 
-    # Parse arguments
-    pages = [arg for arg in sys.argv[1:] if arg.startswith("/")]
-    args = pages if pages else None
+    pages = [p for p in args.pages if p.startswith("/")]
 
-    results = {}
-
-    # 1. SEO Meta Tags
-    results["SEO Meta Tags"] = run_script(
-        "SEO Meta Tags Check",
-        os.path.join(SCRIPTS_DIR, "qa-seo.py"),
-        args
-    )
+    # Child scripts share crawl snapshots fetched under the same run id,
+    # so each page is downloaded once per QA run (see qa_crawl.py)
+    os.environ.setdefault("QA_RUN_ID", f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}")
 
-    # 2. OpenGraph Validation
-    results["OpenGraph"] = run_script(
-        "OpenGraph Validation",
-        os.path.join(SCRIPTS_DIR, "qa-opengraph.py"),
-        args
-    )
-
-    # 3. Visual Screenshots
-    results["Visual QA"] = run_script(
-        "Visual Screenshots",
-        os.path.join(SCRIPTS_DIR, "qa-visual.py"),
-        (args or []) + ["--desktop"]
-    )
+    run_start = time.perf_counter()
+    if args.parallel:
+        results = run_parallel(pages, max(1, args.workers))
+    else:
+        results = run_serial(pages)
+    total_wall = time.perf_counter() - run_start
 
     # Summary
     print("\n" + "="*60)
@@ -65,12 +180,16 @@ def main():
     print("="*60)
 
     all_passed = True
-    for name, passed in results.items():
-        status = "✓ PASS" if passed else "✗ FAIL"
-        print(f"  {status}: {name}")
-        if not passed:
+    for result in results:
+        status = "✓ PASS" if result.passed else "✗ FAIL"
+        cpu = f"{result.cpu_time:6.1f}s cpu" if result.cpu_time is not None else "     n/a cpu"
+        print(f"  {status}: {result.name:<16} {result.wall_time:6.1f}s wall  {cpu}")
+        if not result.passed:
             all_passed = False
 
+    suite_total = sum(r.wall_time for r in results)
+    print(f"\n  Total wall time: {total_wall:.1f}s (suites sum to {suite_total:.1f}s)")
+
     print()
     if all_passed:
         print("✓ All QA checks passed!")
@@ -2,23 +2,55 @@
 """
 OpenGraph QA Script for leomayn.com
 Validates OG tags and generates social preview mockups.
+
+Usage:
+  python scripts/qa-opengraph.py                      # Check PAGES, previews rendered in Chromium
+  python scripts/qa-opengraph.py /services            # One page
+  python scripts/qa-opengraph.py --renderer pillow    # Draw previews with Pillow, no browser
+  python scripts/qa-opengraph.py --sitemap --renderer pillow
+  python scripts/qa-opengraph.py --store tiles        # Deduplicated tile storage (qa_tiles.py)
+  python scripts/qa-opengraph.py --local              # Against the local production build
 """
 
+import asyncio
 import os
 import sys
+import time
 import requests
-import re
 from io import BytesIO
 from urllib.parse import urljoin, quote
-from playwright.sync_api import sync_playwright
+from xml.etree import ElementTree
+
+from qa_browser import CONTEXT_OPTIONS, READY_SCRIPT
+from qa_crawl import fetch_sitemap_paths, fetch_snapshot
+from qa_local import LocalServerError, local_mode_from_argv, local_server, rebase
+from qa_html import parse_head
+from qa_images import probe_image
+
+try:
+    from PIL import Image
+
+    import qa_cards
+    import qa_tiles
+except ImportError:  # Pillow is only needed for --store tiles and --renderer pillow
+    Image = qa_cards = qa_tiles = None
 
 # Configuration
-SITE_URL = "https://www.leomayn.com"
+SITE_URL = os.environ.get("QA_SITE_URL", "https://www.leomayn.com")
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "qa-screenshots", "og-previews")
 
 # Pages to check
 PAGES = ["/", "/services", "/about", "/contact"]
 
+# Preview tabs rendered at once in the shared browser
+DEFAULT_CONCURRENCY = 6
+
+# First entry is the default
+STORES = ("png", "tiles")
+RENDERERS = ("browser", "pillow")
+
+USER_AGENT = "Mozilla/5.0 (compatible; OG-QA-Bot/1.0)"
+
 # Platform requirements
 PLATFORMS = {
     "facebook": {
@@ -53,57 +85,19 @@ def ensure_output_dir():
 
 
 def fetch_page(url):
-    """Fetch page HTML."""
+    """Fetch page HTML (via the shared crawl snapshot cache)."""
     try:
-        response = requests.get(url, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (compatible; OG-QA-Bot/1.0)"
-        })
-        response.raise_for_status()
-        return response.text
+        snapshot = fetch_snapshot(url, user_agent=USER_AGENT)
+        return snapshot.text
     except requests.RequestException as e:
         return None
 
 
-def extract_meta(html, name):
-    """Extract meta tag content."""
-    patterns = [
-        rf'<meta\s+property="{name}"\s+content="([^"]*)"',
-        rf'<meta\s+content="([^"]*)"\s+property="{name}"',
-        rf'<meta\s+name="{name}"\s+content="([^"]*)"',
-        rf'<meta\s+content="([^"]*)"\s+name="{name}"',
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, html, re.IGNORECASE)
-        if match:
-            return match.group(1)
-    return None
-
-
-def extract_title(html):
-    """Extract title tag."""
-    match = re.search(r'<title>([^<]*)</title>', html, re.IGNORECASE)
-    return match.group(1) if match else None
-
-
 def get_image_dimensions(url):
-    """Fetch image and get dimensions."""
+    """Get image dimensions from its header (see qa_images.py)."""
     try:
-        response = requests.get(url, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (compatible; OG-QA-Bot/1.0)"
-        })
-        response.raise_for_status()
-
-        # Use PIL if available, otherwise estimate from content
-        try:
-            from PIL import Image
-            img = Image.open(BytesIO(response.content))
-            return img.size
-        except ImportError:
-            # Fallback: check content-length suggests valid image
-            if len(response.content) > 1000:
-                return (1200, 630)  # Assume valid if substantial content
-            return None
-    except:
+        return probe_image(url, user_agent=USER_AGENT).size
+    except (requests.RequestException, ValueError):
         return None
 
 
@@ -113,20 +107,24 @@ def validate_og_tags(url):
     if not html:
         return {"error": "Failed to fetch page"}
 
+    head = parse_head(html)
+    meta = head["meta"]
+
     og_data = {
         "url": url,
-        "title": extract_meta(html, "og:title") or extract_title(html),
-        "description": extract_meta(html, "og:description") or extract_meta(html, "description"),
-        "image": extract_meta(html, "og:image"),
-        "site_name": extract_meta(html, "og:site_name"),
-        "type": extract_meta(html, "og:type"),
-        "twitter_card": extract_meta(html, "twitter:card"),
-        "twitter_image": extract_meta(html, "twitter:image"),
+        "title": meta.get("og:title") or head["title"],
+        "description": meta.get("og:description") or meta.get("description"),
+        "image": meta.get("og:image"),
+        "site_name": meta.get("og:site_name"),
+        "type": meta.get("og:type"),
+        "twitter_card": meta.get("twitter:card"),
+        "twitter_image": meta.get("twitter:image"),
     }
 
     # Validate image
     if og_data["image"]:
-        dims = get_image_dimensions(og_data["image"])
+        # Against a local build, read the image from it rather than production
+        dims = get_image_dimensions(rebase(og_data["image"], SITE_URL))
         if dims:
             og_data["image_width"] = dims[0]
             og_data["image_height"] = dims[1]
@@ -246,17 +244,108 @@ def generate_preview_html(og_data, platform):
     return ""
 
 
-def capture_preview(og_data, platform, output_path):
-    """Capture a screenshot of the preview mockup."""
-    html = generate_preview_html(og_data, platform)
+async def render_preview(context, job, store):
+    """Render one preview mockup in a new tab of the shared browser context."""
+    og_data, platform, output_path = job
+    page = await context.new_page()
+    try:
+        await page.set_content(generate_preview_html(og_data, platform))
+        await page.evaluate(READY_SCRIPT)  # Wait for the og:image and fonts to load
+        if store == "tiles":
+            name = os.path.relpath(output_path, qa_tiles.SCREENSHOT_DIR)
+            image = await page.screenshot()
+            await asyncio.to_thread(qa_tiles.store_image, name, image)
+        else:
+            await page.screenshot(path=output_path)
+    finally:
+        await page.close()
+
+
+async def render_all(jobs, store, concurrency):
+    """Render every (og_data, platform, output_path) job with one browser launch.
+
+    Returns an exception (or None) per job, in order.
+    """
+    limit = asyncio.Semaphore(concurrency)
+
+    async def render(job):
+        async with limit:
+            try:
+                await render_preview(context, job, store)
+            except Exception as e:
+                return e
+            return None
+
+    try:
+        # Only the browser renderer needs Playwright; --renderer pillow runs without it
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            try:
+                context = await browser.new_context(viewport={"width": 700, "height": 500}, **CONTEXT_OPTIONS)
+                return await asyncio.gather(*(render(job) for job in jobs))
+            finally:
+                await browser.close()
+    except Exception as e:
+        # No browser (Playwright or Chromium not installed): every preview fails the
+        # same way, and the caller still reports each one and the summary
+        return [e] * len(jobs)
+
+
+def render_previews(jobs, store="png", concurrency=DEFAULT_CONCURRENCY):
+    """Capture screenshots of the preview mockups.
+
+    With store="tiles" each image goes to the tile store (qa_tiles.py)
+    under its path relative to qa-screenshots/ instead of output_path.
+    """
+    if not jobs:
+        return []
+    return asyncio.run(render_all(jobs, store, max(1, concurrency)))
+
+
+def parse_option(argv, name, choices):
+    """Read --name value / --name=value from argv; the first choice is the default."""
+    for i, arg in enumerate(argv):
+        if arg.startswith(f"--{name}="):
+            value = arg.split("=", 1)[1]
+        elif arg == f"--{name}" and i + 1 < len(argv):
+            value = argv[i + 1]
+        else:
+            continue
+        if value not in choices:
+            raise SystemExit(f"--{name} must be one of: {', '.join(choices)}")
+        return value
+    return choices[0]
+
+
+def render_previews_native(jobs, store="png"):
+    """Draw the preview mockups with Pillow (qa_cards.py) instead of a browser.
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page(viewport={"width": 700, "height": 500})
-        page.set_content(html)
-        page.wait_for_timeout(500)
-        page.screenshot(path=output_path)
-        browser.close()
+    Returns an exception (or None) per job, in order, like render_previews.
+    """
+    images = {}
+    errors = []
+    for og_data, platform, output_path in jobs:
+        try:
+            url = og_data.get("image")
+            if url and url not in images:
+                try:
+                    snapshot = fetch_snapshot(rebase(url, SITE_URL), user_agent=USER_AGENT)
+                    images[url] = Image.open(BytesIO(snapshot.body))
+                    images[url].load()
+                except (requests.RequestException, OSError):
+                    images[url] = None  # Drawn as the empty image box, as in the browser
+            png = qa_cards.render_card_png(og_data, platform, images.get(url))
+            if store == "tiles":
+                qa_tiles.store_image(os.path.relpath(output_path, qa_tiles.SCREENSHOT_DIR), png)
+            else:
+                with open(output_path, "wb") as f:
+                    f.write(png)
+            errors.append(None)
+        except Exception as e:
+            errors.append(e)
+    return errors
 
 
 def slugify(path):
@@ -267,17 +356,46 @@ def slugify(path):
 
 
 def main():
+    local_mode = local_mode_from_argv(sys.argv[1:])
+    if not local_mode:
+        return run_checks()
+
+    global SITE_URL
+    try:
+        with local_server(local_mode) as SITE_URL:
+            return run_checks()
+    except LocalServerError as e:
+        print(f"✗ {e}")
+        return 1
+
+
+def run_checks():
     print("\n" + "="*60)
     print("OpenGraph QA Script - leomayn.com")
+    print(f"Site: {SITE_URL}")
     print("="*60)
 
     ensure_output_dir()
 
+    store = parse_option(sys.argv[1:], "store", STORES)
+    renderer = parse_option(sys.argv[1:], "renderer", RENDERERS)
+    if (store == "tiles" or renderer == "pillow") and qa_tiles is None:
+        print("✗ --store tiles and --renderer pillow need Pillow: pip install pillow")
+        return 1
+
     pages = PAGES
-    if len(sys.argv) > 1 and sys.argv[1].startswith("/"):
-        pages = [sys.argv[1]]
+    page_args = [arg for arg in sys.argv[1:] if arg.startswith("/")]
+    if page_args:
+        pages = page_args[:1]
+    elif "--sitemap" in sys.argv:
+        try:
+            pages = fetch_sitemap_paths(SITE_URL)
+        except (requests.RequestException, ElementTree.ParseError) as e:
+            print(f"✗ Could not read sitemap: {e}")
+            return 1
 
     all_passed = True
+    preview_jobs = []
 
     for path in pages:
         url = f"{SITE_URL}{path}"
@@ -323,15 +441,10 @@ def main():
             print(f"  ✗ Image failed to load")
             all_passed = False
 
-        # Generate preview mockups
-        print(f"\n  Generating preview mockups...")
+        # Preview mockups are rendered together after all pages are checked
         for platform_key in ["facebook", "linkedin", "twitter"]:
             output_path = os.path.join(OUTPUT_DIR, f"{slug}-{platform_key}.png")
-            try:
-                capture_preview(og_data, platform_key, output_path)
-                print(f"    ✓ {platform_key}: {os.path.basename(output_path)}")
-            except Exception as e:
-                print(f"    ✗ {platform_key}: {e}")
+            preview_jobs.append((og_data, platform_key, output_path))
 
         # Print debugger links
         print(f"\n  Debugger links (for manual verification):")
@@ -342,6 +455,24 @@ def main():
             else:
                 print(f"    {platform['name']}: {platform['debugger']}{encoded_url}")
 
+    # Generate preview mockups
+    print(f"\n{'─'*60}")
+    print(f"Generating {len(preview_jobs)} preview mockups...")
+    print('─'*60)
+    start = time.perf_counter()
+    if renderer == "pillow":
+        errors = render_previews_native(preview_jobs, store)
+    else:
+        errors = render_previews(preview_jobs, store)
+    for (og_data, platform_key, output_path), error in zip(preview_jobs, errors):
+        page_label = og_data["url"].replace(SITE_URL, "") or "/"
+        if error:
+            print(f"  ✗ {page_label} {platform_key}: {error}")
+        else:
+            print(f"  ✓ {page_label} {platform_key}: {os.path.basename(output_path)}")
+    how = "with Pillow" if renderer == "pillow" else "with one browser"
+    print(f"  Rendered in {time.perf_counter() - start:.1f}s {how}")
+
     # Summary
     print("\n" + "="*60)
     print("SUMMARY")
@@ -352,7 +483,10 @@ def main():
     else:
         print("✗ Some checks failed - review above")
 
-    print(f"\nPreview mockups saved to: {OUTPUT_DIR}")
+    if store == "tiles":
+        print(f"\nPreview mockups stored in: {qa_tiles.TILE_DIR}")
+    else:
+        print(f"\nPreview mockups saved to: {OUTPUT_DIR}")
 
     return 0 if all_passed else 1
 
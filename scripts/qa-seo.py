@@ -4,152 +4,231 @@ SEO QA Script for leomayn.com
 Verifies meta tags, OpenGraph, and provides GSC submission link.
 """
 
+import argparse
+import os
 import requests
-import re
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
+from xml.etree import ElementTree
+
+from qa_crawl import fetch_sitemap_paths, fetch_snapshot, make_session
+from qa_html import parse_head
+from qa_local import LOCAL_HELP, LocalServerError, local_server, parse_args_with_local
+from qa_metadata import load_expected
+from qa_stats import percentile
 
 # Configuration
-SITE_URL = "https://www.leomayn.com"
+SITE_URL = os.environ.get("QA_SITE_URL", "https://www.leomayn.com")
 GSC_URL = "https://search.google.com/search-console"
 
-# Expected values for homepage
-EXPECTED = {
-    "/": {
-        "title": "AI Consulting - Fix Work, Then Scale with AI | Leomayn",
-        "description": "AI consulting that frees your team to focus on work that creates real value. We fix operations first, then scale with automation. Book a discovery call.",
-        "og_title": "AI Consulting - Fix Work, Then Scale with AI | Leomayn",
-        "og_description": "AI consulting that frees your team to focus on work that creates real value. We fix operations first, then scale with automation.",
-        "og_image": "https://leomayn.com/logo/logo-social-1200x630.png",
-    }
-}
+
+def normalize_url(value):
+    """Ignore trailing-slash differences when comparing absolute URLs."""
+    return value.rstrip("/") if value else value
+
+
+# (label, expected key, lookup in parse_head() result, normalizer). Expected
+# values come from the app/ metadata exports (see qa_metadata.py); checks
+# without an expected value only require the tag to be present.
+CHECKS = [
+    ("Title", "title", lambda head: head["title"], None),
+    ("Meta description", "description", lambda head: head["meta"].get("description"), None),
+    ("og:title", "og_title", lambda head: head["meta"].get("og:title"), None),
+    ("og:description", "og_description", lambda head: head["meta"].get("og:description"), None),
+    ("og:image", "og_image", lambda head: head["meta"].get("og:image"), None),
+    ("Canonical", "canonical", lambda head: head["canonical"], normalize_url),
+]
 
 
-def fetch_page(url):
-    """Fetch page HTML."""
+def fetch_page(url, head_only=False, session=None):
+    """Fetch page HTML (via the shared crawl snapshot cache).
+
+    Returns the Snapshot, or None if the fetch failed.
+    """
     try:
-        response = requests.get(url, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) SEO-QA-Bot"
-        })
-        response.raise_for_status()
-        return response.text
+        return fetch_snapshot(
+            url,
+            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) SEO-QA-Bot",
+            head_only=head_only,
+            session=session,
+        )
     except requests.RequestException as e:
         print(f"  ✗ Failed to fetch {url}: {e}")
         return None
 
 
-def extract_meta(html, name):
-    """Extract meta tag content by name or property."""
-    # Try name attribute
-    match = re.search(rf'<meta\s+name="{name}"\s+content="([^"]*)"', html, re.IGNORECASE)
-    if match:
-        return match.group(1)
+def format_bytes(n):
+    return f"{n / 1024:.1f} KB"
 
-    # Try property attribute (for OG tags)
-    match = re.search(rf'<meta\s+property="{name}"\s+content="([^"]*)"', html, re.IGNORECASE)
-    if match:
-        return match.group(1)
 
-    # Try reversed order (content before name/property)
-    match = re.search(rf'<meta\s+content="([^"]*)"\s+name="{name}"', html, re.IGNORECASE)
-    if match:
-        return match.group(1)
+def report_transfer(snapshot):
+    """Print how much of the page was transferred in head-only mode."""
+    if snapshot.from_cache:
+        print("  ↓ Served from crawl snapshot cache")
+    elif snapshot.bytes_saved is not None:
+        print(f"  ↓ Read {format_bytes(snapshot.bytes_read)} of {format_bytes(snapshot.bytes_total)}"
+              f" (saved {format_bytes(snapshot.bytes_saved)})")
+    elif snapshot.bytes_read is not None:
+        print(f"  ↓ Read {format_bytes(snapshot.bytes_read)} (total size unknown)")
 
-    match = re.search(rf'<meta\s+content="([^"]*)"\s+property="{name}"', html, re.IGNORECASE)
-    if match:
-        return match.group(1)
 
-    return None
+def check_value(label, actual, expected_value):
+    """Compare one tag against its expected value (or just require it)."""
+    if expected_value is None:
+        if actual:
+            print(f"  ✓ {label} present: {actual[:60]}...")
+            return True
+        print(f"  ✗ {label} missing")
+        return False
 
+    if actual == expected_value:
+        print(f"  ✓ {label}: {actual[:50]}...")
+        return True
 
-def extract_title(html):
-    """Extract title tag content."""
-    match = re.search(r'<title>([^<]*)</title>', html, re.IGNORECASE)
-    return match.group(1) if match else None
+    print(f"  ✗ {label} mismatch:")
+    print(f"    Expected: {expected_value}")
+    print(f"    Actual:   {actual}")
+    return False
 
 
-def check_page(path, expected):
+def check_page(path, expected, head_only=False):
     """Check a single page against expected values."""
     url = urljoin(SITE_URL, path)
     print(f"\n{'='*60}")
     print(f"Checking: {url}")
     print('='*60)
 
-    html = fetch_page(url)
-    if not html:
+    snapshot = fetch_page(url, head_only=head_only)
+    if not snapshot:
         return False
+    if head_only:
+        report_transfer(snapshot)
+    html = snapshot.text
 
+    head = parse_head(html)
     all_passed = True
 
-    # Check title
-    actual_title = extract_title(html)
-    if actual_title == expected.get("title"):
-        print(f"  ✓ Title: {actual_title[:50]}...")
-    else:
-        print(f"  ✗ Title mismatch:")
-        print(f"    Expected: {expected.get('title')}")
-        print(f"    Actual:   {actual_title}")
-        all_passed = False
-
-    # Check meta description
-    actual_desc = extract_meta(html, "description")
-    if actual_desc == expected.get("description"):
-        print(f"  ✓ Meta description: {actual_desc[:50]}...")
-    else:
-        print(f"  ✗ Meta description mismatch:")
-        print(f"    Expected: {expected.get('description')}")
-        print(f"    Actual:   {actual_desc}")
-        all_passed = False
-
-    # Check OG title
-    actual_og_title = extract_meta(html, "og:title")
-    if actual_og_title == expected.get("og_title"):
-        print(f"  ✓ og:title: {actual_og_title[:50]}...")
-    else:
-        print(f"  ✗ og:title mismatch:")
-        print(f"    Expected: {expected.get('og_title')}")
-        print(f"    Actual:   {actual_og_title}")
-        all_passed = False
-
-    # Check OG description
-    actual_og_desc = extract_meta(html, "og:description")
-    if actual_og_desc == expected.get("og_description"):
-        print(f"  ✓ og:description: {actual_og_desc[:50]}...")
-    else:
-        print(f"  ✗ og:description mismatch:")
-        print(f"    Expected: {expected.get('og_description')}")
-        print(f"    Actual:   {actual_og_desc}")
-        all_passed = False
-
-    # Check OG image
-    actual_og_image = extract_meta(html, "og:image")
-    expected_og_image = expected.get("og_image")
-    if expected_og_image:
-        if actual_og_image == expected_og_image:
-            print(f"  ✓ og:image: {actual_og_image[:50]}...")
-        else:
-            print(f"  ✗ og:image mismatch:")
-            print(f"    Expected: {expected_og_image}")
-            print(f"    Actual:   {actual_og_image}")
+    for label, key, lookup, normalize in CHECKS:
+        actual, wanted = lookup(head), expected.get(key)
+        if normalize:
+            actual, wanted = normalize(actual), normalize(wanted)
+        if not check_value(label, actual, wanted):
             all_passed = False
-    elif actual_og_image:
-        print(f"  ✓ og:image present: {actual_og_image[:60]}...")
-    else:
-        print(f"  ⚠ og:image missing (no expected value set)")
-        all_passed = False
 
     return all_passed
 
 
+class PoliteGate:
+    """Spaces request starts at least `delay` seconds apart across threads."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def crawl(paths, concurrency, delay, head_only=False):
+    """Fetch every path concurrently into the snapshot cache.
+
+    Pages are fetched over one pooled keep-alive session; the checks then
+    run serially against the cached snapshots so output stays readable.
+    Prints throughput and fetch latency percentiles.
+    """
+    session = make_session(concurrency)
+    gate = PoliteGate(delay)
+
+    def fetch(path):
+        gate.wait()
+        start = time.perf_counter()
+        snapshot = fetch_page(urljoin(SITE_URL, path), head_only=head_only, session=session)
+        return snapshot, time.perf_counter() - start
+
+    print(f"\nCrawling {len(paths)} pages ({concurrency} concurrent, {delay:.2f}s politeness delay)...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, paths))
+    wall = time.perf_counter() - start
+
+    fetched = [elapsed for snapshot, elapsed in results if snapshot and not snapshot.from_cache]
+    cached = sum(1 for snapshot, _ in results if snapshot and snapshot.from_cache)
+    failed = sum(1 for snapshot, _ in results if not snapshot)
+
+    print(f"  Pages:      {len(paths)} ({len(fetched)} fetched, {cached} from cache, {failed} failed)")
+    print(f"  Wall time:  {wall:.2f}s")
+    print(f"  Throughput: {len(paths) / wall if wall else 0:.1f} pages/sec")
+    if fetched:
+        print(f"  Latency:    p50 {percentile(fetched, 50) * 1000:.0f}ms"
+              f"  p95 {percentile(fetched, 95) * 1000:.0f}ms"
+              f"  max {max(fetched) * 1000:.0f}ms")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="SEO QA checks for leomayn.com")
+    parser.add_argument("pages", nargs="*", help="Page paths to check (default: /)")
+    parser.add_argument("--head-only", action="store_true",
+                        help="Stream each page and stop reading once </head> has been parsed")
+    parser.add_argument("--sitemap", action="store_true",
+                        help="Check every URL in /sitemap.xml, fetched concurrently")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Max concurrent fetches when checking several pages (default: 8)")
+    parser.add_argument("--delay", type=float, default=0.05,
+                        help="Minimum seconds between request starts when crawling (default: 0.05)")
+    parser.add_argument("--local", action="store_true", help=LOCAL_HELP)
+    args = parse_args_with_local(parser)
+
+    if not args.local:
+        return run_checks(args)
+
+    global SITE_URL
+    try:
+        with local_server(args.local) as SITE_URL:
+            return run_checks(args)
+    except LocalServerError as e:
+        print(f"✗ {e}")
+        return 1
+
+
+def run_checks(args):
     print("\n" + "="*60)
     print("SEO QA Script - leomayn.com")
+    print(f"Site: {SITE_URL}")
     print("="*60)
 
     all_passed = True
 
-    for path, expected in EXPECTED.items():
-        if not check_page(path, expected):
+    # Expected values from the page/layout metadata exports; only files
+    # changed since the last run are re-parsed
+    expected_values = load_expected()
+    print(f"\nExpected values indexed for {len(expected_values)} routes")
+
+    if args.sitemap:
+        try:
+            pages = fetch_sitemap_paths(SITE_URL)
+        except (requests.RequestException, ElementTree.ParseError) as e:
+            print(f"\n✗ Failed to read sitemap: {e}")
+            return 1
+    else:
+        pages = args.pages or ["/"]
+
+    if len(pages) > 1:
+        crawl(pages, max(1, args.concurrency), max(0.0, args.delay), head_only=args.head_only)
+
+    for path in pages:
+        expected = expected_values.get(path.rstrip("/") or "/")
+        if expected is None:
+            print(f"\n⚠ No metadata export found for {path} - checking tags are present only")
+        if not check_page(path, expected or {}, head_only=args.head_only):
             all_passed = False
 
     # Summary
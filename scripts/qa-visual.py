@@ -4,14 +4,34 @@ Visual QA Script for leomayn.com
 Takes screenshots of all pages for visual validation.
 """
 
+import asyncio
+import hashlib
+import io
+import json
 import os
 import sys
-from datetime import datetime
-from playwright.sync_api import sync_playwright
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import requests
+from playwright.async_api import async_playwright
+
+from qa_browser import CONTEXT_OPTIONS, FREEZE_SCRIPT, READY_SCRIPT
+from qa_crawl import fetch_snapshot
+from qa_local import LocalServerError, local_mode_from_argv, local_server
+import qa_perf
+
+try:
+    import qa_tiles
+except ImportError:  # Pillow is only needed for --store tiles
+    qa_tiles = None
 
 # Configuration
-SITE_URL = "https://www.leomayn.com"
+SITE_URL = os.environ.get("QA_SITE_URL", "https://www.leomayn.com")
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "qa-screenshots")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+MANIFEST_VERSION = 1
 
 # Pages to capture
 PAGES = [
@@ -34,6 +54,73 @@ VIEWPORTS = {
     "mobile": {"width": 390, "height": 844},  # iPhone 14 Pro
 }
 
+# Pages open at once per viewport context
+DEFAULT_CONCURRENCY = 4
+
+# How the viewport matrix is covered:
+#   resize - load each route once, then resize the same page per viewport
+#   reload - a separate context per viewport, every route loaded in each
+STRATEGIES = ("resize", "reload")
+DEFAULT_STRATEGY = "resize"
+
+# Where captures go: a PNG per capture, or deduplicated tiles (qa_tiles.py)
+STORES = ("png", "tiles")
+
+# Third-party hosts blocked during captures (subdomains included). Analytics
+# beacons keep the network busy and aren't part of what we screenshot.
+# Add more with --block=host1,host2 or QA_BLOCK_HOSTS.
+BLOCKED_HOSTS = [
+    "googletagmanager.com",
+    "google-analytics.com",
+    "analytics.google.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "snap.licdn.com",
+    "px.ads.linkedin.com",
+]
+
+# Served from the shared run cache, alongside same-origin /_next/static/*
+CACHED_RESOURCE_TYPES = {"font", "image"}
+
+# What a capture looks like without taking it: the rendered DOM minus
+# scripts and the QA freeze style, whitespace collapsed, plus the
+# stylesheet URLs (content-hashed by Next, so CSS changes show up) and the
+# viewport. An image replaced under the same URL is not detected.
+FINGERPRINT_SCRIPT = """
+() => {
+  const root = document.documentElement.cloneNode(true);
+  root.querySelectorAll('script, noscript, style[data-qa-freeze], link[rel="preload"], link[rel="prefetch"], link[rel="modulepreload"]')
+    .forEach((el) => el.remove());
+  root.querySelectorAll('[nonce]').forEach((el) => el.removeAttribute('nonce'));
+  return JSON.stringify({
+    html: root.outerHTML.replace(/\\s+/g, ' '),
+    stylesheets: Array.from(document.styleSheets, (sheet) => sheet.href).filter(Boolean),
+    viewport: [window.innerWidth, window.innerHeight, window.devicePixelRatio],
+  });
+}
+"""
+
+# Share of pixels a resized capture may differ from a cold load by (beyond
+# qa_diff's per-channel tolerance and anti-aliasing check) and still match;
+# absorbs font-hinting and sub-pixel noise between two loads
+RESIZE_MAX_RATIO = 0.001
+
+# Elements whose content legitimately varies between runs. Their boxes are
+# recorded in the manifest and ignored by the baseline diff (qa_diff.py).
+MASK_SELECTORS = ["[data-qa-mask]"]
+
+# Document-relative boxes in screenshot (device) pixels
+MASK_SCRIPT = """
+(selectors) => {
+  const dpr = window.devicePixelRatio;
+  return Array.from(document.querySelectorAll(selectors.join(','))).map((el) => {
+    const r = el.getBoundingClientRect();
+    return [r.left + window.scrollX, r.top + window.scrollY, r.width, r.height]
+      .map((v) => Math.round(v * dpr));
+  }).filter(([, , w, h]) => w > 0 && h > 0);
+}
+"""
+
 
 def ensure_output_dir():
     """Create output directory if it doesn't exist."""
@@ -42,6 +129,25 @@ def ensure_output_dir():
     return OUTPUT_DIR
 
 
+def load_manifest():
+    """Per-screenshot DOM fingerprints from earlier runs, keyed by filename."""
+    try:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "screenshots": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "screenshots": {}}
+    return manifest
+
+
+def save_manifest(manifest):
+    tmp = f"{MANIFEST_PATH}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+
+
 def slugify(path):
     """Convert URL path to filename-safe string."""
     if path == "/":
@@ -49,67 +155,420 @@ def slugify(path):
     return path.strip("/").replace("/", "-")
 
 
-def capture_screenshots(pages=None, viewports=None):
-    """Capture screenshots of specified pages."""
-    pages = pages or PAGES
-    viewports = viewports or VIEWPORTS
-
+class CaptureRouter:
+    """Playwright route handler shared by every page and viewport in a run.
+
+    - requests to BLOCKED_HOSTS (and any extra hosts) are aborted
+    - top-level documents come from the crawl snapshot cache
+    - /_next/static/*, fonts and images are fetched once per run through
+      qa_crawl (persisted on disk, revalidated across runs) and then served
+      from memory to every other page and viewport
+
+    Per-page counts of blocked, cached and network requests are kept in
+    `stats`, keyed by Playwright page. With share_assets=False (perf runs)
+    only the blocking applies and everything else goes to the network.
+    """
+
+    def __init__(self, blocked_hosts, share_assets=True):
+        self.blocked_hosts = set(blocked_hosts)
+        self.share_assets = share_assets
+        self.assets = {}
+        self.pending = {}
+        self.stats = {}
+
+    def reset(self, page):
+        self.stats[page] = Counter()
+
+    def is_blocked(self, host):
+        return any(host == h or host.endswith("." + h) for h in self.blocked_hosts)
+
+    def is_cacheable(self, request):
+        if request.resource_type in CACHED_RESOURCE_TYPES:
+            return True
+        return request.url.startswith(f"{SITE_URL}/_next/static/")
+
+    async def load(self, url):
+        """Fetch url once per run, however many pages ask for it at once."""
+        if url in self.assets:
+            return self.assets[url], True
+        if url not in self.pending:
+            # fetch_snapshot blocks on requests, so keep it off the event loop
+            self.pending[url] = asyncio.ensure_future(asyncio.to_thread(fetch_snapshot, url))
+        try:
+            snapshot = await self.pending[url]
+        finally:
+            self.pending.pop(url, None)
+        self.assets[url] = snapshot
+        return snapshot, snapshot.from_cache
+
+    async def handle(self, route):
+        request = route.request
+        try:
+            counts = self.stats.setdefault(request.frame.page, Counter())
+        except Exception:
+            counts = Counter()  # Worker or detached frame; not attributable to a page
+
+        if self.is_blocked(urlparse(request.url).hostname or ""):
+            counts["blocked"] += 1
+            await route.abort("blockedbyclient")
+            return
+
+        is_document = request.resource_type == "document" and request.url.startswith(SITE_URL)
+        if (
+            not self.share_assets
+            or request.method != "GET"
+            or not (is_document or self.is_cacheable(request))
+        ):
+            counts["network"] += 1
+            await route.continue_()
+            return
+
+        try:
+            snapshot, cached = await self.load(request.url)
+        except requests.RequestException:
+            counts["network"] += 1
+            await route.continue_()
+            return
+
+        counts["cached" if cached else "network"] += 1
+        await route.fulfill(status=snapshot.status, headers=snapshot.headers, body=snapshot.body)
+
+
+def format_requests(counts):
+    return f"{counts['network']} network, {counts['cached']} cached, {counts['blocked']} blocked"
+
+
+async def capture_job(page, path, viewport_name, viewport_size, output_dir, router,
+                      manifest, incremental=False, navigate=True, store="png", perf=None):
+    """Take a full-page screenshot of one page in one viewport.
+
+    With navigate=False the page already has `path` loaded and is only
+    resized, which re-runs layout and responsive images but not the load.
+    With incremental=True the screenshot is skipped when the DOM
+    fingerprint matches the manifest entry and the file is still there.
+    With store="tiles" the PNG goes to the tile store instead of disk.
+    With a PerfRecorder, metrics from the navigation are added as "perf".
+    """
+    url = f"{SITE_URL}{path}"
+    filename = f"{slugify(path)}-{viewport_name}.png"
+    filepath = os.path.join(output_dir, filename)
+    router.reset(page)
+    start = time.perf_counter()
+
+    metrics = None
+    try:
+        await page.set_viewport_size(viewport_size)
+        if navigate:
+            if perf:
+                perf.reset()
+            await page.goto(url, wait_until="load", timeout=30000)
+        # Animations are frozen by the context, so the page is ready as soon
+        # as fonts and images (including any new srcset candidates after a
+        # resize) have loaded (see qa_browser.py)
+        await page.evaluate(READY_SCRIPT)
+        if perf and navigate:
+            metrics = await perf.collect(page)
+
+        fingerprint = hashlib.sha256(
+            (await page.evaluate(FINGERPRINT_SCRIPT)).encode("utf-8")
+        ).hexdigest()
+        previous = manifest["screenshots"].get(filename)
+        skipped = (
+            incremental
+            and previous is not None
+            and previous["dom_sha256"] == fingerprint
+            and (qa_tiles.has_image(filename) if store == "tiles" else os.path.exists(filepath))
+        )
+
+        stored = None
+        if skipped:
+            image_hash = previous["sha256"]
+        else:
+            # Full page screenshot
+            if store == "tiles":
+                image = await page.screenshot(full_page=True)
+                stored = await asyncio.to_thread(qa_tiles.store_image, filename, image)
+            else:
+                image = await page.screenshot(path=filepath, full_page=True)
+            image_hash = hashlib.sha256(image).hexdigest()
+            manifest["screenshots"][filename] = {
+                "path": path,
+                "viewport": viewport_name,
+                "dom_sha256": fingerprint,
+                "sha256": image_hash,
+                "masks": await page.evaluate(MASK_SCRIPT, MASK_SELECTORS),
+                "captured_at": time.time(),
+            }
+
+        elapsed = time.perf_counter() - start
+        counts = router.stats[page]
+        mark = "= unchanged, skipped" if skipped else f"✓ {filename}"
+        print(f"Captured {viewport_name}: {path} {mark} ({elapsed:.1f}s; {format_requests(counts)})")
+        return {
+            "path": path,
+            "viewport": viewport_name,
+            "file": filepath,
+            "status": "success",
+            "skipped": skipped,
+            "duration": elapsed,
+            "requests": dict(counts),
+            "navigated": navigate,
+            "sha256": image_hash,
+            "stored": stored,
+            "perf": metrics,
+        }
+
+    except Exception as e:
+        elapsed = time.perf_counter() - start
+        print(f"Captured {viewport_name}: {path} ✗ Error: {e}")
+        return {
+            "path": path,
+            "viewport": viewport_name,
+            "file": None,
+            "status": f"error: {e}",
+            "skipped": False,
+            "duration": elapsed,
+            "requests": dict(router.stats[page]),
+            "navigated": navigate,
+            "perf": metrics,
+        }
+
+
+async def cold_load_screenshot(page, path, viewport_size):
+    """Full-page PNG of path loaded from scratch at viewport_size."""
+    await page.set_viewport_size(viewport_size)
+    await page.goto(f"{SITE_URL}{path}", wait_until="load", timeout=30000)
+    await page.evaluate(READY_SCRIPT)
+    return await page.screenshot(full_page=True)
+
+
+def changed_ratio(result, cold_png, store="png"):
+    """Share of pixels where a capture differs from a cold-load PNG (qa_diff rules)."""
+    import numpy as np
+    import qa_diff  # NumPy and Pillow are only needed when verifying
+
+    if store == "tiles":
+        name = os.path.relpath(result["file"], qa_tiles.SCREENSHOT_DIR)
+        capture = np.asarray(qa_tiles.load_image(name).convert("RGB"))
+    else:
+        capture = qa_diff.load_image(result["file"])
+    cold = qa_diff.load_image(io.BytesIO(cold_png))
+    height = max(capture.shape[0], cold.shape[0])
+    width = max(capture.shape[1], cold.shape[1])
+    changed, _ = qa_diff.changed_mask(qa_diff.pad_to(capture, height, width), qa_diff.pad_to(cold, height, width))
+    return np.count_nonzero(changed) / changed.size
+
+
+async def verify_resized(page, results, viewports, store="png"):
+    """Compare each resized capture against a cold load at the same viewport.
+
+    Sets "matches_cold_load" on every resized result; a mismatch means the
+    page reads the viewport at load time (matchMedia, window.innerWidth)
+    and the route should be captured with --strategy=reload.
+    """
+    for result in results:
+        if result["navigated"] or result["status"] != "success":
+            continue
+        try:
+            cold = await cold_load_screenshot(page, result["path"], viewports[result["viewport"]])
+            if hashlib.sha256(cold).hexdigest() == result["sha256"]:
+                ratio = 0.0  # Identical bytes need no decoding
+            else:
+                ratio = await asyncio.to_thread(changed_ratio, result, cold, store)
+        except Exception as e:
+            print(f"Verified {result['viewport']}: {result['path']} ✗ Cold load failed: {e}")
+            result["matches_cold_load"] = False
+            continue
+        result["matches_cold_load"] = ratio <= RESIZE_MAX_RATIO
+        mark = "✓ matches cold load" if result["matches_cold_load"] else f"✗ differs from cold load ({ratio:.2%} of pixels)"
+        print(f"Verified {result['viewport']}: {result['path']} {mark}")
+
+
+async def capture_all(pages, viewports, concurrency, blocked_hosts, strategy, verify,
+                      incremental, store, perf):
+    """Run the (path, viewport) matrix through a pool of pages.
+
+    reload: one context per viewport, each with up to `concurrency` pages,
+    and every job is a fresh navigation.
+    resize: one context; each job is a route, loaded once in the first
+    viewport and then resized through the rest. With perf the route is
+    loaded afresh in every viewport instead, since a resize has no
+    navigation to measure.
+    """
     output_dir = ensure_output_dir()
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-
-    screenshots = []
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-
-        for viewport_name, viewport_size in viewports.items():
-            context = browser.new_context(
-                viewport=viewport_size,
+    # Perf runs measure real transfers, so nothing is served from the asset cache
+    router = CaptureRouter(blocked_hosts, share_assets=not perf)
+    manifest = load_manifest()
+    recorders = {}
+
+    if strategy == "resize":
+        job_list = [(path, list(viewports)) for path in pages]
+        contexts = {name: None for name in list(viewports)[:1]}
+    else:
+        job_list = [(path, [name]) for name in viewports for path in pages]
+        contexts = {name: None for name in viewports}
+
+    jobs = asyncio.Queue()
+    for index, job in enumerate(job_list):
+        jobs.put_nowait((index, *job))
+    results = [None] * len(job_list)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+
+        # Up to `concurrency` open pages per context
+        pools = {}
+        for viewport_name in contexts:
+            context = await browser.new_context(
+                viewport=viewports[viewport_name],
                 device_scale_factor=2,  # Retina quality
+                **CONTEXT_OPTIONS,
             )
-            page = context.new_page()
-
-            for path in pages:
-                url = f"{SITE_URL}{path}"
-                slug = slugify(path)
-                filename = f"{slug}-{viewport_name}.png"
-                filepath = os.path.join(output_dir, filename)
-
-                print(f"Capturing {viewport_name}: {path}...", end=" ")
-
+            await context.add_init_script(FREEZE_SCRIPT)
+            if perf:
+                await context.add_init_script(qa_perf.PERF_INIT_SCRIPT)
+            await context.route("**/*", router.handle)
+            pool = asyncio.Queue()
+            for _ in range(min(concurrency, len(pages))):
+                page = await context.new_page()
+                if perf:
+                    recorders[page] = await qa_perf.PerfRecorder.attach(page)
+                pool.put_nowait(page)
+            pools[viewport_name] = pool
+
+        async def worker():
+            while not jobs.empty():
+                index, path, viewport_names = jobs.get_nowait()
+                pool = pools[viewport_names[0]]
+                page = await pool.get()
                 try:
-                    page.goto(url, wait_until="networkidle", timeout=30000)
-                    page.wait_for_timeout(500)  # Let animations settle
-
-                    # Full page screenshot
-                    page.screenshot(path=filepath, full_page=True)
-
-                    print(f"✓ {filename}")
-                    screenshots.append({
-                        "path": path,
-                        "viewport": viewport_name,
-                        "file": filepath,
-                        "status": "success"
-                    })
-
-                except Exception as e:
-                    print(f"✗ Error: {e}")
-                    screenshots.append({
-                        "path": path,
-                        "viewport": viewport_name,
-                        "file": None,
-                        "status": f"error: {e}"
-                    })
-
-            context.close()
-
-        browser.close()
-
-    return screenshots
+                    captured = []
+                    for viewport_name in viewport_names:
+                        result = await capture_job(
+                            page, path, viewport_name, viewports[viewport_name], output_dir,
+                            router, manifest, incremental=incremental, store=store,
+                            perf=recorders.get(page),
+                            navigate=perf or not captured or captured[0]["status"] != "success",
+                        )
+                        captured.append(result)
+                    if verify:
+                        await verify_resized(page, captured, viewports, store)
+                    results[index] = captured
+                finally:
+                    pool.put_nowait(page)
+
+        await asyncio.gather(*(
+            worker() for _ in range(min(concurrency * len(contexts), len(results)))
+        ))
+        await browser.close()
+
+    save_manifest(manifest)
+    return [result for captured in results for result in captured]
+
+
+def capture_screenshots(pages=None, viewports=None, concurrency=DEFAULT_CONCURRENCY,
+                        blocked_hosts=None, strategy=DEFAULT_STRATEGY, verify=False,
+                        incremental=False, store="png", perf=False):
+    """Capture screenshots of specified pages."""
+    pages = pages or PAGES
+    viewports = viewports or VIEWPORTS
+    blocked_hosts = BLOCKED_HOSTS if blocked_hosts is None else blocked_hosts
+    return asyncio.run(capture_all(
+        pages, viewports, max(1, concurrency), blocked_hosts, strategy, verify, incremental,
+        store, perf,
+    ))
+
+
+def parse_concurrency(argv):
+    """Read --concurrency N / --concurrency=N from argv."""
+    for i, arg in enumerate(argv):
+        if arg.startswith("--concurrency="):
+            return int(arg.split("=", 1)[1])
+        if arg == "--concurrency" and i + 1 < len(argv):
+            return int(argv[i + 1])
+    return DEFAULT_CONCURRENCY
+
+
+def parse_strategy(argv):
+    """Read --strategy resize|reload from argv."""
+    for i, arg in enumerate(argv):
+        if arg.startswith("--strategy="):
+            strategy = arg.split("=", 1)[1]
+        elif arg == "--strategy" and i + 1 < len(argv):
+            strategy = argv[i + 1]
+        else:
+            continue
+        if strategy not in STRATEGIES:
+            raise SystemExit(f"--strategy must be one of: {', '.join(STRATEGIES)}")
+        return strategy
+    return DEFAULT_STRATEGY
+
+
+def parse_store(argv):
+    """Read --store png|tiles from argv."""
+    for i, arg in enumerate(argv):
+        if arg.startswith("--store="):
+            store = arg.split("=", 1)[1]
+        elif arg == "--store" and i + 1 < len(argv):
+            store = argv[i + 1]
+        else:
+            continue
+        if store not in STORES:
+            raise SystemExit(f"--store must be one of: {', '.join(STORES)}")
+        if store == "tiles" and qa_tiles is None:
+            raise SystemExit("--store tiles needs Pillow: pip install pillow")
+        return store
+    return "png"
+
+
+def parse_blocked_hosts(argv):
+    """BLOCKED_HOSTS plus any from --block=a,b and QA_BLOCK_HOSTS."""
+    extra = os.environ.get("QA_BLOCK_HOSTS", "").split(",")
+    for arg in argv:
+        if arg.startswith("--block="):
+            extra += arg.split("=", 1)[1].split(",")
+    return BLOCKED_HOSTS + [h.strip() for h in extra if h.strip()]
+
+
+def report_perf(screenshots):
+    """Print perf metrics against budgets and append them to the history.
+
+    Returns True if any capture went over budget.
+    """
+    budgets = qa_perf.load_budgets()
+    measured = [s for s in screenshots if s["perf"]]
+    records = []
+    any_over = False
+
+    print("\nPerformance (vs scripts/qa-budgets.json):")
+    for s in measured:
+        over = qa_perf.over_budget(s["perf"], qa_perf.budget_for(s["path"], budgets))
+        any_over = any_over or bool(over)
+        summary = ", ".join(
+            f"{label} {qa_perf.format_metric(key, s['perf'].get(key))}"
+            for key, label, _ in qa_perf.METRICS
+            if key in ("lcp_ms", "cls", "tbt_ms", "requests", "total_bytes")
+        )
+        print(f"  {'✗' if over else '✓'} {s['viewport']}: {s['path']} - {summary}")
+        for key, value, limit in over:
+            print(f"      {key}: {qa_perf.format_metric(key, value)} > {qa_perf.format_metric(key, limit)}")
+        records.append({
+            "path": s["path"],
+            "viewport": s["viewport"],
+            "metrics": s["perf"],
+            "over_budget": [key for key, _, _ in over],
+        })
+
+    if records:
+        qa_perf.append_history(records, SITE_URL)
+        print(f"  History: {os.path.relpath(qa_perf.HISTORY_PATH)}")
+    return any_over
 
 
 def main():
     """Main entry point."""
+    global SITE_URL
+
     print("\n" + "="*60)
     print("Visual QA Script - leomayn.com")
     print("="*60 + "\n")
@@ -120,12 +579,21 @@ def main():
 
     if len(sys.argv) > 1:
         if sys.argv[1] == "--help":
-            print("Usage: python qa-visual.py [page_path] [--mobile|--desktop]")
+            print("Usage: python qa-visual.py [page_path] [--mobile|--desktop] [--concurrency N] [--strategy resize|reload] [--verify-resize] [--incremental] [--diff] [--store png|tiles] [--perf] [--block=host,...] [--local[=static]]")
             print("\nExamples:")
             print("  python qa-visual.py                    # All pages, all viewports")
             print("  python qa-visual.py /                  # Homepage only")
             print("  python qa-visual.py /services          # Services page only")
             print("  python qa-visual.py / --mobile         # Homepage, mobile only")
+            print("  python qa-visual.py --concurrency 8    # 8 pages at a time per viewport")
+            print("  python qa-visual.py --block=hotjar.com # Block another third-party host")
+            print("  python qa-visual.py --strategy reload  # Fresh load per viewport instead of resizing")
+            print("  python qa-visual.py --verify-resize    # Check resized captures against cold loads")
+            print("  python qa-visual.py --incremental      # Skip screenshots whose DOM hasn't changed")
+            print("  python qa-visual.py --diff             # Compare captures against baselines (qa_diff.py)")
+            print("  python qa-visual.py --store tiles      # Deduplicated WebP tiles instead of PNGs")
+            print("  python qa-visual.py --perf             # Web vitals per viewport vs qa-budgets.json (fresh load each)")
+            print("  python qa-visual.py --local            # Against `next start` on the local build")
             return 0
 
         # Filter pages
@@ -139,7 +607,28 @@ def main():
         elif "--desktop" in sys.argv:
             viewports = {"desktop": VIEWPORTS["desktop"]}
 
-    screenshots = capture_screenshots(pages, viewports)
+    concurrency = parse_concurrency(sys.argv[1:])
+    blocked_hosts = parse_blocked_hosts(sys.argv[1:])
+    strategy = parse_strategy(sys.argv[1:])
+    verify = "--verify-resize" in sys.argv
+    store = parse_store(sys.argv[1:])
+    options = dict(blocked_hosts=blocked_hosts, strategy=strategy, verify=verify,
+                   incremental="--incremental" in sys.argv, store=store,
+                   perf="--perf" in sys.argv)
+
+    run_start = time.perf_counter()
+    local_mode = local_mode_from_argv(sys.argv[1:])
+    if local_mode:
+        try:
+            with local_server(local_mode) as SITE_URL:
+                print(f"Site: {SITE_URL}\n")
+                screenshots = capture_screenshots(pages, viewports, concurrency, **options)
+        except LocalServerError as e:
+            print(f"✗ {e}")
+            return 1
+    else:
+        screenshots = capture_screenshots(pages, viewports, concurrency, **options)
+    run_time = time.perf_counter() - run_start
 
     # Summary
     print("\n" + "="*60)
@@ -149,18 +638,63 @@ def main():
     success = [s for s in screenshots if s["status"] == "success"]
     failed = [s for s in screenshots if s["status"] != "success"]
 
-    print(f"\n✓ Captured: {len(success)} screenshots")
+    captured = [s for s in success if not s["skipped"]]
+    skipped = [s for s in success if s["skipped"]]
+    print(f"\n✓ Captured: {len(captured)} screenshots")
+    if skipped:
+        print(f"= Skipped: {len(skipped)} unchanged since the last capture")
     if failed:
         print(f"✗ Failed: {len(failed)} screenshots")
 
-    print(f"\nScreenshots saved to: {OUTPUT_DIR}")
-
-    # List files for easy access
-    print("\nFiles created:")
-    for s in success:
-        print(f"  - {os.path.basename(s['file'])}")
-
-    return 0 if not failed else 1
+    job_time = sum(s["duration"] for s in screenshots)
+    print(f"\nWall time: {run_time:.1f}s for {job_time:.1f}s of capture work ({concurrency} pages per viewport)")
+    totals = Counter()
+    for s in screenshots:
+        totals.update(s["requests"])
+    print(f"Requests: {format_requests(totals)}")
+    loads = sum(1 for s in screenshots if s["navigated"])
+    print(f"Page loads: {loads} for {len(screenshots)} captures ({strategy} strategy)")
+    print("Slowest captures:")
+    for s in sorted(screenshots, key=lambda s: s["duration"], reverse=True)[:3]:
+        print(f"  {s['duration']:5.1f}s  {s['viewport']}: {s['path']}")
+
+    mismatched = [s for s in screenshots if s.get("matches_cold_load") is False]
+    if verify:
+        checked = sum(1 for s in screenshots if "matches_cold_load" in s)
+        print(f"\nResize check: {checked - len(mismatched)}/{checked} resized captures match a cold load")
+        for s in mismatched:
+            print(f"  ✗ {s['viewport']}: {s['path']} - capture with --strategy reload")
+
+    perf_failed = report_perf(screenshots) if options["perf"] else False
+
+    diff_failed = False
+    if "--diff" in sys.argv and success:
+        import qa_diff  # NumPy and Pillow are only needed for diffing
+
+        print("\nBaseline diff:")
+        diff_start = time.perf_counter()
+        diffs = qa_diff.diff_all([os.path.basename(s["file"]) for s in success], store=store)
+        qa_diff.print_results(diffs, time.perf_counter() - diff_start)
+        diff_failed = any(d.status not in ("unchanged", "new") for d in diffs)
+
+    if store == "tiles":
+        stats = [s["stored"] for s in captured]
+        written = sum(s["bytes_written"] for s in stats)
+        png = sum(s["png_bytes"] for s in stats)
+        new = sum(s["new_tiles"] for s in stats)
+        print(f"\nTiles: {new} new of {sum(s['tiles'] for s in stats)}, "
+              f"{written / 1024:.0f} KB written for {png / 1024:.0f} KB of PNG")
+        print(f"Screenshots stored in: {qa_tiles.TILE_DIR}")
+        print("Rebuild PNGs with: python scripts/qa_tiles.py --rebuild")
+    else:
+        print(f"\nScreenshots saved to: {OUTPUT_DIR}")
+
+        # List files for easy access
+        print("\nFiles created:")
+        for s in captured:
+            print(f"  - {os.path.basename(s['file'])}")
+
+    return 0 if not failed and not mismatched and not diff_failed and not perf_failed else 1
 
 
 if __name__ == "__main__":
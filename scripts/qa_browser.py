@@ -0,0 +1,85 @@
+"""
+Deterministic capture settings shared by qa-visual.py and qa-opengraph.py.
+
+Instead of waiting for networkidle and sleeping 500ms "to let animations
+settle", captures:
+
+  - run with prefers-reduced-motion, which ScrollReveal, BlurText, CountUp
+    and DecryptedText already honour by rendering their final state
+  - inject CSS that collapses every remaining animation and transition
+    (HeroBlobs, fadeInUp, shimmer) to its end state
+  - wait on READY_SCRIPT, which resolves once web fonts, <img> elements
+    (lazy ones are switched to eager) and CSS background images have
+    loaded, followed by two animation frames for layout to settle
+
+Both sync and async Playwright take the same strings:
+
+    context = browser.new_context(**CONTEXT_OPTIONS, viewport=...)
+    context.add_init_script(FREEZE_SCRIPT)
+    page.goto(url, wait_until="load")
+    page.evaluate(READY_SCRIPT)
+"""
+
+import json
+
+CONTEXT_OPTIONS = {"reduced_motion": "reduce"}
+
+FREEZE_CSS = """
+*, *::before, *::after {
+  animation-delay: 0s !important;
+  animation-duration: 0s !important;
+  animation-iteration-count: 1 !important;
+  transition-delay: 0s !important;
+  transition-duration: 0s !important;
+  scroll-behavior: auto !important;
+  caret-color: transparent !important;
+}
+"""
+
+FREEZE_SCRIPT = """
+(() => {
+  const css = %s;
+  const inject = () => {
+    const style = document.createElement('style');
+    style.setAttribute('data-qa-freeze', '');
+    style.textContent = css;
+    document.head.appendChild(style);
+  };
+  if (document.head) inject();
+  else document.addEventListener('DOMContentLoaded', inject, { once: true });
+})();
+""" % json.dumps(FREEZE_CSS)
+
+# Upper bound for any single asset; a broken image shouldn't hang the run
+READY_TIMEOUT_MS = 10000
+
+READY_SCRIPT = """
+async () => {
+  const timeout = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+  const settle = (promise) => Promise.race([promise.catch(() => {}), timeout(%d)]);
+
+  const images = Array.from(document.images).map((img) => {
+    if (img.loading === 'lazy') img.loading = 'eager';
+    if (img.complete) return Promise.resolve();
+    return new Promise((resolve) => {
+      img.addEventListener('load', resolve, { once: true });
+      img.addEventListener('error', resolve, { once: true });
+    });
+  });
+
+  const backgrounds = new Set();
+  for (const el of document.querySelectorAll('*')) {
+    const bg = getComputedStyle(el).backgroundImage;
+    for (const match of bg.matchAll(/url\\(["']?([^"')]+)["']?\\)/g)) backgrounds.add(match[1]);
+  }
+  const bgLoads = Array.from(backgrounds).map((src) => new Promise((resolve) => {
+    const img = new Image();
+    img.onload = img.onerror = resolve;
+    img.src = src;
+  }));
+
+  await settle(document.fonts.ready);
+  await Promise.all([...images, ...bgLoads].map(settle));
+  await new Promise((resolve) => requestAnimationFrame(() => requestAnimationFrame(resolve)));
+}
+""" % READY_TIMEOUT_MS
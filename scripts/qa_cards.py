@@ -0,0 +1,277 @@
+"""
+Browser-free OpenGraph card renderer for qa-opengraph.py.
+
+Draws the same Facebook, LinkedIn and Twitter/X mockups as the HTML in
+generate_preview_html directly with Pillow: the og:image is scaled to
+cover the image box, text is word-wrapped to the card width with the
+CSS font sizes, weights, colours and line heights, and the same
+truncation rules apply (see preview_fields). A card renders in
+milliseconds with no browser, so previews can be drawn for every
+sitemap URL in CI.
+
+Fonts follow the CSS stack (-apple-system, Segoe UI, Roboto, sans-serif)
+as far as the machine has them, then Pillow's bundled default font.
+Emoji (the Twitter link icon) are not drawn; their space is kept.
+"""
+
+import io
+import os
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Same viewport the browser renderer screenshots
+CANVAS_SIZE = (700, 500)
+
+# Body padding around the card, as in the mockup CSS
+PADDING = 40
+
+FONT_DIRS = [
+    "/System/Library/Fonts",
+    "/Library/Fonts",
+    os.path.expanduser("~/Library/Fonts"),
+    "C:\\Windows\\Fonts",
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+]
+
+# File names in CSS font-family order, per weight
+FONT_FILES = {
+    "regular": ["SFNS.ttf", "segoeui.ttf", "Roboto-Regular.ttf", "Arial.ttf",
+                "LiberationSans-Regular.ttf", "DejaVuSans.ttf"],
+    "bold": ["SFNS.ttf", "seguisb.ttf", "Roboto-Medium.ttf", "Arial Bold.ttf",
+             "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"],
+}
+
+# Per-platform card layout, transcribed from generate_preview_html
+LAYOUTS = {
+    "facebook": {
+        "background": "#f0f2f5",
+        "card": "#ffffff",
+        "width": 500,
+        "radius": 8,
+        "border": None,
+        "shadow": (0, 0, 0, 26),
+        "image_height": 261,
+        "image_fill": "#e4e6eb",
+        "divider": "#e4e6eb",
+        "padding": (12, 12),
+        "label": ("Facebook Preview", "#1877f2"),
+        # (field, size, weight, colour, line height, margin below, indent)
+        "lines": [
+            ("site_upper", 12, "regular", "#65676b", 1.2, 4, 0),
+            ("title", 16, "bold", "#1c1e21", 1.3, 4, 0),
+            ("description", 14, "regular", "#65676b", 1.3, 0, 0),
+        ],
+    },
+    "linkedin": {
+        "background": "#f3f2ef",
+        "card": "#ffffff",
+        "width": 552,
+        "radius": 8,
+        "border": "#e0e0e0",
+        "shadow": None,
+        "image_height": 289,
+        "image_fill": "#e0e0e0",
+        "divider": None,
+        "padding": (12, 16),
+        "label": ("LinkedIn Preview", "#0a66c2"),
+        "lines": [
+            ("title", 14, "bold", (0, 0, 0, 230), 1.4, 4, 0),
+            ("url_display", 12, "regular", (0, 0, 0, 153), 1.2, 0, 0),
+        ],
+    },
+    "twitter": {
+        "background": "#15202b",
+        "card": "#192734",
+        "width": 504,
+        "radius": 16,
+        "border": "#38444d",
+        "shadow": None,
+        "image_height": 252,
+        "image_fill": "#38444d",
+        "divider": None,
+        "padding": (12, 12),
+        "label": ("Twitter/X Preview", "#1d9bf0"),
+        "lines": [
+            ("title", 15, "regular", "#e7e9ea", 1.3, 4, 0),
+            ("twitter_description", 15, "regular", "#8b98a5", 1.3, 4, 0),
+            ("url_display", 15, "regular", "#8b98a5", 1.3, 0, 16),  # 12px icon + 4px gap
+        ],
+    },
+}
+
+
+def preview_fields(og_data):
+    """Card text after the same truncation rules as generate_preview_html."""
+    description = og_data.get("description") or "No description"
+    site_name = og_data.get("site_name") or "leomayn.com"
+    return {
+        "title": (og_data.get("title") or "No title")[:60],
+        "description": description[:150],
+        "twitter_description": f"{description[:100]}...",
+        "image": og_data.get("image") or "",
+        "site_name": site_name,
+        "site_upper": site_name.upper(),
+        "url_display": og_data.get("url", "").replace("https://", "").replace("http://", ""),
+    }
+
+
+@lru_cache(maxsize=None)
+def _font_index():
+    """Lower-cased font file name -> path for every font under FONT_DIRS."""
+    index = {}
+    for font_dir in FONT_DIRS:
+        for dirpath, _, filenames in os.walk(font_dir):
+            for filename in filenames:
+                if filename.lower().endswith((".ttf", ".otf", ".ttc")):
+                    index.setdefault(filename.lower(), os.path.join(dirpath, filename))
+    return index
+
+
+@lru_cache(maxsize=None)
+def find_font(weight, size):
+    """The first installed font from FONT_FILES[weight], else Pillow's default."""
+    index = _font_index()
+    for filename in FONT_FILES[weight]:
+        path = index.get(filename.lower())
+        if path:
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError:
+                continue
+    return ImageFont.load_default(size)
+
+
+def wrap(text, font, width):
+    """Break text into lines no wider than width, the way CSS wraps words."""
+    lines = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if font.getlength(candidate) <= width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        # A single word wider than the box breaks anywhere (overflow-wrap)
+        while font.getlength(word) > width:
+            cut = max(1, next(
+                (i for i in range(len(word), 0, -1) if font.getlength(word[:i]) <= width), 1
+            ))
+            lines.append(word[:cut])
+            word = word[cut:]
+        line = word
+    if line:
+        lines.append(line)
+    return lines
+
+
+# (id(image), size) -> (image, covered); sites usually share one og:image
+# across pages, and each platform needs it at one size
+_covers = {}
+
+
+def cover(image, size):
+    """Scale and centre-crop image to fill size (CSS background-size: cover)."""
+    cached = _covers.get((id(image), size))
+    if cached and cached[0] is image:
+        return cached[1]
+    covered = _cover(image, size)
+    _covers[(id(image), size)] = (image, covered)
+    return covered
+
+
+def _cover(image, size):
+    width, height = size
+    scale = max(width / image.width, height / image.height)
+    crop_width, crop_height = width / scale, height / scale
+    left = (image.width - crop_width) / 2
+    top = (image.height - crop_height) / 2
+    # Resample only the visible region; reducing_gap downsamples in two
+    # passes, which is much faster than full Lanczos at the same quality
+    return image.convert("RGB").resize(
+        size, Image.LANCZOS, box=(left, top, left + crop_width, top + crop_height), reducing_gap=2.0,
+    )
+
+
+@lru_cache(maxsize=None)
+def _top_corner_mask(size, radius):
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle(
+        [0, 0, size[0] - 1, size[1] + radius], radius=radius, fill=255,
+    )
+    return mask
+
+
+def _draw_label(draw, text, colour, x, y):
+    font = find_font("bold", 12)
+    text_width = font.getlength(text)
+    draw.rounded_rectangle([x, y, x + text_width + 16, y + 12 + 8 + 3], radius=4, fill=colour)
+    draw.text((x + 8, y + 4), text, font=font, fill="#ffffff")
+
+
+def render_card(og_data, platform, og_image=None):
+    """Draw one platform mockup; og_image is the decoded og:image or None."""
+    layout = LAYOUTS[platform]
+    fields = preview_fields(og_data)
+    pad_y, pad_x = layout["padding"]
+    card_width = layout["width"]
+    text_width = card_width - 2 * pad_x
+
+    # Lay out text first to know the card height
+    blocks = []
+    content_height = pad_y
+    for field, size, weight, colour, line_height, margin, indent in layout["lines"]:
+        font = find_font(weight, size)
+        lines = wrap(fields[field], font, text_width - indent)
+        step = round(size * line_height)
+        blocks.append((lines, font, colour, step, indent, content_height))
+        content_height += step * len(lines) + margin
+    content_height += pad_y
+
+    # An RGBA draw on an RGB canvas blends translucent fills (shadow, text)
+    canvas = Image.new("RGB", CANVAS_SIZE, layout["background"])
+    draw = ImageDraw.Draw(canvas, "RGBA")
+    left, top = PADDING, PADDING
+    card_height = layout["image_height"] + content_height
+    box = [left, top, left + card_width - 1, top + card_height - 1]
+
+    if layout["shadow"]:
+        draw.rounded_rectangle([box[0], box[1] + 1, box[2], box[3] + 1],
+                               radius=layout["radius"], fill=layout["shadow"])
+    draw.rounded_rectangle(box, radius=layout["radius"], fill=layout["card"])
+
+    # Image area, with the card's top corners
+    image_size = (card_width, layout["image_height"])
+    picture = (cover(og_image, image_size) if og_image is not None
+               else Image.new("RGB", image_size, layout["image_fill"]))
+    canvas.paste(picture, (left, top), _top_corner_mask(image_size, layout["radius"]))
+    if layout["border"]:
+        draw.rounded_rectangle(box, radius=layout["radius"], outline=layout["border"], width=1)
+
+    content_top = top + layout["image_height"]
+    if layout["divider"]:
+        draw.line([left, content_top, left + card_width - 1, content_top], fill=layout["divider"])
+
+    # Text may overflow the canvas, as it would in the 700x500 viewport
+    for lines, font, colour, step, indent, offset in blocks:
+        y = content_top + offset
+        for line in lines:
+            # Centre the glyphs in the CSS line box
+            draw.text((left + pad_x + indent, y + step / 2), line, font=font,
+                      fill=colour, anchor="lm")
+            y += step
+
+    label, colour = layout["label"]
+    _draw_label(draw, label, colour, PADDING + 10, PADDING + 10)
+    return canvas
+
+
+def render_card_png(og_data, platform, og_image=None):
+    """render_card as PNG bytes."""
+    buffer = io.BytesIO()
+    render_card(og_data, platform, og_image).save(buffer, "PNG")
+    return buffer.getvalue()
@@ -0,0 +1,259 @@
+"""
+Shared crawl snapshot cache for the leomayn.com QA scripts.
+
+Each page is fetched once per QA run and stored on disk so qa-seo.py,
+qa-opengraph.py and qa-visual.py all read the same response:
+
+  .qa-cache/crawl/objects/<sha256>   response bodies, content-addressed
+  .qa-cache/crawl/index/<sha256>.json  per-URL entry (status, headers, ETag,
+                                       Last-Modified, body hash, run id)
+
+Entries from an earlier run are revalidated with a conditional GET
+(If-None-Match / If-Modified-Since), so unchanged pages cost a 304 and no
+body transfer. qa-all.py sets QA_RUN_ID for its child scripts; entries
+already fetched under the current run id are reused without any request.
+
+With head_only=True the response is streamed and the transfer is aborted
+once </head> has been parsed. Such snapshots are marked partial: they
+satisfy later head-only reads but never a request for the full page.
+"""
+
+import codecs
+import hashlib
+import json
+import os
+import tempfile
+import time
+from urllib.parse import urljoin, urlparse
+from xml.etree import ElementTree
+
+import requests
+
+from qa_html import HeadParser
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.environ.get("QA_CACHE_DIR", os.path.join(REPO_ROOT, ".qa-cache", "crawl"))
+RUN_ID = os.environ.get("QA_RUN_ID")
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; Leomayn-QA-Bot/1.0)"
+
+# Headers that describe the transfer rather than the content. Bodies are
+# stored decoded, so these would be wrong when the snapshot is replayed.
+DROP_HEADERS = {
+    "connection", "content-encoding", "content-length", "keep-alive",
+    "transfer-encoding", "set-cookie",
+}
+
+STREAM_CHUNK_SIZE = 8192
+
+SITEMAP_NS = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+
+# Snapshots already loaded by this process, keyed by URL
+_memo = {}
+
+
+class Snapshot:
+    """A cached HTTP response for one URL."""
+
+    def __init__(self, url, status, headers, body, from_cache=False,
+                 partial=False, bytes_read=None, bytes_total=None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.from_cache = from_cache
+        self.partial = partial
+        # Bytes received on the wire and the full Content-Length, when known
+        self.bytes_read = bytes_read
+        self.bytes_total = bytes_total
+
+    @property
+    def bytes_saved(self):
+        if self.bytes_read is None or self.bytes_total is None:
+            return None
+        return max(self.bytes_total - self.bytes_read, 0)
+
+    @property
+    def text(self):
+        return self.body.decode(_charset(self.headers), errors="replace")
+
+
+def _charset(headers):
+    content_type = headers.get("content-type", "")
+    if "charset=" in content_type:
+        return content_type.split("charset=", 1)[1].split(";")[0].strip() or "utf-8"
+    return "utf-8"
+
+
+def _key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _object_path(digest):
+    return os.path.join(CACHE_DIR, "objects", digest[:2], digest)
+
+
+def _entry_path(url):
+    return os.path.join(CACHE_DIR, "index", f"{_key(url)}.json")
+
+
+def _write_atomic(path, data):
+    """Write bytes via a temp file so concurrent QA scripts never see partial files."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _load_entry(url):
+    try:
+        with open(_entry_path(url)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(_object_path(entry.get("sha256", ""))):
+        return None
+    return entry
+
+
+def _save_entry(url, entry):
+    _write_atomic(_entry_path(url), json.dumps(entry, indent=2).encode("utf-8"))
+
+
+def _snapshot_from_entry(url, entry):
+    with open(_object_path(entry["sha256"]), "rb") as f:
+        body = f.read()
+    return Snapshot(url, entry["status"], entry["headers"], body, from_cache=True,
+                    partial=entry.get("partial", False))
+
+
+def store_snapshot(url, status, headers, body, extra=None):
+    """Store a response body and its index entry; returns the Snapshot."""
+    digest = hashlib.sha256(body).hexdigest()
+    object_path = _object_path(digest)
+    if not os.path.exists(object_path):
+        _write_atomic(object_path, body)
+
+    headers = {k.lower(): v for k, v in headers.items() if k.lower() not in DROP_HEADERS}
+    entry = {
+        "url": url,
+        "status": status,
+        "headers": headers,
+        "sha256": digest,
+        "etag": headers.get("etag"),
+        "last_modified": headers.get("last-modified"),
+        "run_id": RUN_ID,
+        "fetched_at": time.time(),
+    }
+    if extra:
+        entry.update(extra)
+    _save_entry(url, entry)
+
+    snapshot = Snapshot(url, status, headers, body, partial=entry.get("partial", False))
+    _memo[url] = snapshot
+    return snapshot
+
+
+def _read_head(response):
+    """Stream a response until </head> closes; returns (body, wire_bytes, partial)."""
+    decoder = codecs.getincrementaldecoder(_charset(response.headers))(errors="replace")
+    parser = HeadParser()
+    chunks = []
+
+    for chunk in response.raw.stream(STREAM_CHUNK_SIZE, decode_content=True):
+        chunks.append(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done:
+            break
+
+    wire_bytes = response.raw.tell()
+    partial = parser.done and not response.raw.closed
+    response.close()
+    return b"".join(chunks), wire_bytes, partial
+
+
+def _usable(partial, head_only):
+    """A partial (head-only) snapshot can't stand in for a full page."""
+    return head_only or not partial
+
+
+def fetch_sitemap_paths(site_url):
+    """Return the page paths listed in site_url's /sitemap.xml.
+
+    The sitemap publishes apex-domain URLs; only the path is kept so the
+    crawl runs against site_url.
+    """
+    snapshot = fetch_snapshot(urljoin(site_url, "/sitemap.xml"))
+    root = ElementTree.fromstring(snapshot.body)
+    return [
+        urlparse(loc.text.strip()).path or "/"
+        for loc in root.iterfind(".//sm:loc", SITEMAP_NS)
+    ]
+
+
+def make_session(pool_size=10):
+    """A requests Session whose keep-alive pool can serve pool_size threads."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_snapshot(url, user_agent=DEFAULT_USER_AGENT, timeout=10, session=None,
+                   head_only=False):
+    """Return a Snapshot for url, hitting the network only when needed.
+
+    head_only streams the response and stops reading once the <head> has
+    been parsed; bytes_read/bytes_saved on the result report the saving.
+
+    Raises requests.RequestException on network or HTTP errors, like
+    requests.get(...).raise_for_status() would.
+    """
+    if url in _memo and _usable(_memo[url].partial, head_only):
+        return _memo[url]
+
+    entry = _load_entry(url)
+    if entry and not _usable(entry.get("partial", False), head_only):
+        entry = None
+    if entry and RUN_ID and entry.get("run_id") == RUN_ID:
+        snapshot = _snapshot_from_entry(url, entry)
+        _memo[url] = snapshot
+        return snapshot
+
+    headers = {"User-Agent": user_agent}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = (session or requests).get(url, timeout=timeout, headers=headers,
+                                         stream=head_only)
+
+    if response.status_code == 304 and entry:
+        response.close()
+        entry["run_id"] = RUN_ID
+        entry["fetched_at"] = time.time()
+        _save_entry(url, entry)
+        snapshot = _snapshot_from_entry(url, entry)
+        _memo[url] = snapshot
+        return snapshot
+
+    try:
+        response.raise_for_status()
+    except requests.HTTPError:
+        response.close()
+        raise
+
+    if not head_only:
+        return store_snapshot(url, response.status_code, dict(response.headers), response.content)
+
+    content_length = response.headers.get("content-length")
+    body, wire_bytes, partial = _read_head(response)
+    snapshot = store_snapshot(url, response.status_code, dict(response.headers), body,
+                              extra={"partial": partial})
+    snapshot.bytes_read = wire_bytes
+    snapshot.bytes_total = int(content_length) if content_length and content_length.isdigit() else None
+    return snapshot
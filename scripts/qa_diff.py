@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Visual regression diffing for qa-visual.py screenshots.
+
+Compares each capture in qa-screenshots/ with its approved baseline in
+qa-screenshots/baselines/ using whole-array NumPy operations:
+
+  - a pixel changes when any channel differs by more than `tolerance`
+    (0-255)
+  - changed pixels explained by anti-aliasing are ignored: the pixel sits
+    on an edge (its 3x3 baseline neighbourhood has contrast) and each
+    image's value lies within the other's neighbourhood range, which is
+    what a sub-pixel shift of the same edge looks like
+  - dynamic regions (elements marked data-qa-mask, e.g. CountUp figures)
+    are blanked in both images, using the boxes qa-visual.py records in
+    qa-screenshots/manifest.json
+
+With --store tiles the captures are read from the tile store
+(qa_tiles.py) instead of PNGs in qa-screenshots/; PNGs left over from
+earlier runs are ignored.
+
+Only changed screenshots produce output: a heatmap with bounding boxes in
+qa-screenshots/diffs/<name>-diff.png, and everything is summarised in
+qa-screenshots/diffs/report.json.
+
+Usage:
+  python scripts/qa_diff.py                    # Diff all screenshots against baselines
+  python scripts/qa_diff.py homepage-desktop   # Only screenshots whose name contains this
+  python scripts/qa_diff.py --tolerance 8      # Stricter per-channel threshold
+  python scripts/qa_diff.py --update           # Approve current screenshots as baselines
+  python scripts/qa_diff.py --store tiles      # Captures taken with qa-visual.py --store tiles
+"""
+
+import argparse
+import filecmp
+import json
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+import qa_tiles
+
+SCREENSHOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "qa-screenshots"))
+BASELINE_DIR = os.path.join(SCREENSHOT_DIR, "baselines")
+DIFF_DIR = os.path.join(SCREENSHOT_DIR, "diffs")
+MANIFEST_PATH = os.path.join(SCREENSHOT_DIR, "manifest.json")
+BASELINE_MANIFEST_PATH = os.path.join(BASELINE_DIR, "manifest.json")
+REPORT_PATH = os.path.join(DIFF_DIR, "report.json")
+
+# Max per-channel difference still treated as identical (JPEG-free PNGs
+# from the same Chromium only differ by a few levels in gradients)
+DEFAULT_TOLERANCE = 16
+
+# Changed pixels closer than this (in device pixels) share a bounding box
+BOX_CELL = 32
+
+# Fraction of changed pixels at or under which a screenshot still passes
+DEFAULT_MAX_RATIO = 0.0
+
+
+class DiffResult:
+    """Outcome of comparing one screenshot with its baseline."""
+
+    def __init__(self, name, status, changed=0, total=0, boxes=None, heatmap=None):
+        self.name = name
+        self.status = status  # "unchanged", "changed", "new" or "error: ..."
+        self.changed = changed
+        self.total = total
+        self.boxes = boxes or []
+        self.heatmap = heatmap
+
+    @property
+    def ratio(self):
+        return self.changed / self.total if self.total else 0.0
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "status": self.status,
+            "changed_pixels": self.changed,
+            "changed_ratio": round(self.ratio, 6),
+            "boxes": self.boxes,
+            "heatmap": self.heatmap,
+        }
+
+
+# ============================================
+# Array operations
+# ============================================
+
+def load_image(path):
+    """Read a screenshot as an (H, W, 3) uint8 array."""
+    with Image.open(path) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+def pad_to(image, height, width):
+    """Pad with transparent-black rows/columns so both images share a shape."""
+    h, w = image.shape[:2]
+    if (h, w) == (height, width):
+        return image
+    padded = np.zeros((height, width, 3), dtype=np.uint8)
+    padded[:h, :w] = image
+    return padded
+
+
+def neighbourhood_range(image):
+    """Per-channel min and max over each pixel's 3x3 neighbourhood."""
+    padded = np.pad(image, ((1, 1), (1, 1), (0, 0)), mode="edge")
+    h, w = image.shape[:2]
+    lo = image.copy()
+    hi = image.copy()
+    for dy in range(3):
+        for dx in range(3):
+            window = padded[dy:dy + h, dx:dx + w]
+            np.minimum(lo, window, out=lo)
+            np.maximum(hi, window, out=hi)
+    return lo, hi
+
+
+def antialiased(current, baseline, tolerance):
+    """Mask of pixels whose difference looks like a shifted anti-aliased edge."""
+    base_lo, base_hi = neighbourhood_range(baseline)
+    cur_lo, cur_hi = neighbourhood_range(current)
+    tol = np.int16(tolerance)
+    on_edge = ((base_hi.astype(np.int16) - base_lo) > tol).any(axis=2)
+    cur_in_base = (
+        (current >= base_lo.astype(np.int16) - tol) & (current <= base_hi.astype(np.int16) + tol)
+    ).all(axis=2)
+    base_in_cur = (
+        (baseline >= cur_lo.astype(np.int16) - tol) & (baseline <= cur_hi.astype(np.int16) + tol)
+    ).all(axis=2)
+    return on_edge & cur_in_base & base_in_cur
+
+
+def channel_delta(current, baseline):
+    """Per-pixel max absolute channel difference, staying in uint8."""
+    diff = np.maximum(current, baseline)
+    diff -= np.minimum(current, baseline)
+    return np.maximum(np.maximum(diff[..., 0], diff[..., 1]), diff[..., 2])
+
+
+def changed_mask(current, baseline, tolerance=DEFAULT_TOLERANCE, masks=(), ignore_antialiasing=True):
+    """Return (changed, delta): a boolean mask and the per-pixel max channel difference.
+
+    masks are (x, y, width, height) boxes in device pixels that are
+    ignored. Only the band of rows that differ at all is diffed and run
+    through the (more expensive) anti-aliasing check; a typical change
+    touches a small part of a full-page capture.
+    """
+    height = current.shape[0]
+    changed = np.zeros(current.shape[:2], dtype=bool)
+    delta = np.zeros(current.shape[:2], dtype=np.uint8)
+
+    rows = np.flatnonzero((current != baseline).reshape(height, -1).any(axis=1))
+    if not rows.size:
+        return changed, delta
+
+    # One row of context either side so edge neighbourhoods are complete
+    top, bottom = max(rows[0] - 1, 0), min(rows[-1] + 2, height)
+    band_delta = delta[top:bottom]
+    band_delta[:] = channel_delta(current[top:bottom], baseline[top:bottom])
+    for x, y, w, h in masks:
+        delta[max(int(y), 0):max(int(y + h), 0), max(int(x), 0):max(int(x + w), 0)] = 0
+
+    band = changed[top:bottom]
+    np.greater(band_delta, tolerance, out=band)
+    if ignore_antialiasing and band.any():
+        band &= ~antialiased(current[top:bottom], baseline[top:bottom], tolerance)
+    return changed, delta
+
+
+def bounding_boxes(changed, cell=BOX_CELL):
+    """Group changed pixels into boxes [x, y, width, height].
+
+    The mask is reduced to a grid of cell x cell blocks; 8-connected
+    blocks are merged and each group's pixel extent is reported.
+    """
+    h, w = changed.shape
+    gh, gw = -(-h // cell), -(-w // cell)
+    grid = np.zeros((gh * cell, gw * cell), dtype=bool)
+    grid[:h, :w] = changed
+    grid = grid.reshape(gh, cell, gw, cell).any(axis=(1, 3))
+
+    boxes = []
+    seen = np.zeros_like(grid)
+    for start in zip(*np.nonzero(grid)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        queue = deque([start])
+        cells = []
+        while queue:
+            gy, gx = queue.popleft()
+            cells.append((gy, gx))
+            for ny in range(max(gy - 1, 0), min(gy + 2, gh)):
+                for nx in range(max(gx - 1, 0), min(gx + 2, gw)):
+                    if grid[ny, nx] and not seen[ny, nx]:
+                        seen[ny, nx] = True
+                        queue.append((ny, nx))
+        ys = [c[0] for c in cells]
+        xs = [c[1] for c in cells]
+        # Tighten the cell-aligned box to the actual changed pixels
+        y0, y1 = min(ys) * cell, min((max(ys) + 1) * cell, h)
+        x0, x1 = min(xs) * cell, min((max(xs) + 1) * cell, w)
+        region = changed[y0:y1, x0:x1]
+        rows = np.flatnonzero(region.any(axis=1))
+        cols = np.flatnonzero(region.any(axis=0))
+        boxes.append([int(x0 + cols[0]), int(y0 + rows[0]),
+                      int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1)])
+    return sorted(boxes, key=lambda b: (b[1], b[0]))
+
+
+def render_heatmap(current, changed, delta, boxes, path):
+    """Write a dimmed greyscale copy of the capture with changes in red."""
+    grey = Image.fromarray(current).convert("L").point(lambda v: int(v * 0.3) + 170)
+    heat = np.array(grey.convert("RGB"))
+
+    # Stronger differences are a deeper red
+    intensity = np.clip(delta[changed].astype(np.float32) / 255 * 2, 0.35, 1.0)
+    fade = (255 * (1 - intensity)).astype(np.uint8)
+    heat[changed] = np.stack([np.full_like(fade, 255), fade, fade], axis=1)
+
+    img = Image.fromarray(heat)
+    draw = ImageDraw.Draw(img)
+    for x, y, w, h in boxes:
+        draw.rectangle([x - 2, y - 2, x + w + 1, y + h + 1], outline=(220, 0, 0), width=3)
+    img.save(path, optimize=False, compress_level=1)
+
+
+# ============================================
+# Baselines
+# ============================================
+
+def _load_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def screenshot_names(match=None, store="png"):
+    """Capture filenames in the given store, optionally filtered by substring."""
+    if store == "tiles":
+        names = [n for n in qa_tiles.image_names() if n.endswith(".png") and os.sep not in n]
+    else:
+        names = [n for n in os.listdir(SCREENSHOT_DIR) if n.endswith(".png")]
+    return sorted(n for n in names if not match or match in n)
+
+
+def capture_masks(name, manifest):
+    return (manifest.get("screenshots", {}).get(name) or {}).get("masks", [])
+
+
+def update_baselines(names, store="png"):
+    """Approve the current captures (and their mask boxes) as baselines."""
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    manifest = _load_json(MANIFEST_PATH, {})
+    baseline_masks = _load_json(BASELINE_MANIFEST_PATH, {})
+    for name in names:
+        current_path = os.path.join(SCREENSHOT_DIR, name)
+        baseline_path = os.path.join(BASELINE_DIR, name)
+        if store == "tiles":
+            qa_tiles.rebuild(name, baseline_path)
+        else:
+            shutil.copyfile(current_path, baseline_path)
+        baseline_masks[name] = capture_masks(name, manifest)
+        print(f"  ✓ {name}")
+    _write_json(BASELINE_MANIFEST_PATH, baseline_masks)
+
+
+def diff_screenshot(name, tolerance, manifest, baseline_masks, max_ratio=DEFAULT_MAX_RATIO, store="png"):
+    """Compare one capture with its baseline and write a heatmap if it changed."""
+    baseline_path = os.path.join(BASELINE_DIR, name)
+    heatmap_path = os.path.join(DIFF_DIR, name.replace(".png", "-diff.png"))
+    if os.path.exists(heatmap_path):
+        os.remove(heatmap_path)
+    if not os.path.exists(baseline_path):
+        return DiffResult(name, "new")
+
+    # Chromium encodes identical renders to identical bytes; skip decoding.
+    # Tiled captures have no PNG bytes to compare, so they always decode.
+    current_path = os.path.join(SCREENSHOT_DIR, name)
+    if store != "tiles" and filecmp.cmp(current_path, baseline_path, shallow=False):
+        return DiffResult(name, "unchanged")
+
+    try:
+        if store == "tiles":
+            current = np.asarray(qa_tiles.load_image(name).convert("RGB"))
+        else:
+            current = load_image(current_path)
+        baseline = load_image(baseline_path)
+    except OSError as e:
+        return DiffResult(name, f"error: {e}")
+
+    # Full-page heights differ when content moves; the extra rows count as changed
+    height = max(current.shape[0], baseline.shape[0])
+    width = max(current.shape[1], baseline.shape[1])
+    current = pad_to(current, height, width)
+    baseline = pad_to(baseline, height, width)
+
+    # Masks from either side, since a masked element can move between captures
+    masks = capture_masks(name, manifest) + baseline_masks.get(name, [])
+    changed, delta = changed_mask(current, baseline, tolerance, masks)
+    total = changed.size
+    count = int(np.count_nonzero(changed))
+    if count <= max_ratio * total:
+        return DiffResult(name, "unchanged", count, total)
+
+    boxes = bounding_boxes(changed)
+    render_heatmap(current, changed, delta, boxes, heatmap_path)
+    return DiffResult(name, "changed", count, total, boxes, os.path.relpath(heatmap_path, SCREENSHOT_DIR))
+
+
+def diff_all(names, tolerance=DEFAULT_TOLERANCE, max_ratio=DEFAULT_MAX_RATIO, workers=None, store="png"):
+    """Diff every named capture; returns DiffResults in the same order.
+
+    NumPy and Pillow release the GIL for the heavy lifting, so a thread
+    pool keeps every core busy without pickling full-page arrays.
+    """
+    os.makedirs(DIFF_DIR, exist_ok=True)
+    manifest = _load_json(MANIFEST_PATH, {})
+    baseline_masks = _load_json(BASELINE_MANIFEST_PATH, {})
+    with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+        results = list(pool.map(
+            lambda name: diff_screenshot(name, tolerance, manifest, baseline_masks, max_ratio, store),
+            names,
+        ))
+    _write_json(REPORT_PATH, {
+        "tolerance": tolerance,
+        "generated_at": time.time(),
+        "results": [r.to_dict() for r in results],
+    })
+    return results
+
+
+def print_results(results, elapsed):
+    for r in results:
+        if r.status == "unchanged":
+            print(f"  ✓ {r.name}")
+        elif r.status == "changed":
+            print(f"  ✗ {r.name}: {r.changed:,} px changed ({r.ratio:.2%}), "
+                  f"{len(r.boxes)} region(s) → {r.heatmap}")
+        elif r.status == "new":
+            print(f"  ? {r.name}: no baseline (approve with --update)")
+        else:
+            print(f"  ✗ {r.name}: {r.status}")
+    changed = sum(1 for r in results if r.status != "unchanged" and r.status != "new")
+    print(f"\nDiffed {len(results)} screenshots in {elapsed:.1f}s: {changed} changed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff qa-visual screenshots against baselines.")
+    parser.add_argument("match", nargs="?", help="Only screenshots whose filename contains this")
+    parser.add_argument("--tolerance", type=int, default=DEFAULT_TOLERANCE,
+                        help=f"Per-channel difference treated as equal, 0-255 (default {DEFAULT_TOLERANCE})")
+    parser.add_argument("--max-ratio", type=float, default=DEFAULT_MAX_RATIO,
+                        help="Fraction of changed pixels still accepted (default 0)")
+    parser.add_argument("--update", action="store_true", help="Approve current screenshots as baselines")
+    parser.add_argument("--store", choices=("png", "tiles"), default="png",
+                        help="Where the captures are: PNGs in qa-screenshots/ or the tile store")
+    args = parser.parse_args()
+
+    names = screenshot_names(args.match, args.store)
+    if not names:
+        print(f"No screenshots in {SCREENSHOT_DIR} - run qa-visual.py first")
+        return 1
+
+    if args.update:
+        print(f"Approving {len(names)} baselines:")
+        update_baselines(names, args.store)
+        return 0
+
+    start = time.perf_counter()
+    results = diff_all(names, args.tolerance, args.max_ratio, store=args.store)
+    print_results(results, time.perf_counter() - start)
+    return 0 if all(r.status in ("unchanged", "new") for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Single-pass <head> parser for the leomayn.com QA scripts.
+
+Walks the document once with html.parser and stops as soon as the head
+closes, so the inlined RSC payload in the body is never scanned. Handles
+any attribute order, single or double quotes and entity decoding.
+
+    head = parse_head(html)
+    head["title"]                 # "AI Consulting - ... | Leomayn"
+    head["meta"]["og:title"]      # keyed by lower-cased name or property
+    head["canonical"]             # <link rel="canonical"> href
+    head["json_ld"]               # parsed application/ld+json blocks in the head
+"""
+
+import json
+from html.parser import HTMLParser
+
+
+class _HeadClosed(Exception):
+    """Raised from inside the parser callbacks to stop scanning at </head>."""
+
+
+class HeadParser(HTMLParser):
+    """Incremental parser collecting title, meta, canonical and JSON-LD.
+
+    feed() can be called repeatedly with chunks of a streamed response;
+    check `done` to know when the head has closed and reading can stop.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.done = False
+        self.title = None
+        self.meta = {}
+        self.canonical = None
+        self.json_ld = []
+        self._capture = None
+        self._buffer = []
+
+    def feed(self, data):
+        if self.done:
+            return
+        try:
+            super().feed(data)
+        except _HeadClosed:
+            self.done = True
+            self.rawdata = ""
+
+    def close(self):
+        if self.done:
+            return
+        try:
+            super().close()
+        except _HeadClosed:
+            pass
+        self.done = True
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name.lower(): value or "" for name, value in attrs}
+
+        if tag == "meta":
+            key = attrs.get("property") or attrs.get("name")
+            if key and "content" in attrs:
+                # First occurrence wins, matching how crawlers read duplicates
+                self.meta.setdefault(key.lower(), attrs["content"])
+        elif tag == "link":
+            rels = attrs.get("rel", "").lower().split()
+            if "canonical" in rels and self.canonical is None:
+                self.canonical = attrs.get("href")
+        elif tag == "title" and self.title is None:
+            self._start_capture("title")
+        elif tag == "script" and attrs.get("type", "").lower() == "application/ld+json":
+            self._start_capture("json_ld")
+        elif tag == "body":
+            # Head closed implicitly (no </head> in the markup)
+            raise _HeadClosed
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._capture == "title":
+            self.title = self._end_capture().strip()
+        elif tag == "script" and self._capture == "json_ld":
+            raw = self._end_capture()
+            try:
+                self.json_ld.append(json.loads(raw))
+            except ValueError:
+                self.json_ld.append(raw)
+        elif tag == "head":
+            raise _HeadClosed
+
+    def handle_data(self, data):
+        if self._capture:
+            self._buffer.append(data)
+
+    def _start_capture(self, kind):
+        self._capture = kind
+        self._buffer = []
+
+    def _end_capture(self):
+        text = "".join(self._buffer)
+        self._capture = None
+        self._buffer = []
+        return text
+
+    def result(self):
+        return {
+            "title": self.title,
+            "meta": self.meta,
+            "canonical": self.canonical,
+            "json_ld": self.json_ld,
+        }
+
+
+def parse_head(html):
+    """Parse a document (or its first part) and return the head metadata dict."""
+    parser = HeadParser()
+    parser.feed(html)
+    parser.close()
+    return parser.result()
@@ -0,0 +1,228 @@
+"""
+Image dimension probe for the leomayn.com QA scripts.
+
+Reads width and height from the first bytes of an image instead of
+downloading and decoding the whole file:
+
+  - a Range request for the first PROBE_BYTES (servers that ignore Range
+    are read as a stream and closed after the same number of bytes)
+  - PNG IHDR, GIF logical screen, WebP VP8/VP8L/VP8X and JPEG SOF headers
+    are parsed directly
+  - only when the header is inconclusive (e.g. a JPEG whose SOF sits
+    behind a large EXIF block, or another format) is the full file
+    fetched, and decoded with Pillow if it is installed
+
+Results are cached per URL in .qa-cache/image-dims.json together with
+the ETag/Last-Modified they were read from. Later lookups in the same QA
+run (QA_RUN_ID) need no request; across runs the entry is revalidated
+with a conditional request and a 304 reuses it.
+"""
+
+import json
+import os
+import struct
+import tempfile
+import time
+from io import BytesIO
+
+import requests
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_PATH = os.path.join(REPO_ROOT, ".qa-cache", "image-dims.json")
+RUN_ID = os.environ.get("QA_RUN_ID")
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; Leomayn-QA-Bot/1.0)"
+
+# Enough for PNG/GIF/WebP several times over and most JPEG EXIF blocks
+PROBE_BYTES = 16384
+
+# JPEG start-of-frame markers (C4 DHT, C8 JPG and CC DAC share the range)
+JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Probes already made by this process, keyed by URL
+_memo = {}
+
+
+class Probe:
+    """Dimensions of one image and how they were obtained."""
+
+    def __init__(self, url, width, height, format, bytes_read, from_cache=False):
+        self.url = url
+        self.width = width
+        self.height = height
+        self.format = format
+        self.bytes_read = bytes_read
+        self.from_cache = from_cache
+
+    @property
+    def size(self):
+        return (self.width, self.height)
+
+
+def parse_header(data):
+    """Return (format, width, height) from the start of an image, or None."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return "png", width, height
+
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        width, height = struct.unpack("<HH", data[6:10])
+        return "gif", width, height
+
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            return "webp", width & 0x3FFF, height & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return "webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            width = int.from_bytes(data[24:27], "little") + 1
+            height = int.from_bytes(data[27:30], "little") + 1
+            return "webp", width, height
+        return None
+
+    if data[:2] == b"\xff\xd8":
+        return _parse_jpeg(data)
+
+    return None
+
+
+def _parse_jpeg(data):
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None  # Lost sync; not a marker where one should be
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1  # Fill byte
+            continue
+        if marker in (0x01, *range(0xD0, 0xDA)):
+            i += 2  # Standalone markers carry no length
+            continue
+        length = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if marker in JPEG_SOF:
+            if i + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return "jpeg", width, height
+        i += 2 + length
+    return None
+
+
+def _load_cache():
+    try:
+        with open(CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_entry(url, entry):
+    """Merge one entry into the cache file (written atomically)."""
+    cache = _load_cache()
+    cache[url] = entry
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(CACHE_PATH), prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp, CACHE_PATH)
+
+
+def _read_prefix(response, limit):
+    """Read at most limit body bytes, whether or not the server honoured Range."""
+    chunks = []
+    received = 0
+    for chunk in response.iter_content(4096):
+        chunks.append(chunk)
+        received += len(chunk)
+        if received >= limit:
+            break
+    response.close()
+    return b"".join(chunks)[:limit]
+
+
+def _decode_full(data):
+    """Dimensions from a complete file: our parsers first, then Pillow."""
+    parsed = parse_header(data)
+    if parsed:
+        return parsed
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(BytesIO(data)) as img:
+            return (img.format or "unknown").lower(), img.width, img.height
+    except OSError:
+        return None
+
+
+def probe_image(url, user_agent=DEFAULT_USER_AGENT, timeout=10, session=None):
+    """Return a Probe for url.
+
+    Raises requests.RequestException on network/HTTP errors and ValueError
+    if the response is not an image we can size.
+    """
+    if url in _memo:
+        return _memo[url]
+
+    entry = _load_cache().get(url)
+    if entry and RUN_ID and entry.get("run_id") == RUN_ID:
+        probe = Probe(url, entry["width"], entry["height"], entry["format"], 0, from_cache=True)
+        _memo[url] = probe
+        return probe
+
+    http = session or requests
+    headers = {"User-Agent": user_agent, "Range": f"bytes=0-{PROBE_BYTES - 1}"}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = http.get(url, headers=headers, timeout=timeout, stream=True)
+    if response.status_code == 304 and entry:
+        response.close()
+        entry["run_id"] = RUN_ID
+        _save_entry(url, entry)
+        probe = Probe(url, entry["width"], entry["height"], entry["format"], 0, from_cache=True)
+        _memo[url] = probe
+        return probe
+
+    try:
+        response.raise_for_status()
+    except requests.HTTPError:
+        response.close()
+        raise
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    data = _read_prefix(response, PROBE_BYTES)
+    bytes_read = len(data)
+    parsed = parse_header(data)
+
+    if parsed is None:
+        # Inconclusive header: fall back to the whole file
+        full = http.get(url, headers={"User-Agent": user_agent}, timeout=timeout)
+        full.raise_for_status()
+        bytes_read += len(full.content)
+        parsed = _decode_full(full.content)
+        if parsed is None:
+            raise ValueError(f"Unrecognised image format at {url}")
+
+    format, width, height = parsed
+    _save_entry(url, {
+        **validators,
+        "format": format,
+        "width": width,
+        "height": height,
+        "run_id": RUN_ID,
+        "checked_at": time.time(),
+    })
+    probe = Probe(url, width, height, format, bytes_read)
+    _memo[url] = probe
+    return probe
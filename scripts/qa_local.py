@@ -0,0 +1,231 @@
+"""
+Local production server for offline QA runs.
+
+Starts the site from the local production build on a free port, waits
+until it answers, and shuts it down afterwards:
+
+    with local_server() as site_url:          # `next start` (needs `npm run build`)
+        ...
+    with local_server("static") as site_url:  # prerendered HTML from .next/ only
+        ...
+
+The static mode serves .next/server/app/*.html, .next/static and public/
+from a small Python server. It needs no Node process but only covers
+statically prerendered routes.
+"""
+
+import mimetypes
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BUILD_DIR = os.path.join(REPO_ROOT, ".next")
+LOG_PATH = os.path.join(REPO_ROOT, ".qa-cache", "next-start.log")
+
+PRODUCTION_ORIGINS = ("https://leomayn.com", "https://www.leomayn.com")
+READY_TIMEOUT = 60
+LOCAL_MODES = ("next", "static")
+LOCAL_HELP = ("Check a local production build instead of the live site "
+              "(next start; --local=static for prerendered HTML only)")
+
+
+class LocalServerError(RuntimeError):
+    """The local server could not be started."""
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def local_mode_from_argv(argv):
+    """Read --local / --local=static from a hand-parsed argv; None if absent."""
+    for arg in argv:
+        if arg == "--local":
+            return "next"
+        if arg.startswith("--local="):
+            mode = arg.split("=", 1)[1]
+            if mode not in LOCAL_MODES:
+                raise SystemExit(f"--local must be one of: {', '.join(LOCAL_MODES)}")
+            return mode
+    return None
+
+
+def parse_args_with_local(parser, argv=None):
+    """parser.parse_args() with --local / --local=static read by local_mode_from_argv.
+
+    argparse would let a bare --local swallow the next argument as its mode
+    (`--local /services`), so, as in the hand-parsed scripts, the mode only
+    binds with '='. Declare --local on the parser as a flag for --help.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    mode = local_mode_from_argv(argv)
+    args = parser.parse_args([arg for arg in argv if arg != "--local" and not arg.startswith("--local=")])
+    args.local = mode
+    return args
+
+
+def rebase(url, site_url):
+    """Point a production URL (e.g. an absolute og:image) at site_url."""
+    if not url:
+        return url
+    for origin in PRODUCTION_ORIGINS:
+        if url == origin or url.startswith(origin + "/"):
+            return site_url + url[len(origin):]
+    return url
+
+
+def wait_until_ready(url, proc=None, timeout=READY_TIMEOUT):
+    """Poll url until the server answers with any HTTP response."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise LocalServerError(
+                f"Server exited with code {proc.returncode} - see {os.path.relpath(LOG_PATH)}"
+            )
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except urllib.error.HTTPError:
+            return  # Any status means the server is up
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.25)
+    raise LocalServerError(f"Server at {url} not ready after {timeout}s")
+
+
+def _stop(proc):
+    if proc.poll() is not None:
+        return
+    # npx spawns node as a child, so signal the whole process group
+    if hasattr(os, "killpg"):
+        os.killpg(proc.pid, signal.SIGTERM)
+    else:
+        proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+        proc.wait()
+
+
+@contextmanager
+def _next_start():
+    if not os.path.exists(os.path.join(BUILD_DIR, "BUILD_ID")):
+        raise LocalServerError("No production build in .next/ - run `npm run build` first")
+
+    port = free_port()
+    site_url = f"http://127.0.0.1:{port}"
+    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+
+    with open(LOG_PATH, "w") as log:
+        proc = subprocess.Popen(
+            ["npx", "next", "start", "--port", str(port), "--hostname", "127.0.0.1"],
+            cwd=REPO_ROOT,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        try:
+            wait_until_ready(site_url, proc)
+            yield site_url
+        finally:
+            _stop(proc)
+
+
+class _PrerenderHandler(BaseHTTPRequestHandler):
+    """Serves prerendered App Router output the way `next start` would."""
+
+    def resolve(self):
+        path = self.path.split("?", 1)[0].split("#", 1)[0]
+        app_dir = os.path.join(BUILD_DIR, "server", "app")
+        static_dir = os.path.join(BUILD_DIR, "static")
+        public_dir = os.path.join(REPO_ROOT, "public")
+        # (allowed root, candidate) pairs
+        candidates = []
+        if path.startswith("/_next/static/"):
+            candidates.append((static_dir, os.path.join(static_dir, path[len("/_next/static/"):])))
+        elif path in ("", "/"):
+            candidates.append((app_dir, os.path.join(app_dir, "index.html")))
+        else:
+            rel = path.strip("/")
+            candidates += [
+                (app_dir, os.path.join(app_dir, rel + ".html")),
+                (app_dir, os.path.join(app_dir, rel + ".body")),  # metadata routes (sitemap.xml)
+                (public_dir, os.path.join(public_dir, rel)),
+            ]
+        for root, candidate in candidates:
+            candidate = os.path.normpath(candidate)
+            # Each candidate must stay inside its own root (no ../ out of public/)
+            if candidate.startswith(root + os.sep) and os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def send(self, include_body):
+        file_path = self.resolve()
+        if not file_path:
+            self.send_error(404)
+            return
+        url_path = self.path.split("?", 1)[0]
+        if file_path.endswith(".html"):
+            content_type = "text/html; charset=utf-8"
+        else:
+            content_type = mimetypes.guess_type(url_path)[0] or "application/octet-stream"
+        with open(file_path, "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self.send(include_body=True)
+
+    def do_HEAD(self):
+        self.send(include_body=False)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def _static_server():
+    if not os.path.isdir(os.path.join(BUILD_DIR, "server", "app")):
+        raise LocalServerError("No prerendered pages in .next/server/app - run `npm run build` first")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PrerenderHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        site_url = f"http://127.0.0.1:{server.server_address[1]}"
+        wait_until_ready(site_url)
+        yield site_url
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def local_server(mode="next"):
+    """Run the local production build for the duration of the block.
+
+    Yields the base URL (e.g. http://127.0.0.1:53211). Raises
+    LocalServerError if there is no build or the server never comes up.
+    """
+    server = _static_server if mode == "static" else _next_start
+    with server() as site_url:
+        yield site_url
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Metadata indexer for the leomayn.com App Router tree.
+
+Scans app/**/page.tsx and layout.tsx for `export const metadata = {...}`,
+pulls out the title, description, canonical and openGraph fields, and
+resolves them per route the way Next.js does: each top-level key comes
+from the deepest segment that defines it (so a page's openGraph replaces
+its layout's wholesale), and a string title picks up the nearest parent
+title.template.
+
+Parsed exports are kept in .qa-cache/metadata-index.json keyed by file
+path and mtime, so only files that changed since the last run are read.
+
+Usage:
+  python scripts/qa_metadata.py            # Print the expected values per route
+  python scripts/qa_metadata.py --rebuild  # Ignore the index and re-parse everything
+"""
+
+import json
+import os
+import re
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(REPO_ROOT, "app")
+INDEX_PATH = os.path.join(REPO_ROOT, ".qa-cache", "metadata-index.json")
+INDEX_VERSION = 1
+
+METADATA_EXPORT = re.compile(r"export\s+const\s+metadata(?:\s*:\s*Metadata)?\s*=\s*\{")
+SEGMENT_FILES = ("layout.tsx", "page.tsx")
+
+# Literal values we can't evaluate statically (identifiers, calls, spreads)
+UNRESOLVED = object()
+
+
+# ============================================
+# Minimal TS object-literal reader
+# ============================================
+
+class LiteralReader:
+    """Reads a JS/TS object literal into Python values.
+
+    Handles strings (with escapes; template literals without ${}),
+    numbers, booleans, null, arrays, nested objects, trailing commas,
+    comments and `new URL('...')`. Anything else becomes UNRESOLVED.
+    """
+
+    ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+
+    def __init__(self, source, pos):
+        self.src = source
+        self.pos = pos
+
+    def skip(self):
+        while self.pos < len(self.src):
+            if self.src[self.pos].isspace():
+                self.pos += 1
+            elif self.src.startswith("//", self.pos):
+                end = self.src.find("\n", self.pos)
+                self.pos = len(self.src) if end == -1 else end
+            elif self.src.startswith("/*", self.pos):
+                end = self.src.find("*/", self.pos)
+                self.pos = len(self.src) if end == -1 else end + 2
+            else:
+                break
+
+    def peek(self):
+        self.skip()
+        return self.src[self.pos] if self.pos < len(self.src) else ""
+
+    def value(self):
+        ch = self.peek()
+        if ch == "{":
+            return self.obj()
+        if ch == "[":
+            return self.array()
+        if ch in "'\"`":
+            return self.string()
+        match = re.compile(r"new\s+URL\(\s*").match(self.src, self.pos)
+        if match:
+            self.pos = match.end()
+            url = self.string() if self.peek() in "'\"`" else UNRESOLVED
+            self.skip_expression()
+            if self.peek() == ")":
+                self.pos += 1
+            return url
+        match = re.compile(r"-?\d+(?:\.\d+)?\b|true\b|false\b|null\b").match(self.src, self.pos)
+        if match:
+            self.pos = match.end()
+            return json.loads(match.group(0))
+        self.skip_expression()
+        return UNRESOLVED
+
+    def string(self):
+        quote = self.src[self.pos]
+        self.pos += 1
+        out = []
+        while self.pos < len(self.src):
+            ch = self.src[self.pos]
+            if ch == "\\":
+                nxt = self.src[self.pos + 1]
+                if nxt == "u" and self.src[self.pos + 2] != "{":
+                    out.append(chr(int(self.src[self.pos + 2:self.pos + 6], 16)))
+                    self.pos += 6
+                    continue
+                out.append(self.ESCAPES.get(nxt, nxt))
+                self.pos += 2
+                continue
+            if ch == quote:
+                self.pos += 1
+                text = "".join(out)
+                if quote == "`" and "${" in text:
+                    return UNRESOLVED
+                return text
+            out.append(ch)
+            self.pos += 1
+        raise ValueError("unterminated string")
+
+    def key(self):
+        ch = self.peek()
+        if ch in "'\"":
+            return self.string()
+        match = re.compile(r"[A-Za-z_$][\w$]*").match(self.src, self.pos)
+        if not match:
+            raise ValueError(f"unexpected key at offset {self.pos}")
+        self.pos = match.end()
+        return match.group(0)
+
+    def obj(self):
+        self.pos += 1  # {
+        result = {}
+        while True:
+            ch = self.peek()
+            if ch == "}":
+                self.pos += 1
+                return result
+            if self.src.startswith("...", self.pos):
+                self.skip_expression()
+            else:
+                name = self.key()
+                if self.peek() == ":":
+                    self.pos += 1
+                    result[name] = self.value()
+                else:
+                    result[name] = UNRESOLVED  # shorthand property
+            if self.peek() == ",":
+                self.pos += 1
+
+    def array(self):
+        self.pos += 1  # [
+        result = []
+        while True:
+            if self.peek() == "]":
+                self.pos += 1
+                return result
+            result.append(self.value())
+            if self.peek() == ",":
+                self.pos += 1
+
+    def skip_expression(self):
+        """Skip to the next top-level ',' or closing bracket."""
+        depth = 0
+        while self.pos < len(self.src):
+            ch = self.src[self.pos]
+            if ch in "'\"`":
+                self.string()
+                continue
+            if ch in "([{":
+                depth += 1
+            elif ch in ")]}":
+                if depth == 0:
+                    return
+                depth -= 1
+            elif ch == "," and depth == 0:
+                return
+            self.pos += 1
+
+
+def parse_metadata_export(source):
+    """Return the `export const metadata` object from a TSX source, or None."""
+    match = METADATA_EXPORT.search(source)
+    if not match:
+        return None
+    return LiteralReader(source, match.end() - 1).value()
+
+
+# ============================================
+# Index
+# ============================================
+
+def _text(value):
+    return value if isinstance(value, str) else None
+
+
+def extract_fields(metadata):
+    """Keep only the fields the SEO checks compare, in JSON-safe form."""
+    fields = {}
+
+    title = metadata.get("title")
+    if isinstance(title, str):
+        fields["title"] = title
+    elif isinstance(title, dict):
+        fields["title"] = {k: _text(title.get(k)) for k in ("default", "template", "absolute")}
+
+    if _text(metadata.get("description")):
+        fields["description"] = metadata["description"]
+    if _text(metadata.get("metadataBase")):
+        fields["metadataBase"] = metadata["metadataBase"]
+
+    alternates = metadata.get("alternates")
+    if isinstance(alternates, dict) and _text(alternates.get("canonical")):
+        fields["canonical"] = alternates["canonical"]
+
+    og = metadata.get("openGraph")
+    if isinstance(og, dict):
+        images = og.get("images")
+        if isinstance(images, (list, tuple)):
+            images = images[0] if images else None
+        if isinstance(images, dict):
+            images = images.get("url")
+        fields["openGraph"] = {
+            "title": _text(og.get("title")),
+            "description": _text(og.get("description")),
+            "image": _text(images),
+        }
+
+    return fields
+
+
+def load_index():
+    try:
+        with open(INDEX_PATH) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {"version": INDEX_VERSION, "files": {}}
+    if index.get("version") != INDEX_VERSION:
+        return {"version": INDEX_VERSION, "files": {}}
+    return index
+
+
+def save_index(index):
+    os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+    tmp = f"{INDEX_PATH}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp, INDEX_PATH)
+
+
+def update_index(rebuild=False):
+    """Re-parse changed segment files and return (index, parsed_count)."""
+    index = {"version": INDEX_VERSION, "files": {}} if rebuild else load_index()
+    previous = index["files"]
+    files = {}
+    parsed = 0
+
+    for dirpath, dirnames, filenames in os.walk(APP_DIR):
+        dirnames[:] = sorted(d for d in dirnames if d != "api")
+        for name in SEGMENT_FILES:
+            if name not in filenames:
+                continue
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, REPO_ROOT)
+            mtime = os.stat(path).st_mtime_ns
+
+            cached = previous.get(rel)
+            if cached and cached.get("mtime") == mtime and not cached.get("error"):
+                files[rel] = cached
+                continue
+
+            with open(path, encoding="utf-8") as f:
+                source = f.read()
+            try:
+                metadata = parse_metadata_export(source)
+                entry = {"mtime": mtime, "metadata": extract_fields(metadata) if metadata else None}
+            except (ValueError, IndexError) as e:
+                entry = {"mtime": mtime, "metadata": None, "error": str(e)}
+            files[rel] = entry
+            parsed += 1
+
+    index["files"] = files
+    save_index(index)
+    return index, parsed
+
+
+def route_for(rel_dir):
+    """Map an app/ directory to its URL path, or None for dynamic segments."""
+    parts = [p for p in rel_dir.split(os.sep) if p and p != "."]
+    segments = []
+    for part in parts:
+        if part.startswith("[") or part.startswith("@"):
+            return None
+        if part.startswith("(") and part.endswith(")"):
+            continue  # route group
+        segments.append(part)
+    return "/" + "/".join(segments)
+
+
+def _absolute(url, base):
+    if not url or not base or re.match(r"https?://", url):
+        return url
+    return base.rstrip("/") + "/" + url.lstrip("/")
+
+
+def resolve_routes(index):
+    """Resolve the merged metadata for every page route.
+
+    Returns {route: {"title", "description", "og_title", "og_description",
+    "og_image", "canonical", "sources"}} using the same keys as qa-seo.py.
+    """
+    files = index["files"]
+    routes = {}
+
+    for rel, entry in files.items():
+        if not rel.endswith(os.sep + "page.tsx"):
+            continue
+        rel_dir = os.path.relpath(os.path.dirname(rel), "app")
+        route = route_for(rel_dir)
+        if route is None:
+            continue
+
+        # Layouts from the root down, then the page itself
+        chain = []
+        parts = [] if rel_dir == "." else rel_dir.split(os.sep)
+        for depth in range(len(parts) + 1):
+            layout = os.path.join("app", *parts[:depth], "layout.tsx")
+            if layout in files:
+                chain.append(layout)
+        chain.append(rel)
+
+        merged = {}
+        sources = {}
+        template = None
+        for source in chain:
+            metadata = files[source].get("metadata") or {}
+            title = metadata.get("title")
+            if isinstance(title, dict):
+                merged["title"] = title.get("absolute") or (
+                    template.replace("%s", title["default"]) if template and title.get("default")
+                    else title.get("default")
+                )
+                sources["title"] = source
+            elif isinstance(title, str):
+                merged["title"] = template.replace("%s", title) if template else title
+                sources["title"] = source
+            for key in ("description", "canonical", "openGraph", "metadataBase"):
+                if key in metadata:
+                    merged[key] = metadata[key]
+                    sources[key] = source
+            # A template applies to descendants, not the segment defining it
+            if isinstance(title, dict) and title.get("template"):
+                template = title["template"]
+
+        og = merged.get("openGraph") or {}
+        base = merged.get("metadataBase")
+        routes[route] = {
+            "title": merged.get("title"),
+            "description": merged.get("description"),
+            "og_title": og.get("title"),
+            "og_description": og.get("description"),
+            "og_image": _absolute(og.get("image"), base),
+            "canonical": _absolute(merged.get("canonical"), base),
+            "sources": sources,
+        }
+
+    return dict(sorted(routes.items()))
+
+
+def load_expected(rebuild=False):
+    """Update the index and return the expected SEO values per route."""
+    index, _ = update_index(rebuild=rebuild)
+    return resolve_routes(index)
+
+
+def main():
+    rebuild = "--rebuild" in sys.argv
+    index, parsed = update_index(rebuild=rebuild)
+    routes = resolve_routes(index)
+
+    print(f"Metadata index: {len(index['files'])} files ({parsed} re-parsed), {len(routes)} routes")
+    for rel, entry in index["files"].items():
+        if entry.get("error"):
+            print(f"  ✗ {rel}: {entry['error']}")
+    for route, expected in routes.items():
+        print(f"\n{route}")
+        for key in ("title", "description", "og_title", "og_description", "og_image", "canonical"):
+            print(f"  {key:<15} {expected[key]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
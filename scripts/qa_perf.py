@@ -0,0 +1,200 @@
+"""
+Page performance metrics for qa-visual.py captures.
+
+Every capture already does a full Chromium load, so `qa-visual.py --perf`
+reads the numbers off that load instead of running a separate tool:
+
+  - Navigation Timing: TTFB, DOMContentLoaded, load, plus FCP
+  - LCP, CLS (largest session window) and TBT (long-task time over 50ms
+    after FCP, up to the capture), from PerformanceObservers installed by
+    PERF_INIT_SCRIPT before any page script runs
+  - transfer bytes by type (JS, CSS, font, image, document, other) and
+    the request count, from CDP Network events with the browser cache
+    disabled, so every page is measured cold
+
+Metrics are checked against scripts/qa-budgets.json (a "default" budget
+plus per-route overrides) and appended to qa-screenshots/perf-history.jsonl,
+one line per route and viewport, for trends across runs.
+
+Numbers come from the QA browser (blocked third-party tags, reduced
+motion), so they track regressions rather than field performance.
+"""
+
+import json
+import os
+import time
+from collections import Counter
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BUDGETS_PATH = os.path.join(REPO_ROOT, "scripts", "qa-budgets.json")
+HISTORY_PATH = os.path.join(REPO_ROOT, "qa-screenshots", "perf-history.jsonl")
+
+# CDP resource types -> the byte buckets we report
+BYTE_TYPES = {
+    "Script": "js",
+    "Stylesheet": "css",
+    "Font": "font",
+    "Image": "image",
+    "Document": "document",
+}
+
+# Metric key, label, unit - in report order
+METRICS = [
+    ("ttfb_ms", "TTFB", "ms"),
+    ("fcp_ms", "FCP", "ms"),
+    ("lcp_ms", "LCP", "ms"),
+    ("cls", "CLS", ""),
+    ("tbt_ms", "TBT", "ms"),
+    ("load_ms", "Load", "ms"),
+    ("requests", "Requests", ""),
+    ("js_bytes", "JS", "B"),
+    ("css_bytes", "CSS", "B"),
+    ("font_bytes", "Fonts", "B"),
+    ("image_bytes", "Images", "B"),
+    ("total_bytes", "Total", "B"),
+]
+
+PERF_INIT_SCRIPT = """
+(() => {
+  const perf = window.__qaPerf = { lcp: 0, shifts: [], longTasks: [] };
+  const observe = (type, callback) => {
+    try {
+      new PerformanceObserver((list) => list.getEntries().forEach(callback))
+        .observe({ type, buffered: true });
+    } catch (e) {}
+  };
+  observe('largest-contentful-paint', (entry) => { perf.lcp = entry.startTime; });
+  observe('layout-shift', (entry) => {
+    if (!entry.hadRecentInput) perf.shifts.push([entry.startTime, entry.value]);
+  });
+  observe('longtask', (entry) => { perf.longTasks.push([entry.startTime, entry.duration]); });
+})();
+"""
+
+PERF_SCRIPT = """
+() => {
+  const perf = window.__qaPerf || { lcp: 0, shifts: [], longTasks: [] };
+  const nav = performance.getEntriesByType('navigation')[0];
+  const fcpEntry = performance.getEntriesByName('first-contentful-paint')[0];
+  const fcp = fcpEntry ? fcpEntry.startTime : 0;
+
+  // CLS: largest session window (gaps < 1s, windows <= 5s)
+  let cls = 0, windowValue = 0, windowStart = 0, last = -Infinity;
+  for (const [start, value] of perf.shifts) {
+    if (start - last > 1000 || start - windowStart > 5000) {
+      windowValue = 0;
+      windowStart = start;
+    }
+    windowValue += value;
+    last = start;
+    cls = Math.max(cls, windowValue);
+  }
+
+  let tbt = 0;
+  for (const [start, duration] of perf.longTasks) {
+    if (start + duration > fcp) tbt += Math.max(0, duration - 50);
+  }
+
+  return {
+    ttfb_ms: nav ? nav.responseStart : null,
+    fcp_ms: fcp || null,
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : null,
+    load_ms: nav ? nav.loadEventEnd : null,
+    lcp_ms: perf.lcp || null,
+    cls: Math.round(cls * 10000) / 10000,
+    tbt_ms: tbt,
+  };
+}
+"""
+
+
+class PerfRecorder:
+    """CDP network accounting for one Playwright page.
+
+    Call reset() before each navigation, then collect() once it is ready.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.reset()
+
+    @classmethod
+    async def attach(cls, page):
+        session = await page.context.new_cdp_session(page)
+        recorder = cls(session)
+        session.on("Network.responseReceived", recorder._on_response)
+        session.on("Network.loadingFinished", recorder._on_finished)
+        await session.send("Network.enable")
+        await session.send("Network.setCacheDisabled", {"cacheDisabled": True})
+        return recorder
+
+    def reset(self):
+        self.types = {}
+        self.bytes = Counter()
+        self.requests = 0
+
+    def _on_response(self, params):
+        self.types[params["requestId"]] = params.get("type")
+
+    def _on_finished(self, params):
+        kind = BYTE_TYPES.get(self.types.get(params["requestId"]), "other")
+        self.bytes[kind] += int(params.get("encodedDataLength", 0))
+        self.requests += 1
+
+    async def collect(self, page):
+        """Timing metrics from the page plus the network totals since reset()."""
+        metrics = await page.evaluate(PERF_SCRIPT)
+        metrics["requests"] = self.requests
+        for kind in (*BYTE_TYPES.values(), "other"):
+            metrics[f"{kind}_bytes"] = self.bytes[kind]
+        metrics["total_bytes"] = sum(self.bytes.values())
+        return metrics
+
+
+def load_budgets(path=BUDGETS_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"default": {}, "routes": {}}
+
+
+def budget_for(path, budgets):
+    """The default budget with the route's overrides applied."""
+    budget = dict(budgets.get("default", {}))
+    budget.update(budgets.get("routes", {}).get(path, {}))
+    return budget
+
+
+def over_budget(metrics, budget):
+    """[(metric, value, limit)] for every metric above its budget."""
+    return [
+        (key, metrics[key], limit)
+        for key, limit in budget.items()
+        if metrics.get(key) is not None and metrics[key] > limit
+    ]
+
+
+def append_history(records, site_url, path=HISTORY_PATH):
+    """Append one JSON line per capture with perf metrics."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    timestamp = time.time()
+    with open(path, "a") as f:
+        for record in records:
+            f.write(json.dumps({
+                "timestamp": timestamp,
+                "run_id": os.environ.get("QA_RUN_ID"),
+                "site": site_url,
+                **record,
+            }, sort_keys=True) + "\n")
+
+
+def format_metric(key, value):
+    if value is None:
+        return "-"
+    unit = next((u for k, _, u in METRICS if k == key), "")
+    if unit == "B":
+        return f"{value / 1024:.0f} KB"
+    if unit == "ms":
+        return f"{value:.0f} ms"
+    return f"{value:g}"
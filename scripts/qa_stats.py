@@ -0,0 +1,17 @@
+"""
+Shared summary statistics for the QA, replay and load-test scripts.
+
+Every report's p50/p95 goes through percentile() here, so the same label
+means the same thing in qa-seo crawls, test-generate replays, load-test
+runs and rate-limit benchmarks.
+"""
+
+import math
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list: the smallest value with
+    at least pct% of values at or below it."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Deduplicated tile storage for QA screenshots.
+
+Full-page captures repeat the same NavBar, header and footer pixels in
+every image and every run. Instead of a PNG per capture, an image is cut
+into full-width, fixed-height tiles; each tile is hashed and stored once
+as lossless WebP:
+
+  qa-screenshots/tiles/objects/<sha[:2]>/<sha>.webp   unique tiles
+  qa-screenshots/tiles/images/<name>.json             per-image manifest
+
+Tiles are aligned to the top of the page down to the middle and to the
+bottom from there on (one shorter tile joins the two), so a footer lines
+up on tile boundaries whatever the page height. Manifests are one file
+per image, so qa-visual.py and qa-opengraph.py can store concurrently.
+
+Usage:
+  python scripts/qa_tiles.py                       # Storage stats
+  python scripts/qa_tiles.py --rebuild             # Rebuild every PNG into qa-screenshots/
+  python scripts/qa_tiles.py --rebuild homepage    # Only images whose name contains this
+  python scripts/qa_tiles.py --gc                  # Delete tiles no manifest references
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+SCREENSHOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "qa-screenshots"))
+TILE_DIR = os.path.join(SCREENSHOT_DIR, "tiles")
+OBJECT_DIR = os.path.join(TILE_DIR, "objects")
+IMAGE_DIR = os.path.join(TILE_DIR, "images")
+
+# Device pixels per tile. Smaller tiles dedupe more of a page whose middle
+# changed but cost more files; 256 rows is ~3 MB raw at 2880px wide.
+TILE_HEIGHT = 256
+
+# Lossless WebP effort (0-6); higher is smaller but slower to encode
+WEBP_METHOD = 2
+
+
+def _write_atomic(path, data):
+    """Write bytes via a temp file so concurrent QA scripts never see partial files."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _object_path(digest):
+    return os.path.join(OBJECT_DIR, digest[:2], f"{digest}.webp")
+
+
+def _manifest_path(name):
+    return os.path.join(IMAGE_DIR, f"{name}.json")
+
+
+def tile_spans(height, tile_height=TILE_HEIGHT):
+    """(top, bottom) row ranges: top-aligned to the middle, then bottom-aligned."""
+    count, remainder = divmod(height, tile_height)
+    middle = (count // 2) * tile_height
+    spans = [(top, top + tile_height) for top in range(0, middle, tile_height)]
+    if remainder:
+        spans.append((middle, middle + remainder))
+    start = middle + remainder
+    spans += [(top, top + tile_height) for top in range(start, height, tile_height)]
+    return spans
+
+
+def store_image(name, png_bytes, tile_height=TILE_HEIGHT):
+    """Store a PNG as tiles under `name` (relative to qa-screenshots/).
+
+    Returns {"tiles", "new_tiles", "bytes_written", "png_bytes"}.
+    """
+    with Image.open(io.BytesIO(png_bytes)) as img:
+        img.load()
+        mode, (width, height) = img.mode, img.size
+        tiles = []
+        new_tiles = 0
+        written = 0
+        for top, bottom in tile_spans(height, tile_height):
+            tile = img.crop((0, top, width, bottom))
+            raw = tile.tobytes()
+            digest = hashlib.sha256(f"{mode}:{width}x{bottom - top}:".encode() + raw).hexdigest()
+            tiles.append(digest)
+            path = _object_path(digest)
+            if os.path.exists(path):
+                continue
+            out = io.BytesIO()
+            tile.save(out, "WEBP", lossless=True, method=WEBP_METHOD)
+            _write_atomic(path, out.getvalue())
+            new_tiles += 1
+            written += out.tell()
+
+    manifest = {
+        "name": name,
+        "mode": mode,
+        "width": width,
+        "height": height,
+        "tile_height": tile_height,
+        "tiles": tiles,
+        "sha256": hashlib.sha256(png_bytes).hexdigest(),
+        "png_bytes": len(png_bytes),
+        "stored_at": time.time(),
+    }
+    data = json.dumps(manifest, indent=2).encode("utf-8")
+    _write_atomic(_manifest_path(name), data)
+    return {
+        "tiles": len(tiles),
+        "new_tiles": new_tiles,
+        "bytes_written": written + len(data),
+        "png_bytes": len(png_bytes),
+    }
+
+
+def load_manifest(name):
+    try:
+        with open(_manifest_path(name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def has_image(name):
+    manifest = load_manifest(name)
+    return manifest is not None and all(os.path.exists(_object_path(t)) for t in manifest["tiles"])
+
+
+def load_image(name):
+    """Reassemble a stored image as a PIL Image, or raise FileNotFoundError."""
+    manifest = load_manifest(name)
+    if manifest is None:
+        raise FileNotFoundError(f"No tiled image {name}")
+    img = Image.new(manifest["mode"], (manifest["width"], manifest["height"]))
+    spans = tile_spans(manifest["height"], manifest["tile_height"])
+    for (top, _), digest in zip(spans, manifest["tiles"]):
+        with Image.open(_object_path(digest)) as tile:
+            img.paste(tile.convert(manifest["mode"]), (0, top))
+    return img
+
+
+def rebuild(name, out_path=None):
+    """Write a stored image back out as PNG (default: its place in qa-screenshots/)."""
+    out_path = out_path or os.path.join(SCREENSHOT_DIR, name)
+    buffer = io.BytesIO()
+    load_image(name).save(buffer, "PNG")
+    _write_atomic(out_path, buffer.getvalue())
+    return out_path
+
+
+def image_names(match=None):
+    names = []
+    for dirpath, _, filenames in os.walk(IMAGE_DIR):
+        for filename in filenames:
+            if filename.endswith(".json"):
+                rel = os.path.relpath(os.path.join(dirpath, filename), IMAGE_DIR)
+                names.append(rel[:-len(".json")])
+    return sorted(n for n in names if not match or match in n)
+
+
+def _object_sizes():
+    sizes = {}
+    for dirpath, _, filenames in os.walk(OBJECT_DIR):
+        for filename in filenames:
+            if filename.endswith(".webp"):
+                sizes[filename[:-len(".webp")]] = os.path.getsize(os.path.join(dirpath, filename))
+    return sizes
+
+
+def gc():
+    """Remove tiles no image manifest references; returns (removed, bytes_freed)."""
+    referenced = set()
+    for name in image_names():
+        referenced.update(load_manifest(name)["tiles"])
+    removed = freed = 0
+    for digest, size in _object_sizes().items():
+        if digest not in referenced:
+            os.remove(_object_path(digest))
+            removed += 1
+            freed += size
+    return removed, freed
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiled screenshot storage.")
+    parser.add_argument("match", nargs="?", help="Only images whose name contains this")
+    parser.add_argument("--rebuild", action="store_true", help="Write stored images back out as PNG")
+    parser.add_argument("--gc", action="store_true", help="Delete unreferenced tiles")
+    args = parser.parse_args()
+
+    if args.gc:
+        removed, freed = gc()
+        print(f"Removed {removed} unreferenced tiles ({format_bytes(freed)})")
+        return 0
+
+    names = image_names(args.match)
+    if not names:
+        print(f"No tiled images in {IMAGE_DIR}")
+        return 1
+
+    if args.rebuild:
+        for name in names:
+            print(f"  ✓ {os.path.relpath(rebuild(name), SCREENSHOT_DIR)}")
+        return 0
+
+    sizes = _object_sizes()
+    refs = 0
+    png_total = 0
+    for name in names:
+        manifest = load_manifest(name)
+        refs += len(manifest["tiles"])
+        png_total += manifest["png_bytes"]
+    stored = sum(sizes.values())
+    print(f"{len(names)} images, {refs} tile references, {len(sizes)} unique tiles")
+    print(f"Tiles on disk: {format_bytes(stored)} vs {format_bytes(png_total)} as PNGs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,26 +4,61 @@ Replay test for the AI Deployment Planner generate endpoint.
 
 Usage:
   python scripts/test-generate.py                      # Use baked-in test persona
-  python scripts/test-generate.py --fixture path.json  # Replay a captured input
+  python scripts/test-generate.py --fixture emsere-v2  # Replay a stored fixture (name, id or path)
   python scripts/test-generate.py --latest              # Replay most recent captured input
   python scripts/test-generate.py --port 3001           # Use a different port
-
-The dev server must be running (npm run dev).
+  python scripts/test-generate.py --stream              # Streamed response, with time to first event/section
+  python scripts/test-generate.py --all                 # Replay every stored fixture concurrently
+  python scripts/test-generate.py --glob 'integration-*' --concurrency 4 --repeat 3
+  python scripts/test-generate.py --where firm_type=law --where 'pain_points>3'
+  python scripts/test-generate.py --all --per firm_type,team_size   # One per combination
+  python scripts/test-generate.py --fixture emsere-v2 --scrape       # Keep companyWebsite
+
+Fixtures come from the indexed store (scripts/fixture_store.py); loose
+captures from the dev server are ingested first. --glob matches fixture
+names, --where and --per select by manifest attributes, and successful
+single runs store their output gzipped against the input's fixture.
+
+Each call prints the route's per-phase timing as a waterfall (from the
+`timing` debug field on internal/dev calls, else the Server-Timing
+header); batch replays add p50/p95/max per phase across all calls.
+
+The dev server must be running (npm run dev). Batch replays (--all,
+--glob, --where) authenticate with PLANNER_INTERNAL_KEY as a bearer token
+so the per-email and daily KV rate limits don't reject them; set it in the
+environment the dev server and this script both see.
+
+To run without network or API cost, start scripts/mock-anthropic.py and
+the dev server with ANTHROPIC_BASE_URL=http://localhost:4010. Replays drop
+qualification.companyWebsite, as load-test.py does: the route would
+otherwise scrape the live site into the prompt, which needs the network
+and changes the prompt (and so the cassette key) whenever the site does.
+--scrape keeps it for runs against the real API.
 """
 
 import argparse
+import http.client
 import json
 import os
 import sys
 import textwrap
+import time
 import urllib.request
 import urllib.error
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from glob import glob
 from pathlib import Path
 
+import fixture_store
+from qa_stats import percentile
+
 SCRIPT_DIR = Path(__file__).resolve().parent
 FIXTURES_DIR = SCRIPT_DIR / "test-fixtures"
+RUNS_DIR = FIXTURES_DIR / "runs"
+
+REQUEST_TIMEOUT = 120
+STREAM_CONTENT_TYPE = "application/x-ndjson"
+DEFAULT_CONCURRENCY = 8
 
 # ============================================
 # Baked-in test persona
@@ -83,23 +118,28 @@ DEFAULT_PAYLOAD = {
 }
 
 
-def find_latest_fixture() -> Path | None:
-    """Find the most recently captured input fixture."""
-    pattern = str(FIXTURES_DIR / "input-*.json")
-    files = sorted(glob(pattern), reverse=True)
-    return Path(files[0]) if files else None
+def find_latest_fixture() -> dict | None:
+    """The most recently captured fixture in the store."""
+    fixture_store.ingest_quietly()
+    captured = [e for e in fixture_store.load_manifest()["fixtures"] if e["last_captured"]]
+    return max(captured, key=lambda e: e["last_captured"]) if captured else None
 
 
 def load_payload(args) -> dict:
     """Load the test payload from fixture or default."""
     if args.fixture:
         path = Path(args.fixture)
-        if not path.exists():
-            print(f"Fixture not found: {path}")
+        if path.is_file():
+            print(f"Loading fixture: {path}")
+            with open(path) as f:
+                return json.load(f)
+        fixture_store.ingest_quietly()
+        entry = fixture_store.find_entry(fixture_store.load_manifest(), args.fixture)
+        if not entry:
+            print(f"Fixture not found: {args.fixture}")
             sys.exit(1)
-        print(f"Loading fixture: {path}")
-        with open(path) as f:
-            return json.load(f)
+        print(f"Loading fixture: {fixture_store.label(entry)} ({entry['id']})")
+        return fixture_store.load_input(entry)
 
     if args.latest:
         latest = find_latest_fixture()
@@ -107,32 +147,131 @@ def load_payload(args) -> dict:
             print("No captured fixtures found in scripts/test-fixtures/")
             print("Fill the form once with the dev server running to capture one.")
             sys.exit(1)
-        print(f"Loading latest fixture: {latest}")
-        with open(latest) as f:
-            return json.load(f)
+        print(f"Loading latest fixture: {fixture_store.label(latest)} ({latest['last_captured']})")
+        return fixture_store.load_input(latest)
 
     print("Using baked-in test persona: Sarah Mitchell, Meridian Consulting")
     return DEFAULT_PAYLOAD
 
 
-def call_generate(payload: dict, port: int) -> dict:
-    """POST to the generate endpoint and return the response."""
-    url = f"http://localhost:{port}/api/planner/generate"
-    data = json.dumps(payload).encode("utf-8")
-
-    req = urllib.request.Request(
-        url,
-        data=data,
-        headers={
-            "Content-Type": "application/json",
-            "Origin": f"http://localhost:{port}",
-        },
+def without_website(payload: dict) -> dict:
+    """The payload minus qualification.companyWebsite, so the route skips its live scrape."""
+    qualification = {k: v for k, v in payload.get("qualification", {}).items() if k != "companyWebsite"}
+    return {**payload, "qualification": qualification}
+
+
+def build_request(payload: dict, port: int, stream: bool = False) -> urllib.request.Request:
+    """Request for the generate endpoint, with the internal bearer key if set."""
+    headers = {
+        "Content-Type": "application/json",
+        "Origin": f"http://localhost:{port}",
+    }
+    if stream:
+        headers["Accept"] = STREAM_CONTENT_TYPE
+    internal_key = os.environ.get("PLANNER_INTERNAL_KEY")
+    if internal_key:
+        headers["Authorization"] = f"Bearer {internal_key}"
+
+    return urllib.request.Request(
+        f"http://localhost:{port}/api/planner/generate",
+        data=json.dumps(payload).encode("utf-8"),
+        headers=headers,
         method="POST",
     )
 
+
+def read_response(resp, start: float, on_event=None) -> tuple[dict, dict]:
+    """Final response body and timings (seconds since start) from a JSON or NDJSON response.
+
+    Streamed responses are turned back into the JSON response shape; timings
+    record the first event and first report section as they arrive.
+    """
+    timings = {"first_event": None, "first_section": None, "total": None, "server": None}
+    if not resp.headers.get("Content-Type", "").startswith(STREAM_CONTENT_TYPE):
+        body = json.loads(resp.read().decode("utf-8"))
+        timings["total"] = time.perf_counter() - start
+        timings["server"] = body.pop("timing", None) or parse_server_timing(resp.headers.get("Server-Timing"))
+        return body, timings
+
+    body = {"error": "Stream ended without a result"}
+    for line in resp:
+        if not line.strip():
+            continue
+        elapsed = time.perf_counter() - start
+        event = json.loads(line.decode("utf-8"))
+        if timings["first_event"] is None:
+            timings["first_event"] = elapsed
+        if event["type"] == "section" and timings["first_section"] is None:
+            timings["first_section"] = elapsed
+        if on_event:
+            on_event(event, elapsed)
+        if event["type"] == "done":
+            body = {"status": "success", "report": event["report"], "reportId": event["reportId"]}
+            timings["server"] = event.get("timing")
+        elif event["type"] == "error":
+            body = {"status": "failed", "error": event["error"], "retryToken": event.get("retryToken")}
+            timings["server"] = event.get("timing")
+    timings["total"] = time.perf_counter() - start
+    return body, timings
+
+
+def parse_server_timing(header: str | None) -> dict | None:
+    """A Server-Timing header as the route's timing summary (phases run back to back)."""
+    if not header:
+        return None
+    phases = []
+    total = None
+    cursor = 0.0
+    for entry in header.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        duration = next((float(p[4:]) for p in params if p.startswith("dur=")), 0.0)
+        if name == "total":
+            total = duration
+            continue
+        phases.append({"name": name, "startMs": cursor, "durationMs": duration})
+        cursor += duration
+    return {"totalMs": total if total is not None else cursor, "phases": phases}
+
+
+def print_waterfall(timing: dict | None, width: int = 40) -> None:
+    """Per-phase bars positioned on the request's timeline."""
+    if not timing or not timing.get("phases"):
+        print("  (no server timing in response)")
+        return
+    total = max(timing["totalMs"], 1)
+    print(f"  {'Phase':<16} {'start':>9} {'dur':>9}")
+    for phase in timing["phases"]:
+        offset = int(phase["startMs"] / total * width)
+        length = max(1, round(phase["durationMs"] / total * width))
+        bar = " " * offset + "█" * min(length, width - offset)
+        print(f"  {phase['name']:<16} {phase['startMs']:>7.0f}ms {phase['durationMs']:>7.0f}ms  {bar}")
+    print(f"  {'total':<16} {'':>9} {timing['totalMs']:>7.0f}ms")
+
+
+def print_event(event: dict, elapsed: float) -> None:
+    """One line per streamed event."""
+    if event["type"] == "progress":
+        detail = event["stage"]
+    elif event["type"] == "section":
+        index = event.get("index")
+        detail = event["key"] + (f"[{index}]" if index is not None else "")
+    elif event["type"] == "error":
+        detail = event["error"]
+    elif event["type"] == "reset":
+        detail = "earlier sections discarded"
+    else:
+        detail = event.get("reportId", "")
+    print(f"  {elapsed:>6.2f}s  {event['type']:<9} {detail}")
+
+
+def call_generate(payload: dict, port: int, stream: bool = False, on_event=None) -> tuple[dict, dict]:
+    """POST to the generate endpoint and return (response, timings)."""
+    req = build_request(payload, port, stream)
+
+    start = time.perf_counter()
     try:
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            return json.loads(resp.read().decode("utf-8"))
+        with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
+            return read_response(resp, start, on_event)
     except urllib.error.HTTPError as e:
         body = e.read().decode("utf-8") if e.fp else ""
         print(f"\nAPI error {e.code}: {body}")
@@ -144,6 +283,165 @@ def call_generate(payload: dict, port: int) -> dict:
         sys.exit(1)
 
 
+# ============================================
+# Batch replay
+# ============================================
+
+def find_fixtures(pattern: str | None, where: list[str], per: list[str] | None) -> list[dict]:
+    """Stored fixtures matching a name glob, --where filters and --per grouping."""
+    fixture_store.ingest_quietly()
+    return fixture_store.select(fixture_store.load_manifest(), pattern, where, per)
+
+
+def replay_once(name: str, payload: dict, port: int, stream: bool = False) -> dict:
+    """One generate call; never raises, so a batch always completes."""
+    start = time.perf_counter()
+    timings = {}
+    try:
+        with urllib.request.urlopen(build_request(payload, port, stream), timeout=REQUEST_TIMEOUT) as resp:
+            body, timings = read_response(resp, start)
+        ok = body.get("status") == "success"
+        error = None if ok else body.get("error", "unknown error")
+    except urllib.error.HTTPError as e:
+        ok, error = False, f"HTTP {e.code}: {e.read().decode('utf-8', 'replace')[:200] if e.fp else ''}"
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        # URLError, timeouts and dropped connections (RemoteDisconnected,
+        # ConnectionResetError) under concurrency all land here
+        ok, error = False, str(getattr(e, "reason", e)) or type(e).__name__
+    return {
+        "fixture": name,
+        "ok": ok,
+        "error": error,
+        "latency": time.perf_counter() - start,
+        "first_event": timings.get("first_event"),
+        "first_section": timings.get("first_section"),
+        "phases": phase_durations(timings.get("server")),
+    }
+
+
+def phase_durations(timing: dict | None) -> dict:
+    """Phase name -> total ms (a retried phase appears more than once)."""
+    durations = {}
+    for phase in (timing or {}).get("phases", []):
+        durations[phase["name"]] = durations.get(phase["name"], 0) + phase["durationMs"]
+    return durations
+
+
+def summarise(results: list[dict]) -> dict:
+    """Per-fixture success rate and p50/p95/max latency, in fixture order."""
+    by_fixture: dict[str, list[dict]] = {}
+    for r in results:
+        by_fixture.setdefault(r["fixture"], []).append(r)
+
+    summary = {}
+    for fixture in sorted(by_fixture):
+        runs = by_fixture[fixture]
+        latencies = [r["latency"] for r in runs]
+        first_sections = [r["first_section"] for r in runs if r.get("first_section") is not None]
+        summary[fixture] = {
+            "runs": len(runs),
+            "ok": sum(1 for r in runs if r["ok"]),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies),
+            "first_section_p50": percentile(first_sections, 50) if first_sections else None,
+            "errors": sorted({r["error"] for r in runs if r["error"]}),
+        }
+    return summary
+
+
+def summarise_phases(results: list[dict]) -> dict:
+    """p50/p95/max ms per server phase across all calls, in first-seen order."""
+    by_phase: dict[str, list[float]] = {}
+    for r in results:
+        for name, duration in r["phases"].items():
+            by_phase.setdefault(name, []).append(duration)
+    return {
+        name: {
+            "calls": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "max": max(values),
+        }
+        for name, values in by_phase.items()
+    }
+
+
+def run_batch(fixtures: list[dict], port: int, concurrency: int, repeat: int, stream: bool = False,
+              scrape: bool = False) -> int:
+    """Replay every fixture `repeat` times with at most `concurrency` in flight."""
+    if not os.environ.get("PLANNER_INTERNAL_KEY"):
+        print("⚠ PLANNER_INTERNAL_KEY is not set - calls go through the public path")
+        print("  and will hit the per-email (3/day) and daily (50) rate limits.\n")
+
+    payloads = {fixture_store.label(e): fixture_store.load_input(e) for e in fixtures}
+    if not scrape:
+        payloads = {name: without_website(payload) for name, payload in payloads.items()}
+
+    jobs = [name for name in payloads for _ in range(repeat)]
+    print(f"Replaying {len(fixtures)} fixtures × {repeat} = {len(jobs)} calls, "
+          f"{concurrency} at a time, on localhost:{port}\n")
+
+    results = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(replay_once, name, payloads[name], port, stream) for name in jobs]
+        for future in as_completed(futures):
+            r = future.result()
+            results.append(r)
+            mark = "✓" if r["ok"] else f"✗ {r['error']}"
+            print(f"  [{len(results):>3}/{len(jobs)}] {r['fixture']}: {r['latency']:.1f}s {mark}")
+    wall_time = time.perf_counter() - start
+
+    summary = summarise(results)
+    sep = "─" * 78
+    print(f"\n{sep}")
+    print(f"  {'Fixture':<44} {'OK':>5} {'p50':>7} {'p95':>7} {'max':>7}" + ("  1st sec" if stream else ""))
+    print(sep)
+    for fixture, s in summary.items():
+        first_section = s["first_section_p50"]
+        print(f"  {fixture[:44]:<44} {s['ok']:>2}/{s['runs']:<2} "
+              f"{s['p50']:>6.1f}s {s['p95']:>6.1f}s {s['max']:>6.1f}s"
+              + (f" {first_section:>7.1f}s" if first_section is not None else ""))
+        for error in s["errors"]:
+            print(f"      ✗ {error}")
+    print(sep)
+
+    ok = sum(1 for r in results if r["ok"])
+    latencies = [r["latency"] for r in results]
+    print(f"\n  Success: {ok}/{len(results)} ({ok / len(results):.0%})")
+    print(f"  Latency: p50 {percentile(latencies, 50):.1f}s, p95 {percentile(latencies, 95):.1f}s, "
+          f"max {max(latencies):.1f}s")
+    first_sections = [r["first_section"] for r in results if r["first_section"] is not None]
+    if first_sections:
+        print(f"  First section: p50 {percentile(first_sections, 50):.1f}s, "
+              f"p95 {percentile(first_sections, 95):.1f}s")
+    print(f"  Wall time: {wall_time:.1f}s for {sum(latencies):.1f}s of generation")
+
+    phase_stats = summarise_phases(results)
+    if phase_stats:
+        print(f"\n  {'Phase':<16} {'calls':>5} {'p50':>9} {'p95':>9} {'max':>9}")
+        for name, p in phase_stats.items():
+            print(f"  {name:<16} {p['calls']:>5} {p['p50']:>7.0f}ms {p['p95']:>7.0f}ms {p['max']:>7.0f}ms")
+
+    RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    report_path = RUNS_DIR / f"replay-{datetime.now().strftime('%Y-%m-%dT%H-%M-%S')}.json"
+    with open(report_path, "w") as f:
+        json.dump({
+            "port": port,
+            "concurrency": concurrency,
+            "repeat": repeat,
+            "stream": stream,
+            "wall_time": wall_time,
+            "fixtures": summary,
+            "phases": phase_stats,
+            "results": results,
+        }, f, indent=2)
+    print(f"  Results saved to: {report_path}\n")
+
+    return 0 if ok == len(results) else 1
+
+
 def word_count(text: str) -> int:
     return len(text.split())
 
@@ -242,37 +540,72 @@ def print_summary(report: dict):
 
 
 def save_output(response: dict, payload: dict) -> Path:
-    """Save the full response and return the path."""
-    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
-
-    output_path = FIXTURES_DIR / f"output-{timestamp}.json"
-    with open(output_path, "w") as f:
-        json.dump(response, f, indent=2)
-
-    # Also save the input alongside if using default persona
-    input_path = FIXTURES_DIR / f"input-default-persona.json"
-    if not input_path.exists():
-        with open(input_path, "w") as f:
-            json.dump(payload, f, indent=2)
-
+    """Store the full response against the payload's fixture and return the path."""
+    manifest = fixture_store.load_manifest()
+    entry = fixture_store.get_entry(manifest, payload)
+    if entry is None:
+        # Also store the input if it isn't in the store yet (the default persona)
+        name = "default-persona" if payload is DEFAULT_PAYLOAD else None
+        entry = fixture_store.add_input(manifest, payload, name)
+    output_path = fixture_store.add_output(entry, response)
+    fixture_store.save_manifest(manifest)
     return output_path
 
 
 def main():
     parser = argparse.ArgumentParser(description="Test the planner generate endpoint")
-    parser.add_argument("--fixture", help="Path to a captured input JSON file")
+    parser.add_argument("--fixture", help="Stored fixture name or id, or a path to an input JSON file")
     parser.add_argument("--latest", action="store_true", help="Use the most recent captured fixture")
     parser.add_argument("--port", type=int, default=3000, help="Dev server port (default: 3000)")
     parser.add_argument("--quiet", action="store_true", help="Only save output, skip summary")
+    parser.add_argument("--all", action="store_true", help="Replay every stored fixture")
+    parser.add_argument("--glob", help="Replay fixtures whose name matches a glob (e.g. 'integration-*')")
+    parser.add_argument("--where", action="append", default=[],
+                        help="Replay fixtures matching FIELD OP VALUE (repeatable, e.g. 'pain_points>3')")
+    parser.add_argument("--per", help="Comma-separated manifest fields: replay one fixture per combination")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Batch calls in flight at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--repeat", type=int, default=1, help="Calls per fixture in batch mode (default: 1)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Request the streamed (NDJSON) response and time first event/section")
+    parser.add_argument("--scrape", action="store_true",
+                        help="Keep companyWebsite, so the route scrapes the live site (not replayable offline)")
     args = parser.parse_args()
 
+    if args.per and not (args.all or args.glob or args.where):
+        parser.error("--per needs a batch selection (--all, --glob or --where)")
+
+    if args.all or args.glob or args.where:
+        per = [f.strip() for f in args.per.split(",")] if args.per else None
+        try:
+            fixtures = find_fixtures(args.glob, args.where, per)
+        except ValueError as e:
+            parser.error(str(e))
+        if not fixtures:
+            print("No stored fixtures match the selection (see: python scripts/fixture_store.py list)")
+            sys.exit(1)
+        sys.exit(run_batch(fixtures, args.port, max(1, args.concurrency), max(1, args.repeat), args.stream,
+                           args.scrape))
+
     payload = load_payload(args)
 
     print(f"\nCalling generate endpoint on localhost:{args.port}...")
     print("(This calls Anthropic — expect 15-30 seconds)\n")
 
-    response = call_generate(payload, args.port)
+    on_event = print_event if args.stream and not args.quiet else None
+    sent = payload if args.scrape else without_website(payload)
+    response, timings = call_generate(sent, args.port, args.stream, on_event)
+
+    if args.stream:
+        first_event, first_section = timings["first_event"], timings["first_section"]
+        print(f"\n  Time to first event:   {first_event:.2f}s" if first_event is not None
+              else "\n  Time to first event:   -")
+        print(f"  Time to first section: {first_section:.2f}s" if first_section is not None
+              else "  Time to first section: -")
+    print(f"  Total time:            {timings['total']:.2f}s\n")
+    if not args.quiet:
+        print_waterfall(timings["server"])
+        print()
 
     if response.get("status") != "success":
         print(f"Generation failed: {response.get('error', 'unknown error')}")
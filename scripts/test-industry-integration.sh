@@ -8,7 +8,7 @@
 set -euo pipefail
 
 BASE_URL="${1:-http://localhost:3000}"
-FIXTURES_DIR="scripts/test-fixtures"
+FIXTURE_STORE="scripts/fixture_store.py"
 PASS=0
 FAIL=0
 
@@ -28,6 +28,11 @@ fail() {
   ((FAIL++))
 }
 
+# Print a stored fixture's input (see scripts/fixture_store.py)
+fixture() {
+  python3 "$FIXTURE_STORE" show "$1"
+}
+
 # Check server is running
 if ! curl -s -o /dev/null -w "%{http_code}" "$BASE_URL" | grep -q "200"; then
   echo "ERROR: Dev server not running at $BASE_URL"
@@ -45,7 +50,7 @@ echo "── 2a. Agency generation ──"
 RESPONSE=$(curl -s -X POST "$BASE_URL/api/planner/generate" \
   -H "Content-Type: application/json" \
   -H "Origin: http://localhost:3000" \
-  -d @"$FIXTURES_DIR/input-genetic-digital.json")
+  -d "$(fixture genetic-digital)")
 
 STATUS=$(echo "$RESPONSE" | python3 -c "import sys,json; d=json.load(sys.stdin); print(d.get('status','error'))" 2>/dev/null || echo "error")
 
@@ -72,7 +77,7 @@ echo "── 2b. Law generation ──"
 RESPONSE=$(curl -s -X POST "$BASE_URL/api/planner/generate" \
   -H "Content-Type: application/json" \
   -H "Origin: http://localhost:3000" \
-  -d @"$FIXTURES_DIR/input-2026-02-17T22-27-03-405Z.json")
+  -d "$(fixture 2026-02-17T22-27-03-405Z)")
 
 STATUS=$(echo "$RESPONSE" | python3 -c "import sys,json; d=json.load(sys.stdin); print(d.get('status','error'))" 2>/dev/null || echo "error")
 
@@ -98,7 +103,7 @@ echo "── 2c. Generic (internal-services) generation ──"
 RESPONSE=$(curl -s -X POST "$BASE_URL/api/planner/generate" \
   -H "Content-Type: application/json" \
   -H "Origin: http://localhost:3000" \
-  -d @"$FIXTURES_DIR/input-default-persona.json")
+  -d "$(fixture default-persona)")
 
 STATUS=$(echo "$RESPONSE" | python3 -c "import sys,json; d=json.load(sys.stdin); print(d.get('status','error'))" 2>/dev/null || echo "error")
 
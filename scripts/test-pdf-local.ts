@@ -5,72 +5,73 @@
  *   npx tsx scripts/test-pdf-local.ts [fixture-name]
  *
  * Examples:
- *   npx tsx scripts/test-pdf-local.ts              # uses latest fixtures
- *   npx tsx scripts/test-pdf-local.ts emsere-v2    # uses input-emsere-v2 + output-emsere-v2
- *   npx tsx scripts/test-pdf-local.ts everybody    # uses input-everybody + output matching
+ *   npx tsx scripts/test-pdf-local.ts              # uses the latest stored output
+ *   npx tsx scripts/test-pdf-local.ts emsere-v2    # uses the emsere-v2 fixture's latest output
+ *   npx tsx scripts/test-pdf-local.ts 9f3ead5f     # fixtures can also be named by id prefix
+ *
+ * Fixtures come from the store indexed by scripts/fixture_store.py
+ * (test-fixtures/manifest.json); run `python scripts/fixture_store.py ingest`
+ * first if you have loose captures.
  */
 
-import { readFileSync, writeFileSync, readdirSync, existsSync } from 'fs'
+import { readFileSync, writeFileSync, existsSync } from 'fs'
 import { join } from 'path'
+import { gunzipSync } from 'zlib'
 import { buildPdfHtml, type PdfTemplateData } from '../lib/planner/pdf-html-template'
 import { renderPdfWithPuppeteer } from '../lib/planner/pdf-renderer'
 import { calculateTheoreticalMax } from '../lib/planner/scoring'
 
+interface FixtureOutput {
+  file: string
+  captured: string | null
+}
+
+interface FixtureEntry {
+  id: string
+  names: string[]
+  input: string
+  outputs: FixtureOutput[]
+}
+
 const FIXTURES_DIR = join(__dirname, 'test-fixtures')
+const MANIFEST_PATH = join(FIXTURES_DIR, 'manifest.json')
 const fixtureName = process.argv[2]
 
-let outputPath: string
-let inputPath: string | null = null
+if (!existsSync(MANIFEST_PATH)) {
+  console.error('No fixture manifest found. Run: python scripts/fixture_store.py ingest')
+  process.exit(1)
+}
+const manifest = JSON.parse(readFileSync(MANIFEST_PATH, 'utf-8')) as { fixtures: FixtureEntry[] }
+const withOutputs = manifest.fixtures.filter(f => f.outputs.length > 0)
 
+let entry: FixtureEntry | undefined
 if (fixtureName) {
-  // Named fixture — look for exact match
-  const namedOutput = join(FIXTURES_DIR, `output-${fixtureName}.json`)
-  const namedInput = join(FIXTURES_DIR, `input-${fixtureName}.json`)
-  if (!existsSync(namedOutput)) {
-    console.error(`Output fixture not found: output-${fixtureName}.json`)
+  // Named fixture — match a name, else an id prefix
+  entry = withOutputs.find(f => f.names.includes(fixtureName)) ?? withOutputs.find(f => f.id.startsWith(fixtureName))
+  if (!entry) {
+    console.error(`No stored output for fixture: ${fixtureName}`)
     process.exit(1)
   }
-  outputPath = namedOutput
-  inputPath = existsSync(namedInput) ? namedInput : null
 } else {
-  // No name — pick latest output, then find matching input by timestamp prefix
-  const outputFiles = readdirSync(FIXTURES_DIR)
-    .filter(f => f.startsWith('output-'))
-    .sort()
-    .reverse()
-
-  if (outputFiles.length === 0) {
+  // No name — the fixture with the most recently captured output
+  const latestCapture = (f: FixtureEntry) => f.outputs[f.outputs.length - 1].captured ?? ''
+  entry = [...withOutputs].sort((a, b) => latestCapture(b).localeCompare(latestCapture(a)))[0]
+  if (!entry) {
     console.error('No output fixtures found. Run test-generate.py first.')
     process.exit(1)
   }
-  outputPath = join(FIXTURES_DIR, outputFiles[0])
-
-  // Try to match input by same timestamp or name
-  const outputBase = outputFiles[0].replace('output-', '').replace('.json', '')
-  const matchingInput = `input-${outputBase}.json`
-  if (existsSync(join(FIXTURES_DIR, matchingInput))) {
-    inputPath = join(FIXTURES_DIR, matchingInput)
-  }
 }
 
+// Prefer an output stored under the requested name (hand-named fixtures
+// share a payload), else the latest - outputs are kept in capture order
+const namedOutput = fixtureName ? entry.outputs.find(o => o.file.endsWith(`-${fixtureName}.json.gz`)) : undefined
+const outputPath = join(FIXTURES_DIR, (namedOutput ?? entry.outputs[entry.outputs.length - 1]).file)
 console.log(`Loading fixture: ${outputPath}`)
-const output = JSON.parse(readFileSync(outputPath, 'utf-8'))
-
-// Find input fixture — use matched path or fall back to latest
-const inputFiles = !inputPath ? readdirSync(FIXTURES_DIR)
-  .filter(f => f.startsWith('input-') && !f.includes('default'))
-  .sort()
-  .reverse() : []
-
-let inputData: Record<string, unknown> = {}
-if (inputPath) {
-  console.log(`Loading input: ${inputPath}`)
-  inputData = JSON.parse(readFileSync(inputPath, 'utf-8'))
-} else if (inputFiles.length > 0) {
-  const fallbackInput = join(FIXTURES_DIR, inputFiles[0])
-  console.log(`Loading input (fallback): ${fallbackInput}`)
-  inputData = JSON.parse(readFileSync(fallbackInput, 'utf-8'))
-}
+const output = JSON.parse(gunzipSync(readFileSync(outputPath)).toString('utf-8'))
+
+const inputPath = join(FIXTURES_DIR, entry.input)
+console.log(`Loading input: ${inputPath}`)
+const inputData: Record<string, unknown> = JSON.parse(readFileSync(inputPath, 'utf-8'))
 
 const report = output.report
 